@@ -51,6 +51,53 @@ def create_app():
     # --- PLEX CONFIGURATION (NEW) ---
     app.config['PLEX_URL'] = 'http://127.0.0.1:32400'
     app.config['PLEX_TOKEN'] = 'uHmJsmLp1jo-BxJKWQGU'
+    # Shared keep-alive connection: request timeout and max pooled connections.
+    app.config['PLEX_TIMEOUT_SECONDS'] = int(os.getenv('PLEX_TIMEOUT_SECONDS', 10))
+    app.config['PLEX_POOL_SIZE'] = int(os.getenv('PLEX_POOL_SIZE', 20))
+    # Browse/search metadata cache; library changes are polled every CHECK seconds.
+    app.config['PLEX_CACHE_TTL_SECONDS'] = int(os.getenv('PLEX_CACHE_TTL_SECONDS', 600))
+    app.config['PLEX_CACHE_MAX_ENTRIES'] = int(os.getenv('PLEX_CACHE_MAX_ENTRIES', 2000))
+    app.config['PLEX_CACHE_CHECK_SECONDS'] = int(os.getenv('PLEX_CACHE_CHECK_SECONDS', 60))
+    # Poster store for /api/plex/image (defaults to instance/poster_cache).
+    app.config['PLEX_POSTER_CACHE_DIR'] = os.getenv('PLEX_POSTER_CACHE_DIR')
+    app.config['PLEX_POSTER_CACHE_MB'] = int(os.getenv('PLEX_POSTER_CACHE_MB', 512))
+    app.config['PLEX_POSTER_MEMORY_MB'] = int(os.getenv('PLEX_POSTER_MEMORY_MB', 32))
+    # Local search index: incremental refresh interval and full rebuild interval.
+    app.config['PLEX_INDEX_REFRESH_SECONDS'] = int(os.getenv('PLEX_INDEX_REFRESH_SECONDS', 300))
+    app.config['PLEX_INDEX_FULL_REBUILD_SECONDS'] = int(os.getenv('PLEX_INDEX_FULL_REBUILD_SECONDS', 6 * 3600))
+    # /plex-transcode proxy: shared segment cache size and how long segments are kept.
+    app.config['PLEX_PROXY_CACHE_MB'] = int(os.getenv('PLEX_PROXY_CACHE_MB', 128))
+    app.config['PLEX_PROXY_SEGMENT_TTL_SECONDS'] = int(os.getenv('PLEX_PROXY_SEGMENT_TTL_SECONDS', 60))
+
+    # --- WATCH PARTY ---
+    # How often buffered room play/pause state is written to the room table.
+    app.config['ROOM_STATE_FLUSH_SECONDS'] = float(os.getenv('ROOM_STATE_FLUSH_SECONDS', 5))
+    # Presence changes within this window go out as one user-list delta.
+    app.config['PRESENCE_BROADCAST_MS'] = int(os.getenv('PRESENCE_BROADCAST_MS', 250))
+
+    # --- STATIC ASSETS ---
+    # Fingerprinted + precompressed copies of static/ (defaults to instance/static_build).
+    app.config['STATIC_BUILD_DIR'] = os.getenv('STATIC_BUILD_DIR')
+
+    # --- ARCADE ---
+    # How often static/roms is re-scanned for added, changed or removed ROMs.
+    app.config['ROM_CATALOG_SCAN_SECONDS'] = int(os.getenv('ROM_CATALOG_SCAN_SECONDS', 60))
+    # Gzip copies of cartridge ROMs (defaults to instance/rom_cache).
+    app.config['ROM_CACHE_DIR'] = os.getenv('ROM_CACHE_DIR')
+
+    # --- LIVE TV STREAMING ---
+    # How many channels may be transcoded at once, and how long a channel
+    # with no viewers keeps running before it is stopped.
+    app.config['LIVE_TV_MAX_STREAMS'] = int(os.getenv('LIVE_TV_MAX_STREAMS', 3))
+    app.config['LIVE_TV_IDLE_SECONDS'] = int(os.getenv('LIVE_TV_IDLE_SECONDS', 30))
+    # Encoder profile used when a channel has no override ('compat', 'abr', 'abr-hd'),
+    # and the H.264 encoder to run it with (e.g. libx264, h264_nvenc, h264_qsv).
+    app.config['LIVE_TV_ENCODER_PROFILE'] = os.getenv('LIVE_TV_ENCODER_PROFILE', 'compat')
+    app.config['LIVE_TV_VIDEO_ENCODER'] = os.getenv('LIVE_TV_VIDEO_ENCODER', 'libx264')
+    # Memory budget for HLS playlists/segments served from RAM by /stream.
+    app.config['LIVE_TV_SEGMENT_CACHE_MB'] = int(os.getenv('LIVE_TV_SEGMENT_CACHE_MB', 256))
+    # Low-latency HLS (fMP4 parts + blocking playlist reload). Always transcodes.
+    app.config['LIVE_TV_LOW_LATENCY'] = os.getenv('LIVE_TV_LOW_LATENCY', 'false').lower() in ('1', 'true', 'yes')
 
     # Initialize extensions
     db.init_app(app)
@@ -65,6 +112,40 @@ def create_app():
 
     from .routes import main_bp
     from .auth import auth_bp
+    from .services.streamer import streamer
+    from .services.encoder_profiles import profiles
+    from .services.segment_cache import segment_cache
+    from .services.channel_directory import channel_directory
+    from .services.plex_client import plex_client
+    from .services.plex_cache import plex_cache
+    from .services.poster_cache import poster_cache
+    from .services.plex_index import plex_index
+    from .services.transcode_proxy import transcode_proxy
+    from .services.room_state_writer import room_state_writer
+    from .services.presence_broadcaster import presence_broadcaster
+    from .services.room_reaper import room_reaper
+    from .services.room_directory import room_directory
+    from .services.rom_catalog import rom_catalog
+    from .services.rom_delivery import rom_delivery
+    from .services.static_assets import static_assets
+
+    profiles.init_app(app)
+    segment_cache.init_app(app)
+    channel_directory.init_app(app)
+    streamer.init_app(app)
+    plex_client.init_app(app)
+    plex_cache.init_app(app)
+    poster_cache.init_app(app)
+    plex_index.init_app(app)
+    transcode_proxy.init_app(app)
+    room_state_writer.init_app(app)
+    presence_broadcaster.init_app(app)
+    room_reaper.init_app(app)
+    room_directory.init_app(app)
+    rom_catalog.init_app(app)
+    rom_delivery.init_app(app)
+    rom_catalog.on_hashed = rom_delivery.precompress
+    static_assets.init_app(app)
 
     app.register_blueprint(main_bp)
     app.register_blueprint(auth_bp)
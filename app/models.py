@@ -46,6 +46,38 @@ class Channel(db.Model):
     is_playing = db.Column(db.String(255), nullable=True)
     logo = db.Column(db.String(500))
 
+# --- CHANNEL PROBE CACHE ---
+# ffprobe results per channel, used to decide between remuxing and transcoding.
+class ChannelProbe(db.Model):
+    __bind_key__ = 'channels_db'
+    __tablename__ = 'channel_probes'
+    channel_id = db.Column(db.Integer, primary_key=True)
+    url = db.Column(db.String(255), nullable=True)
+    video_codec = db.Column(db.String(32), nullable=True)
+    audio_codec = db.Column(db.String(64), nullable=True)
+    pix_fmt = db.Column(db.String(32), nullable=True)
+    format_name = db.Column(db.String(64), nullable=True)
+    stream_mode = db.Column(db.String(16), nullable=False, default='transcode')
+    probed_at = db.Column(db.DateTime, nullable=True)
+
+# --- CHANNEL ENCODER PROFILE ---
+# Per-channel override of the global Live TV encoder profile.
+class ChannelEncoderProfile(db.Model):
+    __bind_key__ = 'channels_db'
+    __tablename__ = 'channel_encoder_profiles'
+    channel_id = db.Column(db.Integer, primary_key=True)
+    profile_name = db.Column(db.String(64), nullable=False)
+
+# --- LIVE TV NOW PLAYING ---
+# Single-row, write-behind copy of the stream manager's now-playing registry
+# so the current channel survives a restart.
+class NowPlayingState(db.Model):
+    __bind_key__ = 'channels_db'
+    __tablename__ = 'now_playing'
+    id = db.Column(db.Integer, primary_key=True)
+    channel_id = db.Column(db.Integer, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
 # --- ROOM MODEL ---
 class Room(db.Model):
 
@@ -74,4 +106,16 @@ class Room(db.Model):
             'host': self.host.username,
             'media_title': self.current_media_title,
             'is_playing': self.is_playing,
-        }
\ No newline at end of file
+        }
+
+# --- ROM CATALOG ---
+# One row per file under static/roms, kept in step with the disk by the
+# ROM catalog's mtime scan.
+class RomFile(db.Model):
+    __tablename__ = 'rom_file'
+    path = db.Column(db.String(500), primary_key=True)  # relative to static/
+    name = db.Column(db.String(255), nullable=False)
+    system = db.Column(db.String(20), nullable=True, index=True)
+    size = db.Column(db.BigInteger, nullable=False)
+    mtime_ns = db.Column(db.BigInteger, nullable=False)
+    sha1 = db.Column(db.String(40), nullable=True)
@@ -1,7 +1,9 @@
 import os
 import time
+import uuid
+import zlib
 import requests
-from datetime import datetime, timedelta
+from datetime import datetime
 from urllib.parse import urlencode, unquote
 
 from flask import Blueprint, render_template, jsonify, send_from_directory, current_app, url_for, Response, request
@@ -11,29 +13,42 @@ from flask_socketio import emit, join_room
 from . import db, socketio
 from .models import Channel, Room
 from app.utils import get_plex_server
+from app.services.plex_client import plex_client
+from app.services.plex_cache import plex_cache
+from app.services.poster_cache import poster_cache, poster_key
+from app.services.plex_index import plex_index
+from app.services import plex_browse, plex_media
+from app.services.room_transcodes import room_transcodes
+from app.services.transcode_proxy import transcode_proxy, is_playlist, upstream_path, PROXY_PREFIX
+from app.services.room_state_writer import room_state_writer
+from app.services.room_registry import room_registry
+from app.services.presence import presence
+from app.services.presence_broadcaster import presence_broadcaster
+from app.services.room_reaper import room_reaper
+from app.services.room_directory import room_directory
+from app.services.rom_catalog import rom_catalog
+from app.services.rom_delivery import rom_delivery
+from app.services.static_assets import static_assets
 from app.services.streamer import streamer
+from app.services.encoder_profiles import profiles
+from app.services.segment_cache import segment_cache, guess_mimetype
+from app.services import llhls
+from app.services.channel_directory import channel_directory
 
 main_bp = Blueprint('main', __name__)
 
 # In-memory live state used for fast Socket.IO sync.
 # The Room database row is also updated on important state changes so refresh/rejoin works.
 room_states = {}
+room_media_jobs = {}  # room_id -> job id of the media being prepared
 
 # Grace periods prevent rooms/host ownership from changing during a normal browser refresh.
 ROOM_EMPTY_GRACE_SECONDS = 60
 HOST_TRANSFER_GRACE_SECONDS = 25
 
-# --- Global User Tracking ---
-online_users = set()
-online_last_seen = {}
-connected_sids = {}
-
-# Live TV page-specific presence
-live_tv_occupancy = {}  # sid -> username
-
-# Watch Together room-specific presence
-room_occupancy = {}  # room_id -> {sid: username}
-sid_to_room = {}
+# Who is online, on Live TV and in which room lives in app.services.presence.
+# Heartbeat-only users (no socket) drop off the online list after this long.
+ONLINE_HEARTBEAT_TIMEOUT_SECONDS = 15
 
 
 # --- HELPER: Get Public IP ---
@@ -54,44 +69,62 @@ def _room_key(room_id):
     return str(room_id)
 
 
-def _unique_live_tv_users():
-    users = []
-    seen = set()
+def _on_stream_ready(job):
+    # Each viewer picks its own channel: only the socket holding this job id
+    # switches, everyone else keeps watching what they were.
+    socketio.emit('stream_ready', job.to_dict(), to="live_tv")
 
-    for username in live_tv_occupancy.values():
-        if username not in seen:
-            users.append(username)
-            seen.add(username)
 
-    return users
+def _on_stream_failed(job):
+    socketio.emit('stream_failed', job.to_dict(), to="live_tv")
 
 
-def _emit_live_tv_users():
-    socketio.emit(
-        "live_tv_users_update",
-        _unique_live_tv_users(),
-        to="live_tv"
-    )
+streamer.viewer_counts_provider = presence.channel_viewer_counts
+streamer.on_ready = _on_stream_ready
+streamer.on_failed = _on_stream_failed
+channel_directory.now_playing_provider = streamer.get_now_playing
 
 
+def _room_audience(room_id):
+    return f"room:{_room_key(room_id)}"
 
-def _unique_room_users(room_id):
-    """Return unique usernames in join order for a room."""
-    users = []
-    seen = set()
-    for username in room_occupancy.get(_room_key(room_id), {}).values():
-        if username not in seen:
-            users.append(username)
-            seen.add(username)
-    return users
 
+def _presence_audience_users(audience):
+    if audience == "online":
+        return presence.online_users(stale_after=ONLINE_HEARTBEAT_TIMEOUT_SECONDS)
+    if audience == "live_tv":
+        return presence.live_tv_users()
+    return presence.room_users(audience.split(":", 1)[1])
+
+
+def _emit_presence_delta(audience, payload):
+    if audience == "online":
+        socketio.emit("update_users_delta", payload)
+    elif audience == "live_tv":
+        socketio.emit("live_tv_users_delta", payload, to="live_tv")
+    else:
+        room_id = audience.split(":", 1)[1]
+        socketio.emit("room_users_delta", payload, to=f"room_{room_id}")
+        # Landing page user counts follow the same coalesced changes.
+        room_directory.changed(room_id)
+
+
+presence_broadcaster.users_provider = _presence_audience_users
+presence_broadcaster.on_delta = _emit_presence_delta
+
+
+def _emit_rooms_updated(payload):
+    socketio.emit("rooms_updated", payload, to="rooms_landing")
+
+
+room_registry.on_change = room_directory.changed
+room_directory.user_count_provider = presence.room_user_count
+room_directory.on_update = _emit_rooms_updated
 
-def _emit_room_users(room_id):
-    socketio.emit(
-        "room_users_update",
-        _unique_room_users(room_id),
-        to=f"room_{_room_key(room_id)}"
-    )
+
+def _forget_room_presence(room_id):
+    presence.clear_room(_room_key(room_id))
+    presence_broadcaster.forget(_room_audience(room_id))
 
 
 def _get_room_state_payload(room):
@@ -131,7 +164,7 @@ def _get_room_state_payload(room):
 
 
 def _save_room_playback_state(room_id, status, offset=None, start_time=None):
-    """Keep memory and database playback state aligned."""
+    """Update the live room state; the Room row follows via the write-behind flusher."""
     room_id = _room_key(room_id)
     start_time = float(start_time if start_time is not None else _now())
     offset = float(offset or 0.0)
@@ -142,12 +175,8 @@ def _save_room_playback_state(room_id, status, offset=None, start_time=None):
         "status": status,
     }
 
-    room = Room.query.get(int(room_id))
-    if room:
-        room.is_playing = status == "playing"
-        room.current_time = offset
-        room.last_updated = datetime.utcnow()
-        db.session.commit()
+    room_state_writer.mark(room_id, status == "playing", offset)
+    room_registry.set_playback(room_id, status == "playing", offset)
 
     return room_states[room_id]
 
@@ -156,117 +185,63 @@ def _is_current_user_room_host(room_id):
     if not current_user.is_authenticated:
         return False
 
-    room = Room.query.get(int(room_id))
-    if not room:
-        return False
-
-    return str(room.host_id) == str(current_user.id)
-
-
-def _schedule_empty_room_cleanup(room_id):
-    room_id = _room_key(room_id)
-    app = current_app._get_current_object()
-
-    def cleanup_after_grace(target_room_id):
-        socketio.sleep(ROOM_EMPTY_GRACE_SECONDS)
-
-        # Someone rejoined during the grace period.
-        if room_occupancy.get(target_room_id):
-            return
-
-        with app.app_context():
-            # Check one more time inside the app context before deleting.
-            if room_occupancy.get(target_room_id):
-                return
-
-            room_occupancy.pop(target_room_id, None)
-            room_states.pop(target_room_id, None)
-
-            room_to_delete = Room.query.get(int(target_room_id))
-            if room_to_delete:
-                db.session.delete(room_to_delete)
-                db.session.commit()
-
-    socketio.start_background_task(cleanup_after_grace, room_id)
+    return room_registry.is_host(room_id, current_user.id)
 
-def _cleanup_stale_empty_rooms():
-    cutoff = datetime.utcnow() - timedelta(seconds=ROOM_EMPTY_GRACE_SECONDS)
 
-    rooms = Room.query.all()
-    deleted_any = False
-
-    for room in rooms:
-        room_id = _room_key(room.id)
-        active_users = room_occupancy.get(room_id, {})
+def _delete_rooms(room_ids):
+    """Delete rooms and drop their live state (called by the room reaper, in an app context)."""
+    for room_id in room_ids:
+        _forget_room_presence(room_id)
+        room_states.pop(room_id, None)
+        room_transcodes.stop(room_id)
+        room_registry.forget(room_id)
+        room_reaper.forget(room_id)
+        room_state_writer.discard(room_id)
 
-        # If the room has active sockets, do not delete it.
-        if active_users:
-            continue
+    Room.query.filter(Room.id.in_([int(room_id) for room_id in room_ids])).delete(synchronize_session=False)
+    db.session.commit()
 
-        # Do not delete brand-new rooms immediately. Give the host time to enter.
-        if room.last_updated and room.last_updated > cutoff:
-            continue
 
-        room_occupancy.pop(room_id, None)
-        room_states.pop(room_id, None)
+def _transfer_host_after_grace(room_id, old_host_username):
+    # Host came back during the grace period.
+    users = presence.room_users(room_id)
+    if old_host_username in users:
+        return
 
-        db.session.delete(room)
-        deleted_any = True
+    if not users:
+        _delete_rooms([room_id])
+        return
 
-    if deleted_any:
-        db.session.commit()
+    room = Room.query.get(int(room_id))
+    if not room:
+        return
 
-def _schedule_host_transfer(room_id, leaving_username):
-    room_id = _room_key(room_id)
-    app = current_app._get_current_object()
-
-    def transfer_after_grace(target_room_id, old_host_username):
-        socketio.sleep(HOST_TRANSFER_GRACE_SECONDS)
-
-        # Host came back during the grace period.
-        if old_host_username in _unique_room_users(target_room_id):
-            return
-
-        users = _unique_room_users(target_room_id)
-        if not users:
-            with app.app_context():
-                room_occupancy.pop(target_room_id, None)
-                room_states.pop(target_room_id, None)
-                room_to_delete = Room.query.get(int(target_room_id))
-                if room_to_delete:
-                    db.session.delete(room_to_delete)
-                    db.session.commit()
-            return
-
-        with app.app_context():
-            room = Room.query.get(int(target_room_id))
-            if not room:
-                return
+    from app.models import User
 
-            from app.models import User
+    new_host_username = users[0]
+    new_host_user = User.query.filter_by(username=new_host_username).first()
+    if not new_host_user:
+        return
 
-            new_host_username = users[0]
-            new_host_user = User.query.filter_by(username=new_host_username).first()
-            if not new_host_user:
-                return
+    room.host_id = new_host_user.id
+    db.session.commit()
+    room_registry.set_host(room_id, new_host_user)
 
-            room.host_id = new_host_user.id
-            db.session.commit()
+    socketio.emit("host_changed", {"new_host": new_host_username}, to=f"room_{room_id}")
 
-        socketio.emit("host_changed", {"new_host": new_host_username}, to=f"room_{target_room_id}")
-        _emit_room_users(target_room_id)
 
-    socketio.start_background_task(transfer_after_grace, room_id, leaving_username)
+room_reaper.empty_grace = ROOM_EMPTY_GRACE_SECONDS
+room_reaper.occupied_provider = presence.room_has_users
+room_reaper.delete_rooms = _delete_rooms
+room_reaper.transfer_host = _transfer_host_after_grace
 
 
 # --- SOCKET.IO: CONNECTION / USER TRACKING ---
 @socketio.on("connect")
 def sio_connect():
     username = current_user.username if current_user.is_authenticated else "Guest"
-    connected_sids[request.sid] = username
-    online_users.add(username)
-    online_last_seen[username] = _now()
-    socketio.emit("update_users", sorted(list(online_users)))
+    if presence.connect(request.sid, username):
+        presence_broadcaster.changed("online")
 
 
 @socketio.on("join_live_tv")
@@ -274,14 +249,35 @@ def handle_join_live_tv():
     join_room("live_tv")
 
     username = current_user.username if current_user.is_authenticated else "Guest"
-    live_tv_occupancy[request.sid] = username
+    if presence.join_live_tv(request.sid, username):
+        presence_broadcaster.changed("live_tv")
+
+    emit("live_tv_users_update", presence_broadcaster.snapshot("live_tv"), to=request.sid)
 
-    _emit_live_tv_users()
+
+@socketio.on("watch_live_tv_channel")
+def handle_watch_live_tv_channel(data):
+    if not presence.is_on_live_tv(request.sid):
+        return
+
+    try:
+        channel_id = int((data or {}).get("channel_id"))
+    except (TypeError, ValueError):
+        return
+
+    if presence.watch_channel(request.sid, channel_id):
+        streamer.touch(channel_id)
 
 
 @socketio.on("request_live_tv_users")
 def handle_request_live_tv_users():
-    emit("live_tv_users_update", _unique_live_tv_users())
+    emit("live_tv_users_update", presence_broadcaster.snapshot("live_tv"))
+
+@socketio.on("join_rooms_landing")
+def handle_join_rooms_landing():
+    join_room("rooms_landing")
+    emit("rooms_list", room_directory.snapshot(), to=request.sid)
+
 
 @socketio.on("join_watch_room")
 def on_join_watch_room(data):
@@ -289,7 +285,7 @@ def on_join_watch_room(data):
     if not room_id:
         return
 
-    room = Room.query.get(int(room_id))
+    room = room_registry.get(room_id)
     if not room:
         emit("room_missing", {"room_id": room_id, "message": "Room no longer exists."}, to=request.sid)
         return
@@ -297,15 +293,15 @@ def on_join_watch_room(data):
     join_room(f"room_{room_id}")
 
     username = current_user.username if current_user.is_authenticated else "Guest"
-    sid_to_room[request.sid] = room_id
-
-    if room_id not in room_occupancy:
-        room_occupancy[room_id] = {}
-    room_occupancy[room_id][request.sid] = username
-    room.last_updated = datetime.utcnow()
-    db.session.commit()
+    joined, previous_room_id, left_previous = presence.join_room(request.sid, room_id, username)
+    if left_previous:
+        presence_broadcaster.changed(_room_audience(previous_room_id))
+    if joined:
+        presence_broadcaster.changed(_room_audience(room_id))
+    room_state_writer.touch(room_id)
+    room_reaper.room_joined(room_id, username)
 
-    _emit_room_users(room_id)
+    emit("room_users_update", presence_broadcaster.snapshot(_room_audience(room_id)), to=request.sid)
 
     game_state = room_states.get(room_id, {})
     if game_state.get("status") == "game":
@@ -322,41 +318,37 @@ def on_join_watch_room(data):
 
 @socketio.on("disconnect")
 def sio_disconnect(reason=None):
-    # 1. Standard User Tracking Cleanup
-    username = connected_sids.pop(request.sid, None)
-    if username and username not in connected_sids.values():
-        online_users.discard(username)
-        online_last_seen.pop(username, None)
-
-    socketio.emit("update_users", sorted(list(online_users)))
+    # 1. Standard User Tracking + Live TV Presence Cleanup
+    left, went_offline, left_live_tv, room_id, left_room = presence.disconnect(request.sid)
+    if left is None:
+        return
+    leaving_username = left.username
 
-    # 1B. Live TV Presence Cleanup
-    if request.sid in live_tv_occupancy:
-        live_tv_occupancy.pop(request.sid, None)
-        _emit_live_tv_users()
+    if went_offline:
+        presence_broadcaster.changed("online")
+    if left_live_tv:
+        presence_broadcaster.changed("live_tv")
 
     # 2. Watch Together Room Occupancy Cleanup
-    room_id = sid_to_room.pop(request.sid, None)
-
     # Important:
     # If this socket was only on Live TV, it will not have a Watch Together room.
-    if not room_id or room_id not in room_occupancy:
+    if not room_id:
         return
 
-    leaving_username = room_occupancy[room_id].pop(request.sid, None)
+    # Reported even for the last user out, so the room's user list and the
+    # landing page count do not go stale while the room waits to be reaped.
+    if left_room:
+        presence_broadcaster.changed(_room_audience(room_id))
 
     # 3. If room is empty, wait before deleting. This avoids deleting during refresh.
-    if len(room_occupancy[room_id]) == 0:
-        _emit_room_users(room_id)
-        _schedule_empty_room_cleanup(room_id)
+    if not presence.room_has_users(room_id):
+        room_reaper.schedule_empty(room_id)
         return
 
     # 4. If the host disconnected, wait before transferring. This avoids transfer during refresh.
-    room = Room.query.get(int(room_id))
-    if room and room.host and room.host.username == leaving_username:
-        _schedule_host_transfer(room_id, leaving_username)
-
-    _emit_room_users(room_id)
+    room = room_registry.get(room_id)
+    if room and room.host_username == leaving_username:
+        room_reaper.schedule_host_transfer(room_id, leaving_username, HOST_TRANSFER_GRACE_SECONDS)
 
 
 @socketio.on("transfer_host")
@@ -364,22 +356,22 @@ def handle_transfer_host(data):
     room_id = _room_key(data.get('room_id'))
     new_host_username = data.get('new_host')
 
-    room = Room.query.get(int(room_id))
-    if room and current_user.is_authenticated and str(room.host_id) == str(current_user.id):
+    if _is_current_user_room_host(room_id):
         from app.models import User
 
         new_user = User.query.filter_by(username=new_host_username).first()
-        if new_user:
+        room = Room.query.get(int(room_id))
+        if new_user and room:
             room.host_id = new_user.id
             db.session.commit()
+            room_registry.set_host(room_id, new_user)
 
             socketio.emit("host_changed", {"new_host": new_host_username}, to=f"room_{room_id}")
-            _emit_room_users(room_id)
 
 
 @socketio.on("chat_message")
 def sio_chat_message(message):
-    username = connected_sids.get(request.sid) or (
+    username = presence.username(request.sid) or (
         current_user.username if current_user.is_authenticated else "Guest"
     )
 
@@ -401,7 +393,16 @@ def sio_chat_message(message):
 
 @socketio.on("request_users")
 def sio_request_users():
-    emit("update_users", sorted(list(online_users)))
+    emit("update_users", presence_broadcaster.snapshot("online"))
+
+
+@socketio.on("request_room_users")
+def sio_request_room_users(data):
+    room_id = _room_key((data or {}).get("room_id"))
+    if presence.room_of(request.sid) != room_id:
+        return
+
+    emit("room_users_update", presence_broadcaster.snapshot(_room_audience(room_id)))
 
 
 # --- STANDARD ROUTES ---
@@ -419,57 +420,121 @@ def live_tv():
 @main_bp.route('/plex-watch-together')
 @login_required
 def plex_landing():
-    _cleanup_stale_empty_rooms()
-    rooms = Room.query.order_by(Room.id.desc()).all()
-    return render_template('plex_landing.html', rooms=rooms)
+    # Picks up rooms left empty by a restart; cleanup itself runs in the background.
+    room_reaper.ensure_started()
+    listing = room_directory.snapshot()
+    return render_template('plex_landing.html', rooms=listing["rooms"], rooms_version=listing["version"])
 
 
 # --- API: CHANNELS & PLAYBACK ---
 @main_bp.route('/api/channels')
 @login_required
 def get_channels():
-    channels = Channel.query.all()
-    channel_list = []
-    for channel in channels:
-        channel_list.append({
-            'id': channel.id,
-            'name': channel.name,
-            'url': channel.url,
-            'Favorites': str(channel.favorites).lower() in ['1', 'true', 'yes'],
-            'is_playing': str(channel.is_playing).lower() in ['1', 'true', 'yes'],
-            'logo': channel.logo
-        })
-    return jsonify(channel_list)
+    # Without search/paging parameters the full list is returned, as before.
+    paged = any(key in request.args for key in ('q', 'favorites', 'offset', 'limit'))
+
+    if paged:
+        q = request.args.get('q', '').strip()
+        favorites = request.args.get('favorites', '').lower() in ['1', 'true', 'yes']
+        offset = max(0, request.args.get('offset', 0, type=int))
+        limit = min(max(1, request.args.get('limit', 100, type=int)), 500)
+        etag = channel_directory.query_etag(q, favorites, offset, limit)
+    else:
+        body, etag = channel_directory.full_list()
+
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    elif paged:
+        items, total = channel_directory.search(q, favorites, offset, limit)
+        response = jsonify({'items': items, 'total': total, 'offset': offset, 'limit': limit})
+    else:
+        response = Response(body, mimetype='application/json')
+
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
 
 
 @main_bp.route('/api/play/<int:channel_id>', methods=['POST'])
 @login_required
 def play_channel(channel_id):
     channel = Channel.query.get_or_404(channel_id)
-    Channel.query.update({Channel.is_playing: '0'})
-    channel.is_playing = '1'
-    db.session.commit()
+    streamer.set_now_playing(channel.id, channel.name, channel.logo)
+
+    # Startup finishes in the background; the client waits for the
+    # stream_ready / stream_failed socket event carrying this job id.
+    job = streamer.start_stream(channel.id, channel.url, channel.name)
+    if job.status == 'failed':
+        return jsonify({'error': job.message, **job.to_dict()}), 500
 
-    success, msg = streamer.start_stream(channel.id, channel.url, channel.name)
-    if success:
-        socketio.emit('channel_changed', {'channel_id': channel.id, 'name': channel.name})
-        return jsonify({'status': 'success', 'message': msg})
+    return jsonify(job.to_dict()), 202
 
-    return jsonify({'error': msg}), 500
+
+@main_bp.route('/api/play/jobs/<job_id>')
+@login_required
+def play_job_status(job_id):
+    job = streamer.get_job(job_id)
+    if not job:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job.to_dict())
+
+
+@main_bp.route('/api/encoder_profiles')
+@login_required
+def list_encoder_profiles():
+    return jsonify(profiles.to_list())
+
+
+@main_bp.route('/api/channels/<int:channel_id>/encoder_profile', methods=['POST'])
+@login_required
+def set_channel_encoder_profile(channel_id):
+    if not current_user.is_superuser:
+        return jsonify({'error': 'Only admins can change encoder profiles'}), 403
+
+    Channel.query.get_or_404(channel_id)
+    profile_name = (request.get_json() or {}).get('profile')
+
+    try:
+        profiles.set_channel_profile(channel_id, profile_name)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Takes effect the next time the channel's stream is started.
+    return jsonify({'success': True, 'profile': profiles.profile_for_channel(channel_id).name})
 
 
 @main_bp.route('/api/status')
 @login_required
 def api_status():
-    active_channel = Channel.query.filter(
-        (Channel.is_playing == '1') | (Channel.is_playing == 'true')
-    ).first()
+    now_playing = streamer.get_now_playing()
+    stream = streamer.get_stream(now_playing['channel_id']) if now_playing else None
 
     return jsonify({
-        "is_streaming": active_channel is not None,
-        "current_channel_id": active_channel.id if active_channel else None,
-        "current_channel_name": active_channel.name if active_channel else None,
-        "current_channel_logo": active_channel.logo if active_channel else None,
+        # The idle reaper may have stopped the last picked channel.
+        "is_streaming": stream is not None and stream.is_alive(),
+        "current_channel_id": now_playing['channel_id'] if now_playing else None,
+        "current_channel_name": now_playing['name'] if now_playing else None,
+        "current_channel_logo": now_playing['logo'] if now_playing else None,
+        "stream_mode": stream.mode if stream else None,
+        "low_latency": stream.low_latency if stream else streamer.low_latency,
+        "active_streams": [s.to_dict() for s in streamer.streams.values()],
+        "segment_cache": segment_cache.stats(),
+        "plex": plex_client.health(),
+        "plex_cache": plex_cache.stats(),
+        "poster_cache": poster_cache.stats(),
+        "plex_index": plex_index.stats(),
+        "room_transcodes": room_transcodes.stats(),
+        "transcode_proxy": transcode_proxy.stats(),
+        "room_state_writer": room_state_writer.stats(),
+        "room_registry": room_registry.stats(),
+        "presence": presence.stats(),
+        "presence_broadcaster": presence_broadcaster.stats(),
+        "room_reaper": room_reaper.stats(),
+        "room_directory": room_directory.stats(),
+        "rom_catalog": rom_catalog.stats(),
+        "rom_delivery": rom_delivery.stats(),
+        "static_assets": static_assets.stats(),
     })
 
 
@@ -477,39 +542,147 @@ def api_status():
 @main_bp.route('/api/heartbeat', methods=['POST'])
 def heartbeat():
     if current_user.is_authenticated:
-        username = current_user.username
-        online_users.add(username)
-        online_last_seen[username] = _now()
+        presence.heartbeat(current_user.username)
     return jsonify({'status': 'alive'})
 
 
 @main_bp.route('/api/online_users')
 def get_online_users():
-    now = _now()
-    cutoff = now - 15
-    to_remove = [u for u, ts in online_last_seen.items() if ts < cutoff]
+    return jsonify(presence.online_users(stale_after=ONLINE_HEARTBEAT_TIMEOUT_SECONDS))
+
 
-    for user in to_remove:
-        online_users.discard(user)
-        online_last_seen.pop(user, None)
+# --- PLEX TRANSCODE PROXY ---
+def _proxy_cache_control(response, path):
+    if is_playlist(path):
+        response.cache_control.no_cache = True
+    else:
+        response.cache_control.private = True
+        response.cache_control.max_age = transcode_proxy.segment_ttl
+    return response
+
+
+@main_bp.route(f'{PROXY_PREFIX}/<path:subpath>')
+@login_required
+def plex_transcode_proxy(subpath):
+    # Never an open proxy: the server token is only spent on the transcoder.
+    subpath = upstream_path(subpath)
+    if subpath is None:
+        return "Not found", 404
+
+    query = list(request.args.items(multi=True))
+    key = transcode_proxy.cache_key(subpath, query)
+
+    entry = transcode_proxy.cached(key, subpath)
+    if entry:
+        return _proxy_cache_control(Response(entry.data, mimetype=entry.mimetype), subpath)
+
+    _, fetch = transcode_proxy.open(subpath, query)
+
+    # Playlists need their full body to be rewritten; segments stream as they arrive.
+    if is_playlist(subpath):
+        body = fetch.wait_for_body()
+        if body is None:
+            return "Plex transcode unavailable", 502
+        response = Response(body, status=fetch.status, mimetype=fetch.mimetype)
+    else:
+        if not fetch.wait_for_headers():
+            return "Plex transcode unavailable", 502
+        response = Response(fetch.follow(), status=fetch.status, mimetype=fetch.mimetype)
 
-    return jsonify(sorted(list(online_users)))
+    return _proxy_cache_control(response, subpath)
 
 
 # --- STATIC & STREAM SERVING ---
+def _stream_cache_control(response, filename):
+    # Playlists change every segment; segment names are unique per ffmpeg run.
+    if filename.endswith('.m3u8'):
+        response.cache_control.no_cache = True
+        response.cache_control.max_age = None
+    else:
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = 60
+    return response
+
+
+def _read_stream_file(key):
+    cached = segment_cache.get(key)
+    if cached:
+        return cached.data
+    try:
+        with open(os.path.join(streamer.stream_root, *key.split('/')), 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _serve_ll_playlist(stream, channel_key):
+    """LL-HLS media playlist with blocking reload (_HLS_msn / _HLS_part)."""
+    msn = request.args.get('_HLS_msn', type=int)
+    part = request.args.get('_HLS_part', type=int)
+
+    if part is not None and msn is None:
+        return "_HLS_part requires _HLS_msn", 400
+
+    if msn is not None:
+        last_msn = max(stream.last_part_index, 0) // llhls.PARTS_PER_SEGMENT
+        if msn > last_msn + 2:
+            return "Requested segment is too far in the future", 400
+
+        target = msn * llhls.PARTS_PER_SEGMENT + (part if part is not None else llhls.PARTS_PER_SEGMENT - 1)
+        if not streamer.wait_for_part(stream, target):
+            return "Part not available", 503
+
+    parts_text = _read_stream_file(f"{channel_key}/{llhls.PARTS_PLAYLIST}")
+    if parts_text is None:
+        return "Playlist not ready", 404
+
+    body = llhls.build_playlist(llhls.parse_parts_playlist(parts_text.decode('utf-8', errors='replace')))
+    response = Response(body, mimetype=guess_mimetype('index.m3u8'))
+    response.set_etag(f"{zlib.crc32(body.encode('utf-8')):08x}")
+    _stream_cache_control(response, 'index.m3u8')
+    return response.make_conditional(request)
+
+
+def _serve_ll_segment(stream, channel_key, msn):
+    """A full LL-HLS segment is its parts back to back (each is moof+mdat)."""
+    chunks = []
+    for index in llhls.part_indexes_for_segment(msn):
+        data = _read_stream_file(f"{channel_key}/part_{stream.session_id}_{index:05d}.m4s")
+        if data is None:
+            return "Segment not available", 404
+        chunks.append(data)
+
+    response = Response(b"".join(chunks), mimetype=guess_mimetype('.m4s'))
+    return _stream_cache_control(response, f"{msn}.m4s")
+
+
 @main_bp.route('/stream/<path:filename>')
 def serve_stream(filename):
-    stream_directory = os.path.join(current_app.root_path, 'static', 'stream')
-    mimetype = 'video/mp2t'
-    if filename.endswith('.m3u8'):
-        mimetype = 'application/vnd.apple.mpegurl'
-    return send_from_directory(stream_directory, filename, mimetype=mimetype, max_age=0)
+    channel_key, _, name = filename.partition('/')
+    stream = streamer.get_stream(int(channel_key)) if channel_key.isdigit() else None
+
+    if stream and stream.low_latency:
+        if name == 'index.m3u8':
+            return _serve_ll_playlist(stream, channel_key)
+        msn = llhls.parse_segment_uri(name)
+        if msn is not None:
+            return _serve_ll_segment(stream, channel_key, msn)
+
+    cached = segment_cache.get(filename)
+    if cached:
+        response = Response(cached.data, mimetype=cached.mimetype)
+        response.set_etag(cached.etag)
+        _stream_cache_control(response, filename)
+        return response.make_conditional(request)
+
+    response = send_from_directory(streamer.stream_root, filename, mimetype=guess_mimetype(filename), max_age=0)
+    return _stream_cache_control(response, filename)
 
 
 @main_bp.route('/static/<path:filename>')
 def custom_static_handler(filename):
-    static_dir = os.path.join(current_app.root_path, 'static')
-    return send_from_directory(static_dir, filename)
+    return static_assets.response(filename)
 
 
 # --- PLEX WATCH PARTY ROUTES ---
@@ -525,6 +698,9 @@ def create_room():
     new_room = Room(name=room_name, host_id=current_user.id)
     db.session.add(new_room)
     db.session.commit()
+    room_registry.add(new_room)
+    # Give the host time to enter; joining cancels this.
+    room_reaper.schedule_empty(new_room.id)
 
     return jsonify({'success': True, 'redirect_url': url_for('main.room_view', room_id=new_room.id)})
 
@@ -533,6 +709,8 @@ def create_room():
 @login_required
 def room_view(room_id):
     room = Room.query.get_or_404(room_id)
+    # Build the search index before anyone in the room starts typing.
+    plex_index.ensure_started()
     return render_template('room.html', room=room)
 
 
@@ -543,10 +721,6 @@ def search_plex_library():
     if not query:
         return jsonify([])
 
-    plex = get_plex_server()
-    if not plex:
-        return jsonify({'error': 'Could not connect to Plex Server'}), 500
-
     rating_key = None
     if 'key=' in query:
         try:
@@ -560,6 +734,21 @@ def search_plex_library():
     elif query.isdigit():
         rating_key = query
 
+    # Title searches come from the local index; Plex is only asked for
+    # ratingKey lookups, or while the index is still being built.
+    plex_index.ensure_started()
+    if not rating_key and plex_index.ready:
+        return jsonify(plex_index.search(query))
+
+    cache_key = ('search', query)
+    cached = plex_cache.get(cache_key)
+    if cached is not None:
+        return jsonify(cached)
+
+    plex = get_plex_server()
+    if not plex:
+        return jsonify({'error': 'Could not connect to Plex Server'}), 500
+
     try:
         if rating_key:
             try:
@@ -568,7 +757,8 @@ def search_plex_library():
                 results = plex.search(query)
         else:
             results = plex.search(query)
-    except Exception:
+    except Exception as e:
+        plex_client.report_error(e)
         return jsonify({'error': 'Search failed'}), 500
 
     output = []
@@ -584,6 +774,7 @@ def search_plex_library():
             'type': item.type.capitalize()
         })
 
+    plex_cache.put(cache_key, output)
     return jsonify(output)
 
 
@@ -594,39 +785,92 @@ def get_plex_children():
     if not rating_key:
         return jsonify([])
 
+    cache_key = ('children', str(rating_key))
+    cached = plex_cache.get(cache_key)
+    if cached is not None:
+        return jsonify(cached)
+
     plex = get_plex_server()
+    if not plex:
+        return jsonify({'error': 'Could not connect to Plex Server'}), 500
+
     try:
-        parent = plex.fetchItem(int(rating_key))
-        if parent.type == 'show':
-            children = parent.seasons()
-        elif parent.type == 'season':
-            children = parent.episodes()
-        else:
-            return jsonify([])
+        elements = plex_browse.query_children(plex, rating_key)
+        results = plex_browse.fetch_children(plex, rating_key, elements)
     except Exception as e:
+        plex_client.report_error(e)
         return jsonify({'error': str(e)}), 500
 
-    results = []
-    for item in children:
-        title = item.title
-        if item.type == 'season':
-            title = f"Season {item.index}"
-        if item.type == 'episode':
-            show_title = getattr(parent, 'parentTitle', 'Unknown Show')
-            title = f"{show_title}, S{item.seasonNumber}:E{item.index} - {item.title}"
-
-        results.append({
-            'title': title,
-            'year': getattr(item, 'year', ''),
-            'thumb': item.thumb if item.thumb else parent.thumb,
-            'key': item.ratingKey,
-            'type': item.type.capitalize(),
-            'parent_title': parent.title
-        })
+    # Looking at a show's seasons: load every season's episodes ahead of the
+    # click. The seasons are already here, so only /allLeaves is fetched.
+    if results and results[0]['type'] == 'Season':
+        plex_browse.prefetch_show(rating_key, elements)
 
     return jsonify(results)
 
 
+MAX_TREE_KEYS = 20
+
+
+@main_bp.route('/api/plex/tree')
+@login_required
+def get_plex_tree():
+    """
+    Children of several shows/seasons in one response: {ratingKey: children}.
+    A show key also brings back the episodes of every one of its seasons.
+    """
+    keys = [k.strip() for k in request.args.get('keys', '').split(',') if k.strip().isdigit()][:MAX_TREE_KEYS]
+    if not keys:
+        return jsonify({'children': {}})
+
+    tree = {}
+    missing = []
+    for key in keys:
+        cached = plex_browse.cached_tree(key)
+        if cached is None:
+            missing.append(key)
+        else:
+            tree.update(cached)
+
+    if missing:
+        plex = get_plex_server()
+        if not plex:
+            return jsonify({'error': 'Could not connect to Plex Server'}), 500
+
+        try:
+            for key in missing:
+                tree.update(plex_browse.fetch_show_tree(plex, key))
+        except Exception as e:
+            plex_client.report_error(e)
+            return jsonify({'error': str(e)}), 500
+
+    return jsonify({'children': tree})
+
+
+POSTER_WIDTH = 300
+POSTER_HEIGHT = 450
+
+
+def _poster_headers(response, key):
+    # The key covers the thumb path, which changes whenever Plex updates the art.
+    response.set_etag(key)
+    response.cache_control.private = True
+    response.cache_control.max_age = 365 * 24 * 3600
+    response.cache_control.immutable = True
+    return response
+
+
+def _cached_poster_response(key):
+    entry, data = poster_cache.lookup(key)
+    if entry is None:
+        return None
+    if data is None:
+        data = poster_cache.read(entry)
+        if data is None:
+            return None
+    return _poster_headers(Response(data, mimetype=entry.mimetype), key)
+
+
 @main_bp.route('/api/plex/image')
 @login_required
 def proxy_plex_image():
@@ -634,17 +878,182 @@ def proxy_plex_image():
     if not thumb_path:
         return "Missing path", 400
 
+    key = poster_key(thumb_path, POSTER_WIDTH, POSTER_HEIGHT)
+    if key in request.if_none_match:
+        return _poster_headers(Response(status=304), key)
+
+    response = _cached_poster_response(key)
+    if response:
+        return response
+
     plex = get_plex_server()
+    if not plex:
+        return "Plex unavailable", 503
+
     try:
-        img_url = plex.transcodeImage(thumb_path, height=450, width=300, minSize=1, upscale=1)
-        resp = requests.get(img_url, stream=True)
-        return Response(
-            resp.content,
-            status=resp.status_code,
-            content_type=resp.headers.get('content-type', 'image/jpeg')
-        )
-    except Exception:
-        return "Error", 500
+        img_url = plex.transcodeImage(thumb_path, height=POSTER_HEIGHT, width=POSTER_WIDTH, minSize=1, upscale=1)
+    except Exception as e:
+        plex_client.report_error(e)
+        return "Error", 502
+
+    # A second attempt covers a merged fetch whose leader failed or disconnected.
+    for _ in range(2):
+        pending, is_leader = poster_cache.claim(key)
+        if not is_leader:
+            if poster_cache.wait(pending):
+                response = _cached_poster_response(key)
+                if response:
+                    return response
+            continue
+
+        try:
+            resp, download = poster_cache.fetch(key, pending, img_url)
+        except Exception as e:
+            plex_client.report_error(e)
+            return "Error", 502
+
+        if download is None:
+            status = resp.status_code
+            resp.close()
+            return "Error", status
+
+        response = Response(download, mimetype=resp.headers.get('content-type', 'image/jpeg'))
+        # Runs however the response ends (HEAD, disconnect), so followers never hang.
+        response.call_on_close(download.close)
+        if resp.headers.get('content-length'):
+            response.headers['Content-Length'] = resp.headers['content-length']
+        return _poster_headers(response, key)
+
+    return "Error", 502
+
+
+def _transcode_params(item, transcode, view_offset, audio_id, subtitle_id):
+    params = {
+        'path': item.key,
+        'mediaIndex': 0,
+        'partIndex': 0,
+        'protocol': 'hls',
+        'fastSeek': 1,
+        'directPlay': 0,
+        'directStream': 0,
+        'autoSelectAudio': 0,
+        'subtitleSize': 100,
+        'audioBoost': 100,
+        'maxVideoBitrate': 8000,
+        'workaround': 'nvidia-shallow',
+        'copyts': 1,
+        'session': transcode.session_id,
+        'X-Plex-Token': plex_client.token,
+        'X-Plex-Client-Identifier': transcode.client_id,
+        'X-Plex-Product': 'PeakDecline',
+        'X-Plex-Device': 'Web'
+    }
+
+    if view_offset > 0:
+        params['viewOffset'] = view_offset
+    if audio_id:
+        params['audioStreamID'] = audio_id
+    if subtitle_id:
+        params['subtitleStreamID'] = subtitle_id
+    elif subtitle_id == "":
+        params['subtitleStreamID'] = 0
+
+    return params
+
+
+def _prepare_room_media(app, room_id, job_id, rating_key, view_offset, audio_id, subtitle_id):
+    """Background half of set_room_media; ends with media_updated or media_failed."""
+    room_key = _room_key(room_id)
+    transcode = None
+    went_live = False
+
+    with app.app_context():
+        try:
+            plex = get_plex_server()
+            if not plex:
+                raise RuntimeError('Plex unavailable')
+
+            item = plex.fetchItem(int(rating_key))
+
+            if plex_media.apply_stream_selection(plex, item, audio_id, subtitle_id):
+                plex_media.wait_for_selection(plex, rating_key, audio_id, subtitle_id)
+                # The selected audio/subtitle flags just changed.
+                plex_cache.discard(('metadata', str(rating_key)))
+
+            endpoint = "/video/:/transcode/universal/start.m3u8"
+            transcode = room_transcodes.new_session(room_key, rating_key)
+            params = _transcode_params(item, transcode, view_offset, audio_id, subtitle_id)
+            # Viewers go through the built-in proxy, which adds the token upstream.
+            client_params = {k: v for k, v in params.items() if k != 'X-Plex-Token'}
+            full_url = f"{PROXY_PREFIX}{endpoint}?{urlencode(client_params)}"
+
+            if item.type == 'episode':
+                show_title = getattr(item, 'grandparentTitle', 'Unknown Show')
+                title_str = f"{show_title}, S{item.seasonNumber}:E{item.index} - {item.title}"
+            else:
+                title_str = f"{item.title} ({item.year})"
+
+            plex_media.prewarm_transcode(endpoint, params)
+
+            # The host picked something else while this one was being prepared.
+            if room_media_jobs.get(room_key) != job_id:
+                return
+
+            room = Room.query.get(room_id)
+            if not room:
+                return
+
+            room_state_writer.discard(room_key)
+            room.current_media_key = str(rating_key)
+            room.current_media_url = full_url
+            room.current_media_title = title_str
+            room.is_playing = True
+            room.current_time = view_offset
+            room.last_updated = datetime.utcnow()
+            db.session.commit()
+            room_registry.set_media(room)
+            room_registry.set_playback(room_key, True, view_offset)
+
+            # Replaces (and stops) the transcode of whatever was playing before.
+            room_transcodes.activate(room_key, transcode)
+            went_live = True
+
+            current_epoch = _now()
+            room_states[room_key] = {
+                'start_time': current_epoch,
+                'offset': view_offset,
+                'status': 'playing'
+            }
+
+            socketio.emit('media_updated', {
+                'room_id': room.id,
+                'url': full_url,
+                'title': room.current_media_title,
+                'rating_key': str(rating_key),
+                'start_time': view_offset,
+                'offset': view_offset,
+                'status': 'playing',
+                'is_playing': True,
+                'server_epoch': current_epoch,
+                'job_id': job_id
+            }, to=f"room_{room_key}")
+
+        except Exception as e:
+            plex_client.report_error(e)
+            print(f"Error setting media: {e}")
+            if room_media_jobs.get(room_key) == job_id:
+                socketio.emit('media_failed', {
+                    'room_id': room_id,
+                    'rating_key': str(rating_key),
+                    'job_id': job_id,
+                    'error': str(e)
+                }, to=f"room_{room_key}")
+        finally:
+            # Superseded or failed after the pre-warm started it on Plex.
+            if transcode and not went_live:
+                room_transcodes.discard(transcode)
+            if room_media_jobs.get(room_key) == job_id:
+                room_media_jobs.pop(room_key, None)
 
 
 @main_bp.route('/api/room/<room_id>/set_media', methods=['POST'])
@@ -656,127 +1065,51 @@ def set_room_media(room_id):
     if not rating_key:
         return jsonify({'error': 'Missing rating_key'}), 400
 
-    room = Room.query.get(room_id)
+    room = room_registry.get(room_id)
     if not room:
         return jsonify({'error': 'Room not found'}), 404
 
-    if str(room.host_id) != str(current_user.id):
+    if not room_registry.is_host(room_id, current_user.id):
         return jsonify({'error': 'Only the host can change media'}), 403
 
+    if not get_plex_server():
+        return jsonify({'error': 'Plex unavailable'}), 500
+
     view_offset = float(data.get('view_offset', 0) or 0)
     audio_id = data.get('audio_stream_id')
     subtitle_id = data.get('subtitle_stream_id')
 
-    plex = get_plex_server()
-    if not plex:
-        return jsonify({'error': 'Plex unavailable'}), 500
+    # Stream selection and transcode start-up happen in the background;
+    # the room sees media_preparing now and media_updated when it is ready.
+    job_id = uuid.uuid4().hex[:12]
+    room_media_jobs[_room_key(room.id)] = job_id
 
-    try:
-        item = plex.fetchItem(int(rating_key))
-
-        changes_made = False
-        for part in item.iterParts():
-            if audio_id:
-                target_stream = next((s for s in part.audioStreams() if str(s.id) == str(audio_id)), None)
-                if target_stream:
-                    part.setSelectedAudioStream(target_stream)
-                    changes_made = True
-
-            if subtitle_id:
-                target_stream = next((s for s in part.subtitleStreams() if str(s.id) == str(subtitle_id)), None)
-                if target_stream:
-                    part.setSelectedSubtitleStream(target_stream)
-                    changes_made = True
-            elif subtitle_id == "":
-                plex.query(f'/library/parts/{part.id}?subtitleStreamID=0&allParts=1', method=plex._session.put)
-                changes_made = True
-
-        if changes_made:
-            time.sleep(0.5)
-            item.reload()
-
-        unique_ts = int(_now())
-        session_id = f"room-{room_id}-{unique_ts}"
-        client_id = f"peak-decline-room-{room_id}-{unique_ts}"
-
-        params = {
-            'path': item.key,
-            'mediaIndex': 0,
-            'partIndex': 0,
-            'protocol': 'hls',
-            'fastSeek': 1,
-            'directPlay': 0,
-            'directStream': 0,
-            'autoSelectAudio': 0,
-            'subtitleSize': 100,
-            'audioBoost': 100,
-            'maxVideoBitrate': 8000,
-            'workaround': 'nvidia-shallow',
-            'copyts': 1,
-            'session': session_id,
-            'X-Plex-Token': plex._token,
-            'X-Plex-Client-Identifier': client_id,
-            'X-Plex-Product': 'PeakDecline',
-            'X-Plex-Device': 'Web'
-        }
-
-        if view_offset > 0:
-            params['viewOffset'] = view_offset
-        if audio_id:
-            params['audioStreamID'] = audio_id
-        if subtitle_id:
-            params['subtitleStreamID'] = subtitle_id
-        elif subtitle_id == "":
-            params['subtitleStreamID'] = 0
-
-        endpoint = "/video/:/transcode/universal/start.m3u8"
-        base_url = "/plex-transcode"
-        full_url = f"{base_url}{endpoint}?{urlencode(params)}"
-
-        if item.type == 'episode':
-            show_title = getattr(item, 'grandparentTitle', 'Unknown Show')
-            title_str = f"{show_title}, S{item.seasonNumber}:E{item.index} - {item.title}"
-        else:
-            title_str = f"{item.title} ({item.year})"
+    socketio.emit('media_preparing', {
+        'room_id': room.id,
+        'rating_key': str(rating_key),
+        'job_id': job_id
+    }, to=f"room_{_room_key(room.id)}")
 
-        room.current_media_key = str(rating_key)
-        room.current_media_url = full_url
-        room.current_media_title = title_str
-        room.is_playing = True
-        room.current_time = view_offset
-        room.last_updated = datetime.utcnow()
-        db.session.commit()
-
-        current_epoch = _now()
-        room_states[_room_key(room.id)] = {
-            'start_time': current_epoch,
-            'offset': view_offset,
-            'status': 'playing'
-        }
-
-        socketio.emit('media_updated', {
-            'room_id': room.id,
-            'url': full_url,
-            'title': room.current_media_title,
-            'rating_key': str(rating_key),
-            'start_time': view_offset,
-            'offset': view_offset,
-            'status': 'playing',
-            'is_playing': True,
-            'server_epoch': current_epoch
-        }, to=f"room_{_room_key(room.id)}")
-
-        return jsonify({'success': True, 'url': full_url})
+    socketio.start_background_task(
+        _prepare_room_media, current_app._get_current_object(), room.id, job_id,
+        rating_key, view_offset, audio_id, subtitle_id
+    )
 
-    except Exception as e:
-        print(f"Error setting media: {e}")
-        return jsonify({'error': str(e)}), 500
+    return jsonify({'success': True, 'preparing': True, 'job_id': job_id}), 202
 
 
 @main_bp.route('/api/plex/metadata/<rating_key>')
 @login_required
 def get_plex_metadata(rating_key):
+    cache_key = ('metadata', str(rating_key))
+    cached = plex_cache.get(cache_key)
+    if cached is not None:
+        return jsonify(cached)
+
     plex = get_plex_server()
+    if not plex:
+        return jsonify({'error': 'Could not connect to Plex Server'}), 500
+
     try:
         item = plex.fetchItem(int(rating_key))
         audio_streams = []
@@ -797,8 +1130,9 @@ def get_plex_metadata(rating_key):
                 'selected': stream.selected
             })
 
-        return jsonify({'audio': audio_streams, 'subtitles': subtitle_streams})
+        return jsonify(plex_cache.put(cache_key, {'audio': audio_streams, 'subtitles': subtitle_streams}))
     except Exception as e:
+        plex_client.report_error(e)
         print(f"Error fetching metadata: {e}")
         return jsonify({'error': str(e)}), 500
 
@@ -874,12 +1208,14 @@ def handle_host_started_game(data):
     if not _is_current_user_room_host(room_id):
         return
 
+    room_state_writer.discard(room_id)
     room = Room.query.get(int(room_id))
     if room:
         room.is_playing = False
         room.current_time = 0.0
         room.last_updated = datetime.utcnow()
         db.session.commit()
+    room_registry.set_playback(room_id, False, 0.0)
 
     room_states[room_id] = {
         'start_time': _now(),
@@ -887,6 +1223,8 @@ def handle_host_started_game(data):
         'status': 'game',
         'game_name': game_name
     }
+    # The room left Plex; nobody will fetch that transcode any more.
+    room_transcodes.stop(room_id)
 
     socketio.emit('host_started_game', {
         'room_id': room_id,
@@ -903,6 +1241,7 @@ def handle_host_stopped_game(data):
 
     # Clear game mode. Do not automatically reload stale Plex state.
     room_states.pop(room_id, None)
+    room_state_writer.discard(room_id)
 
     room = Room.query.get(int(room_id))
     if room:
@@ -910,6 +1249,7 @@ def handle_host_stopped_game(data):
         room.current_time = 0.0
         room.last_updated = datetime.utcnow()
         db.session.commit()
+    room_registry.set_playback(room_id, False, 0.0)
 
     socketio.emit('game_stopped', {
         'room_id': room_id
@@ -919,7 +1259,7 @@ def handle_host_stopped_game(data):
 @socketio.on('viewer_joined')
 def handle_viewer_joined(room_id):
     room_id = _room_key(room_id)
-    if sid_to_room.get(request.sid) != room_id:
+    if presence.room_of(request.sid) != room_id:
         return
 
     socketio.emit('viewer_joined', request.sid, to=f"room_{room_id}", include_self=False)
@@ -930,7 +1270,7 @@ def handle_webrtc_offer(data):
     target = data.get('target')
     room_id = _room_key(data.get('room_id'))
 
-    if not target or sid_to_room.get(request.sid) != room_id:
+    if not target or presence.room_of(request.sid) != room_id:
         return
 
     data['caller'] = request.sid
@@ -942,7 +1282,7 @@ def handle_webrtc_answer(data):
     target = data.get('target')
     room_id = _room_key(data.get('room_id'))
 
-    if not target or sid_to_room.get(request.sid) != room_id:
+    if not target or presence.room_of(request.sid) != room_id:
         return
 
     data['caller'] = request.sid
@@ -954,7 +1294,7 @@ def handle_webrtc_ice_candidate(data):
     target = data.get('target')
     room_id = _room_key(data.get('room_id'))
 
-    if not target or sid_to_room.get(request.sid) != room_id:
+    if not target or presence.room_of(request.sid) != room_id:
         return
 
     data['caller'] = request.sid
@@ -977,59 +1317,28 @@ def peakdecline_derby():
 @main_bp.route('/arcade/emulator')
 @login_required
 def emulator():
-    static_dir = current_app.static_folder
-    roms_dir = os.path.join(static_dir, 'roms')
-
-    library = {
-        'snes': [],
-        'n64': [],
-        'psx': []
-    }
-
-    if os.path.exists(roms_dir):
-        for root, dirs, files in os.walk(roms_dir):
-            for filename in files:
-                if filename.startswith('.'):
-                    continue
-
-                full_file_path = os.path.join(root, filename)
-                rel_path = os.path.relpath(full_file_path, static_dir)
-                filepath = rel_path.replace('\\', '/')
-                lower_path = filepath.lower()
-
-                if 'snes' in lower_path:
-                    library['snes'].append({'name': filename, 'path': filepath})
-                elif 'n64' in lower_path:
-                    library['n64'].append({'name': filename, 'path': filepath})
-                elif 'psx' in lower_path or 'ps1' in lower_path:
-                    library['psx'].append({'name': filename, 'path': filepath})
-                else:
-                    ext = filename.split('.')[-1].lower()
-                    if ext in ['smc', 'sfc']:
-                        library['snes'].append({'name': filename, 'path': filepath})
-                    elif ext in ['z64', 'n64', 'v64']:
-                        library['n64'].append({'name': filename, 'path': filepath})
-                    elif ext in ['bin', 'cue', 'chd']:
-                        library['psx'].append({'name': filename, 'path': filepath})
-
-    return render_template('emulator.html', library=library)
+    return render_template('emulator.html', library=rom_catalog.library())
 
 
 @main_bp.route('/api/roms/<system>')
 @login_required
 def api_get_roms(system):
-    static_dir = current_app.static_folder
-    roms_dir = os.path.join(static_dir, 'roms')
-    games = []
+    # Without search/paging parameters the full list is returned, as before.
+    if not any(key in request.args for key in ('q', 'offset', 'limit')):
+        games, _ = rom_catalog.search(system)
+        return jsonify(games)
 
-    if os.path.exists(roms_dir):
-        for root, dirs, files in os.walk(roms_dir):
-            for filename in files:
-                if filename.startswith('.'):
-                    continue
+    q = request.args.get('q', '').strip()
+    offset = max(0, request.args.get('offset', 0, type=int))
+    limit = min(max(1, request.args.get('limit', 100, type=int)), 500)
+    games, total = rom_catalog.search(system, q, offset, limit)
+    return jsonify({'items': games, 'total': total, 'offset': offset, 'limit': limit})
 
-                rel_path = os.path.relpath(os.path.join(root, filename), static_dir).replace('\\', '/')
-                if system.lower() in rel_path.lower():
-                    games.append({'name': filename, 'path': rel_path, 'core': system})
 
-    return jsonify(games)
\ No newline at end of file
+@main_bp.route('/arcade/rom/<path:rom_path>')
+@login_required
+def serve_rom(rom_path):
+    entry = rom_catalog.get(rom_path)
+    if not entry:
+        return jsonify({'error': 'ROM not found'}), 404
+    return rom_delivery.response(entry)
\ No newline at end of file
@@ -0,0 +1,192 @@
+import json
+import os
+import threading
+import zlib
+
+from sqlalchemy import event
+
+from app import db
+from app.models import Channel
+
+
+def _truthy(value):
+    return str(value).lower() in ['1', 'true', 'yes']
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class ChannelDirectory:
+    """
+    Pre-serialized /api/channels listing with a trigram name index.
+
+    The listing is rebuilt only when the channels table changes: ORM writes
+    in this process bump a local counter, and writes from anywhere else
+    (update scripts, sqlite shells) are caught by a checksum of the table's
+    rows. channels.db also holds the probe, encoder profile and now-playing
+    tables, so a new mtime/size on the file (or its WAL) only triggers that
+    checksum, not a rebuild.
+
+    is_playing comes from the stream manager's now-playing registry (via
+    now_playing_provider) and is overlaid on the cached rows per response,
+    so a channel switch does not touch the listing or the name index.
+    """
+
+    def __init__(self):
+        self.db_path = None
+        self.entries = []
+        self.names = []
+        self.trigram_index = {}
+        self.entry_json = []
+        self.positions = {}      # channel id -> position in entries
+        self.version = None
+        self._signature = None
+        self._file_seen = None
+        self._table_checksum = None
+        self._playing_body = (None, None, b"[]")  # (version, now-playing id, json)
+        self._local_changes = 0
+        self.now_playing_provider = None
+        self._lock = threading.RLock()
+
+    def init_app(self, app):
+        uri = app.config.get("SQLALCHEMY_BINDS", {}).get("channels_db", "")
+        if uri.startswith("sqlite:///"):
+            self.db_path = uri[len("sqlite:///"):]
+
+        for name in ("after_insert", "after_update", "after_delete"):
+            event.listen(Channel, name, self._on_channel_change)
+
+    def _on_channel_change(self, mapper, connection, target):
+        self.invalidate()
+
+    def invalidate(self):
+        with self._lock:
+            self._local_changes += 1
+
+    # ────────────────────────────────────────────────────────────────
+
+    def _file_signature(self):
+        if not self.db_path:
+            return None
+        signature = []
+        for path in (self.db_path, self.db_path + "-wal"):
+            try:
+                st = os.stat(path)
+                signature.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def _table_signature(self):
+        file_signature = self._file_signature()
+        if file_signature == self._file_seen:
+            return self._table_checksum
+
+        rows = db.session.query(Channel.id, Channel.name, Channel.url, Channel.favorites, Channel.logo).all()
+        self._table_checksum = (len(rows), zlib.crc32(repr(rows).encode('utf-8')))
+        self._file_seen = file_signature
+        return self._table_checksum
+
+    def _now_playing_id(self):
+        if not self.now_playing_provider:
+            return None
+        now_playing = self.now_playing_provider()
+        return now_playing["channel_id"] if now_playing else None
+
+    def _ensure_fresh(self):
+        signature = (self._local_changes, self._table_signature())
+        if signature == self._signature:
+            return
+
+        with self._lock:
+            if signature == self._signature:
+                return
+            self._rebuild()
+            self._signature = signature
+
+    def _rebuild(self):
+        entries = []
+        for channel in Channel.query.all():
+            entries.append({
+                'id': channel.id,
+                'name': channel.name,
+                'url': channel.url,
+                'Favorites': _truthy(channel.favorites),
+                'is_playing': False,
+                'logo': channel.logo
+            })
+
+        names = [(e['name'] or '').lower() for e in entries]
+        index = {}
+        for position, name in enumerate(names):
+            for gram in _trigrams(name):
+                index.setdefault(gram, set()).add(position)
+
+        entry_json = [json.dumps(e, separators=(',', ':')).encode('utf-8') for e in entries]
+        full_json = b"[" + b",".join(entry_json) + b"]"
+
+        self.entries = entries
+        self.names = names
+        self.trigram_index = index
+        self.entry_json = entry_json
+        self.positions = {e['id']: position for position, e in enumerate(entries)}
+        self.version = f"{len(full_json):x}-{zlib.crc32(full_json):08x}"
+        self._playing_body = (self.version, None, full_json)
+
+    def _with_playing(self, entry, now_playing_id):
+        return dict(entry, is_playing=True) if entry['id'] == now_playing_id else entry
+
+    def _etag(self, now_playing_id):
+        return f"{self.version}-p{now_playing_id}" if now_playing_id is not None else self.version
+
+    # ────────────────────────────────────────────────────────────────
+
+    def full_list(self):
+        """Return (json_bytes, etag) for the whole list."""
+        self._ensure_fresh()
+        now_playing_id = self._now_playing_id()
+
+        with self._lock:
+            version, playing_id, body = self._playing_body
+            if (version, playing_id) != (self.version, now_playing_id):
+                pieces = list(self.entry_json)
+                position = self.positions.get(now_playing_id)
+                if position is not None:
+                    playing = self._with_playing(self.entries[position], now_playing_id)
+                    pieces[position] = json.dumps(playing, separators=(',', ':')).encode('utf-8')
+                body = b"[" + b",".join(pieces) + b"]"
+                self._playing_body = (self.version, now_playing_id, body)
+        return body, self._etag(now_playing_id)
+
+    def query_etag(self, q, favorites, offset, limit):
+        self._ensure_fresh()
+        params = f"{q}|{int(favorites)}|{offset}|{limit}".encode('utf-8')
+        return f"{self._etag(self._now_playing_id())}-{zlib.crc32(params):08x}"
+
+    def search(self, q, favorites=False, offset=0, limit=100):
+        """Return (page, total) of channels whose name contains q, in list order."""
+        self._ensure_fresh()
+        q = (q or '').strip().lower()
+
+        if len(q) >= 3:
+            postings = [self.trigram_index.get(gram, set()) for gram in _trigrams(q)]
+            postings.sort(key=len)
+            candidates = set(postings[0]).intersection(*postings[1:]) if postings else set()
+            positions = sorted(p for p in candidates if q in self.names[p])
+        elif q:
+            positions = [p for p, name in enumerate(self.names) if q in name]
+        else:
+            positions = range(len(self.entries))
+
+        matches = [self.entries[p] for p in positions]
+        if favorites:
+            matches = [e for e in matches if e['Favorites']]
+
+        now_playing_id = self._now_playing_id()
+        page = [self._with_playing(e, now_playing_id) for e in matches[offset:offset + limit]]
+        return page, len(matches)
+
+
+# ─── Singleton ────────────────────────────────────────────────────────
+channel_directory = ChannelDirectory()
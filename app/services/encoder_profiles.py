@@ -0,0 +1,258 @@
+from app import db
+from app.models import ChannelEncoderProfile
+
+
+# Encoder-specific low-latency options. Anything not listed gets no extras,
+# so any H.264 encoder ffmpeg knows about can be used.
+ENCODER_OPTIONS = {
+    "libx264": ["-preset", "veryfast", "-tune", "zerolatency"],
+    "h264_nvenc": ["-preset", "p4", "-tune", "ll"],
+    "h264_qsv": ["-preset", "veryfast"],
+    "h264_amf": ["-usage", "lowlatency"],
+    "h264_videotoolbox": ["-realtime", "1"],
+}
+
+
+class Rendition:
+    """One output variant. height=None keeps the source resolution."""
+
+    def __init__(self, name, height=None, video_bitrate=None, audio_bitrate="128k",
+                 h264_profile="main", level=None):
+        self.name = name
+        self.height = height
+        self.video_bitrate = video_bitrate
+        self.audio_bitrate = audio_bitrate
+        self.h264_profile = h264_profile
+        self.level = level
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data["name"],
+            height=data.get("height"),
+            video_bitrate=data.get("video_bitrate"),
+            audio_bitrate=data.get("audio_bitrate", "128k"),
+            h264_profile=data.get("h264_profile", "main"),
+            level=data.get("level"),
+        )
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "height": self.height,
+            "video_bitrate": self.video_bitrate,
+            "audio_bitrate": self.audio_bitrate,
+            "h264_profile": self.h264_profile,
+            "level": self.level,
+        }
+
+
+class EncoderProfile:
+    def __init__(self, name, renditions, gop=60, encoder=None, description=""):
+        self.name = name
+        self.renditions = renditions
+        self.gop = gop
+        # None means "use the registry's configured encoder".
+        self.encoder = encoder
+        self.description = description
+
+    @property
+    def is_abr(self):
+        return len(self.renditions) > 1
+
+    @classmethod
+    def from_dict(cls, name, data):
+        return cls(
+            name,
+            [Rendition.from_dict(r) for r in data["renditions"]],
+            gop=data.get("gop", 60),
+            encoder=data.get("encoder"),
+            description=data.get("description", ""),
+        )
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "description": self.description,
+            "encoder": self.encoder,
+            "gop": self.gop,
+            "renditions": [r.to_dict() for r in self.renditions],
+        }
+
+    # ────────────────────────────────────────────────────────────────
+
+    def _rendition_video_args(self, rendition, index, encoder):
+        # ABR needs per-output-stream specifiers (":v:1"); a single output
+        # just targets the video stream.
+        spec = f":v:{index}" if self.is_abr else ":v"
+        args = [f"-c{spec}", encoder, f"-profile{spec}", rendition.h264_profile]
+
+        if rendition.level:
+            args += [f"-level{spec}", rendition.level]
+
+        if rendition.video_bitrate:
+            kbps = int(str(rendition.video_bitrate).rstrip("kK"))
+            args += [
+                f"-b{spec}", f"{kbps}k",
+                f"-maxrate{spec}", f"{int(kbps * 1.07)}k",
+                f"-bufsize{spec}", f"{int(kbps * 1.5)}k",
+            ]
+
+        return args
+
+    def ffmpeg_args(self, encoder="libx264", has_audio=True):
+        """
+        Return (args, var_stream_map) for the encode section of the command.
+
+        A single rendition without scaling reproduces the classic Live TV
+        output. ABR profiles split the decoded video once and encode every
+        rendition in the same ffmpeg process; var_stream_map pairs each video
+        output with its own audio output for the HLS master playlist. For a
+        source without audio (has_audio=False, from the channel probe) the
+        audio maps and options are left out, since ffmpeg refuses a map that
+        matches no stream.
+        """
+        encoder = self.encoder or encoder
+        args = []
+
+        if not self.is_abr:
+            rendition = self.renditions[0]
+            if rendition.height:
+                args += ["-vf", f"scale=-2:{rendition.height}"]
+            args += self._rendition_video_args(rendition, 0, encoder)
+            args += ENCODER_OPTIONS.get(encoder, [])
+            args += ["-pix_fmt", "yuv420p"]
+            args += ["-g", str(self.gop), "-keyint_min", str(self.gop), "-sc_threshold", "0"]
+            if has_audio:
+                args += ["-c:a", "aac", "-ar", "48000", "-b:a", rendition.audio_bitrate]
+            return args, None
+
+        count = len(self.renditions)
+        split = "".join(f"[s{i}]" for i in range(count))
+        chains = [f"[0:v]split={count}{split}"]
+        for i, rendition in enumerate(self.renditions):
+            scale = f"scale=-2:{rendition.height}," if rendition.height else ""
+            chains.append(f"[s{i}]{scale}format=yuv420p[v{i}]")
+        args += ["-filter_complex", ";".join(chains)]
+
+        for i in range(count):
+            args += ["-map", f"[v{i}]"]
+        if has_audio:
+            for i in range(count):
+                args += ["-map", "0:a:0"]
+
+        for i, rendition in enumerate(self.renditions):
+            args += self._rendition_video_args(rendition, i, encoder)
+        args += ENCODER_OPTIONS.get(encoder, [])
+        args += ["-g", str(self.gop), "-keyint_min", str(self.gop), "-sc_threshold", "0"]
+
+        if has_audio:
+            args += ["-c:a", "aac", "-ar", "48000"]
+            for i, rendition in enumerate(self.renditions):
+                args += [f"-b:a:{i}", rendition.audio_bitrate]
+
+        var_stream_map = " ".join(
+            f"v:{i},a:{i},name:{r.name}" if has_audio else f"v:{i},name:{r.name}"
+            for i, r in enumerate(self.renditions)
+        )
+        return args, var_stream_map
+
+
+# ─── Built-in profiles ────────────────────────────────────────────────
+BUILTIN_PROFILES = [
+    # The original single rendition, kept as the default.
+    EncoderProfile(
+        "compat",
+        [Rendition("source", audio_bitrate="192k", h264_profile="baseline", level="3.0")],
+        description="Single source-resolution rendition, baseline profile",
+    ),
+    EncoderProfile(
+        "abr",
+        [
+            Rendition("720p", height=720, video_bitrate="2800k"),
+            Rendition("480p", height=480, video_bitrate="1400k", audio_bitrate="96k"),
+            Rendition("360p", height=360, video_bitrate="800k", audio_bitrate="64k"),
+        ],
+        description="720p/480p/360p adaptive ladder",
+    ),
+    EncoderProfile(
+        "abr-hd",
+        [
+            Rendition("1080p", height=1080, video_bitrate="5000k", audio_bitrate="160k", h264_profile="high"),
+            Rendition("720p", height=720, video_bitrate="2800k"),
+            Rendition("480p", height=480, video_bitrate="1400k", audio_bitrate="96k"),
+            Rendition("360p", height=360, video_bitrate="800k", audio_bitrate="64k"),
+        ],
+        description="1080p/720p/480p/360p adaptive ladder",
+    ),
+]
+
+
+class ProfileRegistry:
+    def __init__(self):
+        self.profiles = {}
+        self.default_name = "compat"
+        self.encoder = "libx264"
+
+        for profile in BUILTIN_PROFILES:
+            self.register(profile)
+
+    def init_app(self, app):
+        self.encoder = app.config.get("LIVE_TV_VIDEO_ENCODER", self.encoder)
+
+        for name, data in (app.config.get("LIVE_TV_ENCODER_PROFILES") or {}).items():
+            self.register(EncoderProfile.from_dict(name, data))
+
+        default_name = app.config.get("LIVE_TV_ENCODER_PROFILE", self.default_name)
+        if default_name in self.profiles:
+            self.default_name = default_name
+        else:
+            print(f"[PROFILES] Unknown default profile '{default_name}', using '{self.default_name}'")
+
+    def register(self, profile):
+        self.profiles[profile.name] = profile
+
+    def get(self, name):
+        return self.profiles.get(name) or self.profiles[self.default_name]
+
+    def to_list(self):
+        return [
+            {**p.to_dict(), "default": p.name == self.default_name}
+            for p in self.profiles.values()
+        ]
+
+    # ─── Per-channel selection (must be called inside an app context) ─
+    def profile_for_channel(self, channel_id):
+        try:
+            row = db.session.get(ChannelEncoderProfile, channel_id)
+        except Exception as e:
+            print(f"[PROFILES] Lookup failed: {e}")
+            db.session.rollback()
+            row = None
+
+        if row and row.profile_name in self.profiles:
+            return self.profiles[row.profile_name]
+        return self.profiles[self.default_name]
+
+    def set_channel_profile(self, channel_id, profile_name):
+        """Assign a profile to a channel; None or '' reverts to the global default."""
+        row = db.session.get(ChannelEncoderProfile, channel_id)
+
+        if not profile_name:
+            if row:
+                db.session.delete(row)
+                db.session.commit()
+            return
+
+        if profile_name not in self.profiles:
+            raise ValueError(f"Unknown encoder profile: {profile_name}")
+
+        if not row:
+            row = ChannelEncoderProfile(channel_id=channel_id)
+            db.session.add(row)
+        row.profile_name = profile_name
+        db.session.commit()
+
+
+# ─── Singleton ────────────────────────────────────────────────────────
+profiles = ProfileRegistry()
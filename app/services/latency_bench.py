@@ -0,0 +1,163 @@
+"""
+Measure Live TV latency for standard and low-latency HLS against a local
+test source.
+
+    python -m app.services.latency_bench --mode standard --seconds 30
+    python -m app.services.latency_bench --mode ll --seconds 30
+
+A channel is started through the stream manager with a lavfi test source
+paced by the realtime filters, then /stream/<id>/index.m3u8 is followed the
+way a player would: standard mode polls every 100 ms (best case for a polling
+player), LL mode uses blocking _HLS_msn/_HLS_part reloads. For every new segment or part,
+delivery latency is the time it first appeared in the playlist minus the
+wall-clock time at the end of its media (program date time + duration).
+Glass-to-glass is estimated by adding the hold-back the player keeps behind
+the live edge (3 target durations for hls.js, PART-HOLD-BACK for LL-HLS).
+"""
+from gevent import monkey
+monkey.patch_all()
+
+import argparse
+import statistics
+import time
+from datetime import datetime
+
+from app import create_app, socketio
+from app.services import llhls
+from app.services.streamer import LAVFI_PREFIX, streamer
+
+
+BENCH_CHANNEL_ID = 0
+STANDARD_HOLD_BACK_SECONDS = 3 * 2
+TEST_SOURCE = ("testsrc2=size=1280x720:rate=30,realtime[out0];"
+               "sine=frequency=1000:sample_rate=48000,arealtime[out1]")
+
+
+def parse_pdt(value):
+    value = value.strip()
+    # ffmpeg writes "+0000"; fromisoformat on older Pythons wants "+00:00".
+    if len(value) > 5 and value[-5] in "+-" and value[-3] != ":":
+        value = value[:-2] + ":" + value[-2:]
+    return datetime.fromisoformat(value).timestamp()
+
+
+def media_times(text):
+    """Map each segment/part URI to (start, end) in program-date-time seconds."""
+    times = {}
+    pdt = None
+    offset = 0.0
+    duration = None
+
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith("#EXT-X-PROGRAM-DATE-TIME:"):
+            pdt = parse_pdt(line.split(":", 1)[1])
+            offset = 0.0
+        elif line.startswith("#EXT-X-PART:"):
+            attrs = dict(a.split("=", 1) for a in line.split(":", 1)[1].split(","))
+            part_duration = float(attrs["DURATION"])
+            if pdt is not None:
+                times[attrs["URI"].strip('"')] = (pdt + offset, pdt + offset + part_duration)
+            offset += part_duration
+        elif line.startswith("#EXTINF:"):
+            duration = float(line.split(":", 1)[1].split(",", 1)[0])
+        elif line and not line.startswith("#") and duration is not None:
+            if pdt is not None:
+                times[line] = (pdt, pdt + duration)
+                pdt += duration
+            offset = 0.0
+            duration = None
+
+    return times
+
+
+def follow(client, seconds, low_latency, source_started_at):
+    """
+    Return per-chunk latencies. Program date times come from ffmpeg's muxer
+    clock, so they are re-anchored: the first chunk's media starts when
+    ffmpeg was spawned (a slight overestimate, never an underestimate).
+    """
+    url = f"/stream/{BENCH_CHANNEL_ID}/index.m3u8"
+    seen = set()
+    latencies = []
+    anchor = None
+    next_part = None
+    deadline = time.time() + seconds
+
+    while time.time() < deadline:
+        query = ""
+        if low_latency and next_part is not None:
+            msn, part = divmod(next_part, llhls.PARTS_PER_SEGMENT)
+            query = f"?_HLS_msn={msn}&_HLS_part={part}"
+
+        response = client.get(url + query)
+        arrived = time.time()
+
+        if response.status_code == 200:
+            times = media_times(response.get_data(as_text=True))
+            if anchor is None and times:
+                anchor = min(start for start, _ in times.values())
+                # Everything in the first response is history, not a live arrival.
+                seen.update(times)
+
+            for uri, (_, media_end) in times.items():
+                # LL mode measures parts; full segments duplicate them.
+                if (low_latency and not uri.startswith("part_")) or uri in seen:
+                    continue
+                seen.add(uri)
+                latencies.append(arrived - (source_started_at + media_end - anchor))
+
+            if low_latency:
+                indexes = [llhls.part_index(uri) for uri in times if uri.startswith("part_")]
+                if indexes:
+                    next_part = max(indexes) + 1
+
+        if not low_latency:
+            socketio.sleep(0.1)
+
+    return latencies
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure Live TV HLS latency.")
+    parser.add_argument("--mode", choices=["standard", "ll"], default="ll")
+    parser.add_argument("--seconds", type=int, default=30, help="How long to follow the stream")
+    args = parser.parse_args(argv)
+
+    app = create_app()
+    low_latency = args.mode == "ll"
+    streamer.low_latency = low_latency
+
+    job = streamer.start_stream(BENCH_CHANNEL_ID, LAVFI_PREFIX + TEST_SOURCE, "Latency benchmark")
+    while not job.done:
+        socketio.sleep(0.2)
+
+    if job.status != "ready":
+        print(f"Stream failed to start: {job.message}")
+        return
+
+    try:
+        with app.test_request_context():
+            stream = streamer.get_stream(BENCH_CHANNEL_ID)
+            latencies = follow(app.test_client(), args.seconds, low_latency, stream.process_started_at)
+    finally:
+        streamer.stop_stream(BENCH_CHANNEL_ID)
+
+    if not latencies:
+        print("No segments observed.")
+        return
+
+    hold_back = llhls.PART_SECONDS * 3 if low_latency else STANDARD_HOLD_BACK_SECONDS
+    median = statistics.median(latencies)
+    p95 = sorted(latencies)[int(len(latencies) * 0.95) - 1]
+
+    print(f"mode:                      {args.mode}")
+    print(f"samples:                   {len(latencies)}")
+    print(f"delivery latency (median): {median:.2f}s")
+    print(f"delivery latency (p95):    {p95:.2f}s")
+    print(f"player hold-back:          {hold_back:.2f}s")
+    print(f"est. glass-to-glass:       {median + hold_back:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
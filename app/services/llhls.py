@@ -0,0 +1,125 @@
+"""
+Low-latency HLS for Live TV.
+
+ffmpeg's HLS muxer cannot emit EXT-X-PART, so in low-latency mode it writes
+short keyframe-aligned fMP4 chunks ("parts") to parts.m3u8. This module
+turns that list into an LL-HLS media playlist: every PARTS_PER_SEGMENT parts
+form one full segment, which /stream serves by concatenating the part files.
+"""
+import re
+
+
+PART_SECONDS = 0.5
+PARTS_PER_SEGMENT = 4
+PARTS_PLAYLIST = "parts.m3u8"
+INIT_FILENAME = "init.mp4"
+
+# How long a blocking playlist request may be held (3x the target duration).
+BLOCK_TIMEOUT_SECONDS = 3 * PART_SECONDS * PARTS_PER_SEGMENT
+# Segments shown with their EXT-X-PART tags, counted back from the live edge.
+PART_WINDOW_SEGMENTS = 3
+
+PART_INDEX_RE = re.compile(r"_(\d+)\.m4s$")
+SEGMENT_URI_RE = re.compile(r"^llseg_(\d+)\.m4s$")
+
+
+class Part:
+    def __init__(self, index, uri, duration, program_date_time=None):
+        self.index = index
+        self.uri = uri
+        self.duration = duration
+        self.program_date_time = program_date_time
+
+    @property
+    def msn(self):
+        return self.index // PARTS_PER_SEGMENT
+
+    @property
+    def part_number(self):
+        return self.index % PARTS_PER_SEGMENT
+
+
+def part_index(path):
+    match = PART_INDEX_RE.search(path)
+    return int(match.group(1)) if match else None
+
+
+def segment_uri(msn):
+    return f"llseg_{msn}.m4s"
+
+
+def parse_segment_uri(name):
+    """Return the media sequence number for an llseg_<msn>.m4s name, else None."""
+    match = SEGMENT_URI_RE.match(name)
+    return int(match.group(1)) if match else None
+
+
+def part_indexes_for_segment(msn):
+    start = msn * PARTS_PER_SEGMENT
+    return range(start, start + PARTS_PER_SEGMENT)
+
+
+def parse_parts_playlist(text):
+    parts = []
+    duration = None
+    pdt = None
+
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith("#EXTINF:"):
+            duration = float(line[len("#EXTINF:"):].split(",", 1)[0])
+        elif line.startswith("#EXT-X-PROGRAM-DATE-TIME:"):
+            pdt = line[len("#EXT-X-PROGRAM-DATE-TIME:"):]
+        elif line and not line.startswith("#") and duration is not None:
+            index = part_index(line)
+            if index is not None:
+                parts.append(Part(index, line, duration, pdt))
+            duration = None
+            pdt = None
+
+    return parts
+
+
+def build_playlist(parts):
+    """Render the LL-HLS playlist served to players as index.m3u8."""
+    by_msn = {}
+    for part in parts:
+        by_msn.setdefault(part.msn, []).append(part)
+
+    # ffmpeg deletes old parts, so the oldest group may have lost its head.
+    msns = sorted(m for m, group in by_msn.items() if group[0].part_number == 0)
+    target = int(PART_SECONDS * PARTS_PER_SEGMENT + 0.999)
+
+    lines = [
+        "#EXTM3U",
+        "#EXT-X-VERSION:9",
+        f"#EXT-X-TARGETDURATION:{target}",
+        f"#EXT-X-PART-INF:PART-TARGET={PART_SECONDS:.3f}",
+        f"#EXT-X-SERVER-CONTROL:CAN-BLOCK-RELOAD=YES,PART-HOLD-BACK={PART_SECONDS * 3:.3f}",
+        f"#EXT-X-MEDIA-SEQUENCE:{msns[0] if msns else 0}",
+        "#EXT-X-INDEPENDENT-SEGMENTS",
+        f'#EXT-X-MAP:URI="{INIT_FILENAME}"',
+    ]
+
+    complete = [m for m in msns if len(by_msn[m]) == PARTS_PER_SEGMENT]
+    partial = [m for m in msns if len(by_msn[m]) < PARTS_PER_SEGMENT]
+    show_parts_from = complete[-PART_WINDOW_SEGMENTS] if len(complete) >= PART_WINDOW_SEGMENTS else 0
+
+    for msn in msns:
+        group = by_msn[msn]
+
+        if group[0].program_date_time:
+            lines.append(f"#EXT-X-PROGRAM-DATE-TIME:{group[0].program_date_time}")
+
+        if msn >= show_parts_from:
+            for part in group:
+                lines.append(f'#EXT-X-PART:DURATION={part.duration:.3f},URI="{part.uri}",INDEPENDENT=YES')
+
+        if msn in complete:
+            lines.append(f"#EXTINF:{sum(p.duration for p in group):.3f},")
+            lines.append(segment_uri(msn))
+        elif msn != partial[-1]:
+            # A gap in the middle of the list; stop at the last contiguous point.
+            break
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,151 @@
+"""
+Show/season browsing for the room's Plex picker, built from raw Plex XML.
+
+plexapi objects reload themselves when an attribute they were not built with
+is read (thumb, seasonNumber, parentTitle...), so these helpers read element
+attributes directly. A whole show - its seasons plus every episode via
+/allLeaves - costs two requests regardless of how many seasons it has, and
+every level is stored in the metadata cache under ("children", ratingKey),
+the same entries /api/plex/children serves.
+"""
+import threading
+
+from plexapi.exceptions import BadRequest, NotFound
+
+from app.services.plex_cache import plex_cache
+from app.services.plex_client import plex_client
+
+
+_prefetching = set()
+_prefetch_lock = threading.Lock()
+
+
+def _year(attrs):
+    year = attrs.get("year")
+    return int(year) if year and year.isdigit() else None
+
+
+def format_season(attrs):
+    return {
+        "title": f"Season {attrs.get('index')}",
+        "year": _year(attrs),
+        "thumb": attrs.get("thumb") or attrs.get("parentThumb"),
+        "key": attrs.get("ratingKey"),
+        "type": "Season",
+        "parent_title": attrs.get("parentTitle"),
+    }
+
+
+def format_episode(attrs):
+    show_title = attrs.get("grandparentTitle", "Unknown Show")
+    return {
+        "title": f"{show_title}, S{attrs.get('parentIndex')}:E{attrs.get('index')} - {attrs.get('title')}",
+        "year": _year(attrs),
+        "thumb": attrs.get("thumb") or attrs.get("parentThumb"),
+        "key": attrs.get("ratingKey"),
+        "type": "Episode",
+        "parent_title": attrs.get("parentTitle"),
+    }
+
+
+def query_children(plex, rating_key, suffix="children"):
+    """Raw elements below a ratingKey; hand them on so a level is not fetched twice."""
+    try:
+        return list(plex.query(f"/library/metadata/{int(rating_key)}/{suffix}"))
+    except (NotFound, BadRequest):
+        # Movies, episodes and unknown keys have nothing to drill into.
+        return []
+
+
+def fetch_children(plex, rating_key, elements=None):
+    """
+    One level below a show or season, as /api/plex/children returns it.
+    elements is the already fetched /children response, if the caller has it.
+    """
+    if elements is None:
+        elements = query_children(plex, rating_key)
+
+    results = []
+    for element in elements:
+        attrs = element.attrib
+        if attrs.get("type") == "season":
+            results.append(format_season(attrs))
+        elif attrs.get("type") == "episode":
+            results.append(format_episode(attrs))
+    return plex_cache.put(("children", str(rating_key)), results)
+
+
+def fetch_show_tree(plex, rating_key, elements=None):
+    """
+    Return {ratingKey: children} for a show and all of its seasons, and cache
+    each level. Seasons that come back empty from /allLeaves keep an empty list.
+    elements is the already fetched /children response, if the caller has it.
+    """
+    seasons = []
+    episodes_by_season = {}
+    if elements is None:
+        elements = query_children(plex, rating_key)
+    for element in elements:
+        if element.attrib.get("type") == "season":
+            season = format_season(element.attrib)
+            seasons.append(season)
+            episodes_by_season[season["key"]] = []
+
+    if not seasons:
+        # Not a show; a season's tree is just its episodes.
+        return {str(rating_key): fetch_children(plex, rating_key, elements)}
+
+    for element in query_children(plex, rating_key, "allLeaves"):
+        attrs = element.attrib
+        episodes_by_season.setdefault(attrs.get("parentRatingKey"), []).append(format_episode(attrs))
+
+    tree = {str(rating_key): plex_cache.put(("children", str(rating_key)), seasons)}
+    for season in seasons:
+        key = season["key"]
+        tree[key] = plex_cache.put(("children", key), episodes_by_season.get(key, []))
+    return tree
+
+
+def cached_tree(rating_key):
+    """The same mapping as fetch_show_tree, if every level is already cached."""
+    rating_key = str(rating_key)
+    children = plex_cache.get(("children", rating_key))
+    if children is None:
+        return None
+
+    tree = {rating_key: children}
+    for child in children:
+        if child["type"] == "Season":
+            episodes = plex_cache.get(("children", child["key"]))
+            if episodes is None:
+                return None
+            tree[child["key"]] = episodes
+    return tree
+
+
+def prefetch_show(rating_key, elements=None):
+    """
+    Fill the cache for every season of a show in the background. With the
+    show's /children elements in hand only /allLeaves is requested.
+    """
+    from app import socketio
+
+    rating_key = str(rating_key)
+    with _prefetch_lock:
+        if rating_key in _prefetching:
+            return
+        _prefetching.add(rating_key)
+
+    def run():
+        try:
+            plex = plex_client.get_server()
+            if plex:
+                fetch_show_tree(plex, rating_key, elements)
+        except Exception as e:
+            plex_client.report_error(e)
+            print(f"[PLEX] Prefetch of {rating_key} failed: {e}")
+        finally:
+            with _prefetch_lock:
+                _prefetching.discard(rating_key)
+
+    socketio.start_background_task(run)
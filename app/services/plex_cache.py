@@ -0,0 +1,135 @@
+import threading
+import time
+from collections import OrderedDict
+
+from app.services.plex_client import plex_client
+
+
+DEFAULT_TTL_SECONDS = 600
+DEFAULT_MAX_ENTRIES = 2000
+DEFAULT_CHECK_SECONDS = 60
+
+
+class PlexMetadataCache:
+    """
+    LRU of Plex browse results (search hits, show/season children, stream
+    lists), keyed by ("search", query) / ("children", ratingKey) /
+    ("metadata", ratingKey) and holding the JSON-ready dicts the routes
+    return.
+
+    Entries expire after ttl_seconds. A background watcher also compares
+    every library section's updatedAt/contentChangedAt once per
+    check_seconds and drops the whole cache when Plex reports a library
+    change, so new episodes show up without waiting out the TTL.
+    """
+
+    def __init__(self, ttl_seconds=DEFAULT_TTL_SECONDS, max_entries=DEFAULT_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.check_seconds = DEFAULT_CHECK_SECONDS
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.invalidations = 0
+        self.library_signature = None
+        self._watcher_started = False
+        self._lock = threading.RLock()
+
+    def init_app(self, app):
+        self.ttl_seconds = int(app.config.get("PLEX_CACHE_TTL_SECONDS", self.ttl_seconds))
+        self.max_entries = int(app.config.get("PLEX_CACHE_MAX_ENTRIES", self.max_entries))
+        self.check_seconds = int(app.config.get("PLEX_CACHE_CHECK_SECONDS", self.check_seconds))
+
+    def get(self, key):
+        self._ensure_watcher()
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, stored_at = entry
+            if time.time() - stored_at > self.ttl_seconds:
+                del self.entries[key]
+                self.expired += 1
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self.entries.pop(key, None)
+            self.entries[key] = (value, time.time())
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return value
+
+    def discard(self, key):
+        with self._lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+                "expired": self.expired,
+                "invalidations": self.invalidations,
+            }
+
+    # ────────────────────────────────────────────────────────────────
+
+    def _ensure_watcher(self):
+        if self._watcher_started:
+            return
+
+        from app import socketio
+
+        self._watcher_started = True
+        socketio.start_background_task(self._watch_library)
+
+    def _read_library_signature(self):
+        plex = plex_client.get_server()
+        if not plex:
+            return None
+        try:
+            # Query directly: plexapi caches library.sections() for the server's lifetime.
+            container = plex.query("/library/sections")
+            return tuple(
+                (d.attrib.get("key"), d.attrib.get("updatedAt"), d.attrib.get("contentChangedAt"))
+                for d in container.iter("Directory")
+            )
+        except Exception as e:
+            plex_client.report_error(e)
+            return None
+
+    def _watch_library(self):
+        from app import socketio
+
+        while True:
+            signature = self._read_library_signature()
+            if signature is not None:
+                if self.library_signature is not None and signature != self.library_signature:
+                    print("[PLEX] Library changed, clearing metadata cache")
+                    self.clear()
+                self.library_signature = signature
+
+            socketio.sleep(self.check_seconds)
+
+
+# ─── Singleton ────────────────────────────────────────────────────────
+plex_cache = PlexMetadataCache()
@@ -0,0 +1,131 @@
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from plexapi.server import PlexServer
+
+
+DEFAULT_TIMEOUT_SECONDS = 10
+DEFAULT_POOL_SIZE = 20
+BACKOFF_BASE_SECONDS = 1
+BACKOFF_MAX_SECONDS = 60
+
+# Errors that mean the server went away, as opposed to a bad ratingKey etc.
+CONNECTION_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+
+class PlexClient:
+    """
+    Process-wide Plex connection.
+
+    One PlexServer is built lazily and shared by every request, on top of a
+    keep-alive requests.Session whose urllib3 pool is sized for concurrent
+    greenlets. A failed connect backs off exponentially instead of hitting
+    Plex on every request, and a connection error reported by a caller drops
+    the server so the next call reconnects. Everything here is safe under
+    gevent once threading is monkey-patched (see run.py).
+    """
+
+    def __init__(self):
+        self.url = None
+        self.token = None
+        self.timeout = DEFAULT_TIMEOUT_SECONDS
+        self.pool_size = DEFAULT_POOL_SIZE
+        self.session = None
+        self.server = None
+
+        self.connected_at = None
+        self.last_ok_at = None
+        self.last_error = None
+        self.last_error_at = None
+        self.failures = 0
+        self.retry_at = 0
+
+        self._lock = threading.RLock()
+
+    def init_app(self, app):
+        self.url = app.config.get("PLEX_URL")
+        self.token = app.config.get("PLEX_TOKEN")
+        self.timeout = int(app.config.get("PLEX_TIMEOUT_SECONDS", self.timeout))
+        self.pool_size = int(app.config.get("PLEX_POOL_SIZE", self.pool_size))
+        self.session = self._build_session()
+
+    def _build_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        # Every Plex call (plexapi, posters, the transcode proxy) goes through
+        # this session, so health() sees each successful round trip.
+        session.hooks["response"].append(self._on_response)
+        return session
+
+    # ────────────────────────────────────────────────────────────────
+
+    def get_server(self):
+        """Return the shared PlexServer, connecting if needed; None while Plex is unreachable."""
+        server = self.server
+        if server:
+            return server
+
+        # Concurrent callers wait here for one handshake instead of each doing their own.
+        with self._lock:
+            if self.server:
+                return self.server
+            if not self.url or not self.token:
+                return None
+            if time.time() < self.retry_at:
+                return None
+
+            if self.session is None:
+                self.session = self._build_session()
+
+            try:
+                server = PlexServer(self.url, self.token, session=self.session, timeout=self.timeout)
+            except Exception as e:
+                self._record_failure(e)
+                return None
+
+            self.server = server
+            self.connected_at = time.time()
+            self.last_ok_at = self.connected_at
+            self.failures = 0
+            self.retry_at = 0
+            print(f"[PLEX] Connected to {server.friendlyName} ({self.url})")
+            return server
+
+    def _on_response(self, response, *args, **kwargs):
+        if response.status_code < 500:
+            self.last_ok_at = time.time()
+
+    def report_error(self, error):
+        """Called by routes when a Plex call fails; drops the connection on network errors."""
+        if not isinstance(error, CONNECTION_ERRORS):
+            return
+        with self._lock:
+            self.server = None
+            self._record_failure(error)
+
+    def _record_failure(self, error):
+        self.failures += 1
+        delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** (self.failures - 1))
+        self.retry_at = time.time() + delay
+        self.last_error = str(error)
+        self.last_error_at = time.time()
+        print(f"[PLEX] Connection failed ({self.failures}x), retrying in {delay}s: {error}")
+
+    def health(self):
+        return {
+            "connected": self.server is not None,
+            "connected_at": self.connected_at,
+            "last_ok_at": self.last_ok_at,
+            "consecutive_failures": self.failures,
+            "last_error": self.last_error,
+            "last_error_at": self.last_error_at,
+            "retry_in": max(0, round(self.retry_at - time.time(), 1)) if self.retry_at else 0,
+        }
+
+
+# ─── Singleton ────────────────────────────────────────────────────────
+plex_client = PlexClient()
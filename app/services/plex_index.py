@@ -0,0 +1,262 @@
+import re
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlencode
+
+from app.services.plex_client import plex_client
+
+
+DEFAULT_REFRESH_SECONDS = 300
+DEFAULT_FULL_REBUILD_SECONDS = 6 * 3600
+PAGE_SIZE = 1000
+MAX_RESULTS = 50
+# Share of the query's trigrams a title must contain to count as a typo match.
+FUZZY_MIN_OVERLAP = 0.5
+
+# Plex metadata type numbers for /library/sections/<id>/all?type=N.
+SECTION_TYPES = {
+    "movie": [("movie", 1)],
+    "show": [("show", 2), ("season", 3), ("episode", 4)],
+}
+TYPE_ORDER = {"movie": 0, "show": 0, "season": 1, "episode": 2}
+
+WORD_RE = re.compile(r"[^\w]+", re.UNICODE)
+
+
+def normalize(text):
+    return " ".join(WORD_RE.sub(" ", (text or "").lower()).split())
+
+
+def _trigrams(text):
+    # Padded so word starts get their own grams and prefixes rank well.
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class IndexedItem:
+    __slots__ = ("key", "type", "title", "year", "thumb", "text", "grams")
+
+    def __init__(self, key, type_, title, year, thumb, text):
+        self.key = key
+        self.type = type_
+        self.title = title
+        self.year = year
+        self.thumb = thumb
+        self.text = text
+        self.grams = _trigrams(text)
+
+    def to_dict(self):
+        return {
+            "title": self.title,
+            "year": self.year,
+            "thumb": self.thumb,
+            "key": self.key,
+            "type": self.type.capitalize(),
+        }
+
+
+class PlexLibraryIndex:
+    """
+    In-memory trigram index of every movie, show, season and episode in the
+    Plex library, so /api/plex/search can answer as-you-type without asking
+    Plex.
+
+    A background task pages through /library/sections/<id>/all once, then
+    every refresh_seconds re-reads only items whose updatedAt moved (new
+    items count too, since updatedAt >= addedAt). Deletions only surface in
+    the periodic full rebuild. Seasons and episodes are matched together
+    with their show's title.
+    """
+
+    def __init__(self):
+        self.items = {}       # ratingKey -> IndexedItem
+        self.postings = {}    # trigram -> set(ratingKey)
+        self.ready = False
+        self.refresh_seconds = DEFAULT_REFRESH_SECONDS
+        self.full_rebuild_seconds = DEFAULT_FULL_REBUILD_SECONDS
+        self.last_full_at = None
+        self.last_sync_at = None
+        self.last_build_seconds = None
+        self.last_error = None
+        self._started = False
+        self._lock = threading.RLock()
+
+    def init_app(self, app):
+        self.refresh_seconds = int(app.config.get("PLEX_INDEX_REFRESH_SECONDS", self.refresh_seconds))
+        self.full_rebuild_seconds = int(app.config.get("PLEX_INDEX_FULL_REBUILD_SECONDS", self.full_rebuild_seconds))
+
+    def ensure_started(self):
+        if self._started:
+            return
+
+        from app import socketio
+
+        self._started = True
+        socketio.start_background_task(self._refresh_loop)
+
+    # ─── Indexing ───────────────────────────────────────────────────
+
+    def _refresh_loop(self):
+        from app import socketio
+
+        while True:
+            full = not self.last_full_at or time.time() - self.last_full_at > self.full_rebuild_seconds
+            try:
+                self.refresh(full=full)
+            except Exception as e:
+                plex_client.report_error(e)
+                self.last_error = str(e)
+                print(f"[PLEX] Library index refresh failed: {e}")
+            socketio.sleep(self.refresh_seconds)
+
+    def _fetch_items(self, plex, section_key, type_number, since=None):
+        params = {"type": type_number}
+        if since:
+            params["updatedAt>>"] = int(since)
+
+        start = 0
+        while True:
+            params["X-Plex-Container-Start"] = start
+            params["X-Plex-Container-Size"] = PAGE_SIZE
+            container = plex.query(f"/library/sections/{section_key}/all?{urlencode(params)}")
+            elements = list(container)
+            for element in elements:
+                yield element.attrib
+            total = int(container.attrib.get("totalSize", start + len(elements)))
+            start += len(elements)
+            if not elements or start >= total:
+                break
+
+    def _make_item(self, kind, attrs):
+        title = attrs.get("title", "")
+        if kind == "season":
+            text = f"{attrs.get('parentTitle', '')} {title}"
+        elif kind == "episode":
+            text = f"{attrs.get('grandparentTitle', '')} {title}"
+        else:
+            text = title
+
+        year = attrs.get("year")
+        return IndexedItem(
+            key=attrs.get("ratingKey"),
+            type_=kind,
+            title=title,
+            year=int(year) if year and year.isdigit() else None,
+            thumb=attrs.get("thumb") or attrs.get("parentThumb") or attrs.get("grandparentThumb"),
+            text=normalize(text),
+        )
+
+    def refresh(self, full=False):
+        plex = plex_client.get_server()
+        if not plex:
+            return
+
+        started = time.time()
+        since = None if full else self.last_sync_at
+        sections = plex.query("/library/sections")
+
+        collected = []
+        for section in sections.iter("Directory"):
+            for kind, type_number in SECTION_TYPES.get(section.attrib.get("type"), []):
+                for attrs in self._fetch_items(plex, section.attrib.get("key"), type_number, since):
+                    if attrs.get("ratingKey"):
+                        collected.append(self._make_item(kind, attrs))
+
+        if full:
+            items = {item.key: item for item in collected}
+            postings = {}
+            for item in items.values():
+                for gram in item.grams:
+                    postings.setdefault(gram, set()).add(item.key)
+            with self._lock:
+                self.items = items
+                self.postings = postings
+            self.last_full_at = started
+        else:
+            with self._lock:
+                for item in collected:
+                    self._upsert(item)
+
+        # Small overlap so an edit landing mid-scan is picked up next time.
+        self.last_sync_at = started - 60
+        self.last_build_seconds = round(time.time() - started, 2)
+        self.last_error = None
+        self.ready = True
+
+        if full or collected:
+            print(f"[PLEX] Library index {'built' if full else 'updated'}: "
+                  f"{len(collected)} items in {self.last_build_seconds}s")
+
+    def _upsert(self, item):
+        old = self.items.get(item.key)
+        if old:
+            for gram in old.grams - item.grams:
+                keys = self.postings.get(gram)
+                if keys:
+                    keys.discard(item.key)
+        for gram in item.grams:
+            self.postings.setdefault(gram, set()).add(item.key)
+        self.items[item.key] = item
+
+    # ─── Search ─────────────────────────────────────────────────────
+
+    def search(self, query, limit=MAX_RESULTS):
+        """
+        Rank items against the query: exact title, then prefix, then word
+        prefix / substring, then trigram (typo-tolerant) matches. Ties go to
+        movies and shows before seasons and episodes, then closer matches.
+        """
+        q = normalize(query)
+        if not q:
+            return []
+
+        with self._lock:
+            if len(q) < 3:
+                candidates = {key: 0 for key, item in self.items.items()
+                              if item.text.startswith(q) or f" {q}" in item.text}
+                needed = 0
+                q_grams = set()
+            else:
+                q_grams = _trigrams(q)
+                counts = Counter()
+                for gram in q_grams:
+                    counts.update(self.postings.get(gram, ()))
+                needed = max(1, int(len(q_grams) * FUZZY_MIN_OVERLAP))
+                candidates = {key: n for key, n in counts.items() if n >= needed}
+
+            ranked = []
+            for key, overlap in candidates.items():
+                item = self.items[key]
+                title = normalize(item.title)
+                if title == q or item.text == q:
+                    tier = 0
+                elif title.startswith(q) or item.text.startswith(q):
+                    tier = 1
+                elif f" {q}" in f" {item.text}":
+                    tier = 2
+                elif q in item.text:
+                    tier = 3
+                else:
+                    tier = 4
+
+                similarity = 2 * overlap / (len(q_grams) + len(item.grams)) if q_grams else 0
+                ranked.append((tier, TYPE_ORDER.get(item.type, 3), -similarity, item.text, item))
+
+        ranked.sort(key=lambda row: row[:4])
+        return [row[4].to_dict() for row in ranked[:limit]]
+
+    def stats(self):
+        return {
+            "ready": self.ready,
+            "items": len(self.items),
+            "trigrams": len(self.postings),
+            "last_full_at": self.last_full_at,
+            "last_sync_at": self.last_sync_at,
+            "last_build_seconds": self.last_build_seconds,
+            "last_error": self.last_error,
+        }
+
+
+# ─── Singleton ────────────────────────────────────────────────────────
+plex_index = PlexLibraryIndex()
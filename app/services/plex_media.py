@@ -0,0 +1,136 @@
+"""
+Preparing a Plex item for a room: stream selection and transcode pre-warm.
+
+These run inside the room's background media job, never on the request.
+"""
+import time
+from urllib.parse import urlencode, urljoin
+
+from app.services.plex_client import plex_client
+
+
+SELECTION_TIMEOUT_SECONDS = 3
+SELECTION_POLL_SECONDS = 0.1
+PREWARM_TIMEOUT_SECONDS = 10
+
+AUDIO_STREAM_TYPE = "2"
+SUBTITLE_STREAM_TYPE = "3"
+
+
+def _run_concurrently(calls):
+    """Run zero-argument callables as background tasks, wait, and re-raise the first error."""
+    from app import socketio
+
+    errors = []
+
+    def guarded(call):
+        try:
+            call()
+        except Exception as e:
+            errors.append(e)
+
+    tasks = [socketio.start_background_task(guarded, call) for call in calls]
+    for task in tasks:
+        task.join()
+
+    if errors:
+        raise errors[0]
+
+
+def apply_stream_selection(plex, item, audio_id, subtitle_id):
+    """
+    Select audio/subtitle streams on every part of the item at once.
+    subtitle_id "" means subtitles off. Returns True if anything was changed.
+    """
+    calls = []
+
+    for part in item.iterParts():
+        if audio_id:
+            stream = next((s for s in part.audioStreams() if str(s.id) == str(audio_id)), None)
+            if stream:
+                calls.append(lambda part=part, stream=stream: part.setSelectedAudioStream(stream))
+
+        if subtitle_id:
+            stream = next((s for s in part.subtitleStreams() if str(s.id) == str(subtitle_id)), None)
+            if stream:
+                calls.append(lambda part=part, stream=stream: part.setSelectedSubtitleStream(stream))
+        elif subtitle_id == "":
+            calls.append(lambda part=part: plex.query(
+                f"/library/parts/{part.id}?subtitleStreamID=0&allParts=1", method=plex._session.put))
+
+    _run_concurrently(calls)
+    return bool(calls)
+
+
+def _selection_applied(plex, rating_key, audio_id, subtitle_id):
+    container = plex.query(f"/library/metadata/{int(rating_key)}")
+
+    for part in container.iter("Part"):
+        selected = {
+            s.attrib.get("streamType"): s.attrib.get("id")
+            for s in part.iter("Stream")
+            if s.attrib.get("selected") == "1"
+        }
+        if audio_id and selected.get(AUDIO_STREAM_TYPE) != str(audio_id):
+            return False
+        if subtitle_id and selected.get(SUBTITLE_STREAM_TYPE) != str(subtitle_id):
+            return False
+        if subtitle_id == "" and SUBTITLE_STREAM_TYPE in selected:
+            return False
+    return True
+
+
+def wait_for_selection(plex, rating_key, audio_id, subtitle_id):
+    """Poll the item until Plex reports the new selection; False on timeout."""
+    from app import socketio
+
+    deadline = time.time() + SELECTION_TIMEOUT_SECONDS
+    while True:
+        if _selection_applied(plex, rating_key, audio_id, subtitle_id):
+            return True
+        if time.time() >= deadline:
+            print(f"[PLEX] Stream selection for {rating_key} not visible after {SELECTION_TIMEOUT_SECONDS}s")
+            return False
+        socketio.sleep(SELECTION_POLL_SECONDS)
+
+
+def _first_uri(playlist_text):
+    for line in playlist_text.splitlines():
+        line = line.strip()
+        if line and not line.startswith("#"):
+            return line
+    return None
+
+
+def prewarm_transcode(endpoint, params):
+    """
+    Start the transcode session the room is about to play by walking
+    start.m3u8 -> variant playlist -> first segment, so viewers' first
+    requests find it already running. Failures are logged, never raised.
+    """
+    url = f"{plex_client.url}{endpoint}?{urlencode(params)}"
+    session = plex_client.session
+    # Relative playlist/segment URIs drop the query string, so send the token as a header.
+    headers = {"X-Plex-Token": plex_client.token}
+    started = time.time()
+
+    try:
+        for _ in range(2):
+            resp = session.get(url, headers=headers, timeout=PREWARM_TIMEOUT_SECONDS)
+            resp.raise_for_status()
+            next_uri = _first_uri(resp.text)
+            if not next_uri:
+                return False
+            url = urljoin(url, next_uri)
+
+        # The segment request blocks until the transcoder has produced it.
+        with session.get(url, headers=headers, stream=True, timeout=PREWARM_TIMEOUT_SECONDS) as resp:
+            resp.raise_for_status()
+            for _ in resp.iter_content(64 * 1024):
+                pass
+
+        print(f"[PLEX] Transcode warmed in {time.time() - started:.1f}s")
+        return True
+    except Exception as e:
+        print(f"[PLEX] Transcode pre-warm failed: {e}")
+        return False
@@ -0,0 +1,292 @@
+import hashlib
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from app.services.plex_client import plex_client
+
+
+DEFAULT_DISK_MB = 512
+DEFAULT_MEMORY_MB = 32
+CHUNK_SIZE = 64 * 1024
+FOLLOWER_TIMEOUT_SECONDS = 30
+
+EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/webp": ".webp",
+}
+MIMETYPES = {ext: mimetype for mimetype, ext in EXTENSIONS.items()}
+
+
+def poster_key(thumb_path, width, height):
+    return hashlib.sha1(f"{thumb_path}|{width}x{height}".encode("utf-8")).hexdigest()
+
+
+class PosterEntry:
+    def __init__(self, key, filename, size, last_used):
+        self.key = key
+        self.filename = filename
+        self.size = size
+        self.last_used = last_used
+
+    @property
+    def mimetype(self):
+        return MIMETYPES.get(os.path.splitext(self.filename)[1], "image/jpeg")
+
+
+class PendingFetch:
+    def __init__(self):
+        self.done = threading.Event()
+        self.ok = False
+
+
+class PosterDownload:
+    """
+    The leader's read of one uncached poster. Iterating streams the body to
+    the client while writing it to disk. close() must run however the
+    response ends - it is registered with call_on_close - so the upstream is
+    closed and the pending fetch released even if the body is never read
+    (HEAD, client gone before the first chunk).
+    """
+
+    def __init__(self, cache, key, pending, resp, mimetype):
+        self.cache = cache
+        self.key = key
+        self.pending = pending
+        self.resp = resp
+        self.mimetype = mimetype
+        self.stored = False
+        self.closed = False
+        self._chunks = None
+
+    def __iter__(self):
+        if self._chunks is None:
+            self._chunks = self._stream_and_store()
+        return self._chunks
+
+    def _stream_and_store(self):
+        tmp_path = os.path.join(self.cache.root, f"{self.key}.{uuid.uuid4().hex[:8]}.part")
+        parts = []
+        try:
+            with open(tmp_path, "wb") as f:
+                for chunk in self.resp.iter_content(CHUNK_SIZE):
+                    f.write(chunk)
+                    parts.append(chunk)
+                    yield chunk
+            self.cache._store(self.key, tmp_path, self.mimetype, b"".join(parts))
+            self.stored = True
+        finally:
+            if not self.stored:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            if self._chunks is not None:
+                self._chunks.close()
+        finally:
+            self.resp.close()
+            self.cache._release(self.key, self.pending, self.stored)
+
+
+class PosterCache:
+    """
+    Content-addressed poster store for /api/plex/image.
+
+    Posters are keyed by sha1(thumb path, width, height) - Plex thumb paths
+    carry an update timestamp, so a key's bytes never change and can be
+    cached by browsers forever. Files live under <instance>/poster_cache
+    with a byte-bounded LRU on disk and a smaller in-memory hot tier in
+    front. On a miss the first request streams the Plex transcode to the
+    client while writing it to disk; concurrent requests for the same key
+    wait for that one fetch instead of starting their own.
+    """
+
+    def __init__(self):
+        self.root = None
+        self.max_disk_bytes = DEFAULT_DISK_MB * 1024 * 1024
+        self.max_memory_bytes = DEFAULT_MEMORY_MB * 1024 * 1024
+
+        self.entries = OrderedDict()   # key -> PosterEntry, least recently used first
+        self.disk_bytes = 0
+        self.memory = OrderedDict()    # key -> bytes
+        self.memory_bytes = 0
+        self.pending = {}              # key -> PendingFetch
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.merged = 0
+        self._lock = threading.RLock()
+
+    def init_app(self, app):
+        self.root = app.config.get("PLEX_POSTER_CACHE_DIR") or os.path.join(app.instance_path, "poster_cache")
+        self.max_disk_bytes = int(app.config.get("PLEX_POSTER_CACHE_MB", DEFAULT_DISK_MB)) * 1024 * 1024
+        self.max_memory_bytes = int(app.config.get("PLEX_POSTER_MEMORY_MB", DEFAULT_MEMORY_MB)) * 1024 * 1024
+        os.makedirs(self.root, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        found = []
+        for filename in os.listdir(self.root):
+            key, ext = os.path.splitext(filename)
+            path = os.path.join(self.root, filename)
+            if ext not in MIMETYPES:
+                # Leftover partial download.
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            st = os.stat(path)
+            found.append(PosterEntry(key, filename, st.st_size, st.st_mtime))
+
+        found.sort(key=lambda e: e.last_used)
+        with self._lock:
+            for entry in found:
+                self.entries[entry.key] = entry
+                self.disk_bytes += entry.size
+            self._evict_disk()
+
+    # ────────────────────────────────────────────────────────────────
+
+    def lookup(self, key):
+        """Return (entry, data-or-None) for a cached poster, else (None, None)."""
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None, None
+
+            entry.last_used = time.time()
+            self.entries.move_to_end(key)
+
+            data = self.memory.get(key)
+            if data is not None:
+                self.memory.move_to_end(key)
+                self.memory_hits += 1
+                return entry, data
+
+            self.disk_hits += 1
+            return entry, None
+
+    def path_for(self, entry):
+        return os.path.join(self.root, entry.filename)
+
+    def read(self, entry):
+        try:
+            with open(self.path_for(entry), "rb") as f:
+                data = f.read()
+        except OSError:
+            self._drop(entry.key)
+            return None
+        self._remember(entry.key, data)
+        return data
+
+    def _remember(self, key, data):
+        with self._lock:
+            if len(data) > self.max_memory_bytes or key in self.memory:
+                return
+            self.memory[key] = data
+            self.memory_bytes += len(data)
+            while self.memory_bytes > self.max_memory_bytes:
+                _, evicted = self.memory.popitem(last=False)
+                self.memory_bytes -= len(evicted)
+
+    def _drop(self, key):
+        with self._lock:
+            entry = self.entries.pop(key, None)
+            if entry:
+                self.disk_bytes -= entry.size
+            data = self.memory.pop(key, None)
+            if data is not None:
+                self.memory_bytes -= len(data)
+
+    def _evict_disk(self):
+        while self.disk_bytes > self.max_disk_bytes and self.entries:
+            key, entry = next(iter(self.entries.items()))
+            self._drop(key)
+            try:
+                os.remove(self.path_for(entry))
+            except OSError:
+                pass
+
+    def _store(self, key, tmp_path, mimetype, data):
+        filename = key + EXTENSIONS.get(mimetype, ".jpg")
+        os.replace(tmp_path, os.path.join(self.root, filename))
+        with self._lock:
+            self._drop(key)
+            self.entries[key] = PosterEntry(key, filename, len(data), time.time())
+            self.disk_bytes += len(data)
+            self._remember(key, data)
+            self._evict_disk()
+
+    # ────────────────────────────────────────────────────────────────
+
+    def claim(self, key):
+        """
+        Register interest in an uncached key. Returns (pending, is_leader):
+        the leader fetches from Plex, everyone else waits on pending.done.
+        """
+        with self._lock:
+            pending = self.pending.get(key)
+            if pending:
+                self.merged += 1
+                return pending, False
+            pending = PendingFetch()
+            self.pending[key] = pending
+            self.misses += 1
+            return pending, True
+
+    def wait(self, pending):
+        return pending.done.wait(FOLLOWER_TIMEOUT_SECONDS) and pending.ok
+
+    def _release(self, key, pending, ok):
+        with self._lock:
+            self.pending.pop(key, None)
+        pending.ok = ok
+        pending.done.set()
+
+    def fetch(self, key, pending, image_url):
+        """
+        Start the upstream request; returns (response, download). The caller
+        must close() the PosterDownload once its response is finished. A
+        non-200 response is released uncached and returned with download None.
+        """
+        try:
+            resp = plex_client.session.get(image_url, stream=True, timeout=plex_client.timeout)
+        except Exception:
+            self._release(key, pending, False)
+            raise
+
+        if resp.status_code != 200:
+            self._release(key, pending, False)
+            return resp, None
+
+        mimetype = resp.headers.get("content-type", "image/jpeg").split(";")[0].strip()
+        return resp, PosterDownload(self, key, pending, resp, mimetype)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self.entries),
+                "disk_bytes": self.disk_bytes,
+                "max_disk_bytes": self.max_disk_bytes,
+                "memory_entries": len(self.memory),
+                "memory_bytes": self.memory_bytes,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "merged": self.merged,
+            }
+
+
+# ─── Singleton ────────────────────────────────────────────────────────
+poster_cache = PosterCache()
@@ -0,0 +1,224 @@
+import threading
+import time
+
+
+class UserMultiset:
+    """Usernames with a connection count each, in first-join order."""
+
+    def __init__(self):
+        self.counts = {}
+
+    def add(self, username):
+        """Count one more connection; True if the user was not present before."""
+        count = self.counts.get(username, 0)
+        self.counts[username] = count + 1
+        return count == 0
+
+    def remove(self, username):
+        """Count one connection less; True if that was the user's last one."""
+        count = self.counts.get(username, 0)
+        if count <= 1:
+            self.counts.pop(username, None)
+            return count == 1
+        self.counts[username] = count - 1
+        return False
+
+    def users(self):
+        return list(self.counts)
+
+    def __contains__(self, username):
+        return username in self.counts
+
+    def __len__(self):
+        return len(self.counts)
+
+
+class SocketPresence:
+    __slots__ = ("username", "live_tv", "channel_id", "room_id")
+
+    def __init__(self, username):
+        self.username = username
+        self.live_tv = False
+        self.channel_id = None
+        self.room_id = None
+
+
+class PresenceStore:
+    """
+    Who is connected, on Live TV, and in which watch room.
+
+    Every socket is recorded once (sid -> username, Live TV flag, room) and
+    each audience - everyone online, Live TV, each room - is a refcounted
+    multiset of usernames, so a user with three tabs counts once and joins,
+    leaves and "unique users" are all O(1). Mutators return whether the
+    visible user list changed, which is what the socket handlers turn into
+    joined/left deltas.
+
+    Heartbeat users (HTTP /api/heartbeat, no socket) are tracked separately
+    by last-seen time, as before.
+    """
+
+    def __init__(self):
+        self.sockets = {}            # sid -> SocketPresence
+        self.online = UserMultiset()
+        self.live_tv = UserMultiset()
+        self.channel_viewers = {}    # channel_id -> Live TV socket count
+        self.rooms = {}              # room_id -> UserMultiset
+        self.room_sids = {}          # room_id -> set(sid)
+        self.last_seen = {}          # username -> heartbeat/connect time
+        self._lock = threading.RLock()
+
+    # ─── Connections ────────────────────────────────────────────────
+
+    def connect(self, sid, username):
+        with self._lock:
+            self.sockets[sid] = SocketPresence(username)
+            self.last_seen[username] = time.time()
+            return self.online.add(username)
+
+    def disconnect(self, sid):
+        """
+        Forget a socket. Returns (presence, went_offline, left_live_tv,
+        room_id, left_room) - presence is None for an unknown sid.
+        """
+        with self._lock:
+            presence = self.sockets.pop(sid, None)
+            if presence is None:
+                return None, False, False, None, False
+
+            went_offline = self.online.remove(presence.username)
+            if went_offline:
+                self.last_seen.pop(presence.username, None)
+
+            left_live_tv = self.live_tv.remove(presence.username) if presence.live_tv else False
+            self._stop_watching(presence)
+            room_id = presence.room_id
+            left_room = self._leave_room(sid, presence) if room_id else False
+            return presence, went_offline, left_live_tv, room_id, left_room
+
+    def username(self, sid):
+        presence = self.sockets.get(sid)
+        return presence.username if presence else None
+
+    # ─── Heartbeat-only users ───────────────────────────────────────
+
+    def heartbeat(self, username):
+        with self._lock:
+            self.last_seen[username] = time.time()
+
+    def online_users(self, stale_after=None):
+        """Socket-connected users plus heartbeat users seen within stale_after seconds."""
+        with self._lock:
+            if stale_after is not None:
+                cutoff = time.time() - stale_after
+                for username in [u for u, ts in self.last_seen.items() if ts < cutoff and u not in self.online]:
+                    self.last_seen.pop(username, None)
+            return sorted(set(self.online.users()) | set(self.last_seen))
+
+    # ─── Live TV ────────────────────────────────────────────────────
+
+    def join_live_tv(self, sid, username):
+        with self._lock:
+            presence = self.sockets.get(sid) or self.sockets.setdefault(sid, SocketPresence(username))
+            if presence.live_tv:
+                return False
+            presence.live_tv = True
+            return self.live_tv.add(presence.username)
+
+    def is_on_live_tv(self, sid):
+        presence = self.sockets.get(sid)
+        return bool(presence and presence.live_tv)
+
+    def live_tv_users(self):
+        return self.live_tv.users()
+
+    def watch_channel(self, sid, channel_id):
+        """Record which channel a Live TV socket is on; False for sockets not on Live TV."""
+        with self._lock:
+            presence = self.sockets.get(sid)
+            if not presence or not presence.live_tv:
+                return False
+            if presence.channel_id != channel_id:
+                self._stop_watching(presence)
+                presence.channel_id = channel_id
+                self.channel_viewers[channel_id] = self.channel_viewers.get(channel_id, 0) + 1
+            return True
+
+    def _stop_watching(self, presence):
+        channel_id = presence.channel_id
+        if channel_id is None:
+            return
+        presence.channel_id = None
+        remaining = self.channel_viewers.get(channel_id, 0) - 1
+        if remaining > 0:
+            self.channel_viewers[channel_id] = remaining
+        else:
+            self.channel_viewers.pop(channel_id, None)
+
+    def channel_viewer_counts(self):
+        """Live TV sockets per channel, for the stream manager's idle reaper."""
+        with self._lock:
+            return dict(self.channel_viewers)
+
+    # ─── Watch rooms ────────────────────────────────────────────────
+
+    def join_room(self, sid, room_id, username):
+        """
+        Put a socket in a room (leaving any previous one). Returns
+        (joined, previous_room_id, left_previous).
+        """
+        with self._lock:
+            presence = self.sockets.get(sid) or self.sockets.setdefault(sid, SocketPresence(username))
+            previous, left_previous = presence.room_id, False
+            if previous == room_id:
+                return False, None, False
+            if previous:
+                left_previous = self._leave_room(sid, presence)
+
+            presence.room_id = room_id
+            self.room_sids.setdefault(room_id, set()).add(sid)
+            joined = self.rooms.setdefault(room_id, UserMultiset()).add(presence.username)
+            return joined, previous, left_previous
+
+    def _leave_room(self, sid, presence):
+        room_id = presence.room_id
+        presence.room_id = None
+
+        sids = self.room_sids.get(room_id)
+        if sids is not None:
+            sids.discard(sid)
+        users = self.rooms.get(room_id)
+        return users.remove(presence.username) if users is not None else False
+
+    def room_of(self, sid):
+        presence = self.sockets.get(sid)
+        return presence.room_id if presence else None
+
+    def room_users(self, room_id):
+        users = self.rooms.get(room_id)
+        return users.users() if users else []
+
+    def room_user_count(self, room_id):
+        users = self.rooms.get(room_id)
+        return len(users) if users else 0
+
+    def room_has_users(self, room_id):
+        return bool(self.room_sids.get(room_id))
+
+    def clear_room(self, room_id):
+        with self._lock:
+            self.rooms.pop(room_id, None)
+            self.room_sids.pop(room_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sockets": len(self.sockets),
+                "online_users": len(self.online),
+                "live_tv_users": len(self.live_tv),
+                "rooms": {room_id: len(users) for room_id, users in self.rooms.items() if len(users)},
+            }
+
+
+# ─── Singleton ────────────────────────────────────────────────────────
+presence = PresenceStore()
@@ -0,0 +1,110 @@
+import threading
+
+
+DEFAULT_WINDOW_MS = 250
+
+
+class AudienceState:
+    def __init__(self):
+        self.version = 0
+        self.users = []        # list as of the last broadcast delta
+        self.scheduled = False
+
+
+class PresenceBroadcaster:
+    """
+    Batched, versioned user-list updates per audience.
+
+    An audience is "online", "live_tv" or "room:<id>". Presence changes only
+    mark an audience dirty; the first mark in a quiet period schedules one
+    flush window_ms later, which diffs the current users (users_provider)
+    against the list last broadcast and hands a single
+    {version, joined, left} delta to on_delta. A reconnect storm therefore
+    costs one message per audience per window instead of one per socket.
+
+    snapshot() returns the last broadcast list with its version, so a client
+    that applies every following delta in order stays exact; a client that
+    sees a version gap asks for a new snapshot.
+    """
+
+    def __init__(self):
+        self.window = DEFAULT_WINDOW_MS / 1000.0
+        self.users_provider = None  # audience -> current usernames
+        self.on_delta = None        # (audience, payload) -> None
+        self.audiences = {}
+        self.marks = 0
+        self.deltas_sent = 0
+        self._lock = threading.RLock()
+
+    def init_app(self, app):
+        self.window = int(app.config.get("PRESENCE_BROADCAST_MS", DEFAULT_WINDOW_MS)) / 1000.0
+
+    def _state(self, audience):
+        state = self.audiences.get(audience)
+        if state is None:
+            state = self.audiences[audience] = AudienceState()
+        return state
+
+    def changed(self, audience):
+        from app import socketio
+
+        with self._lock:
+            self.marks += 1
+            state = self._state(audience)
+            if state.scheduled:
+                return
+            state.scheduled = True
+        socketio.start_background_task(self._flush_after_window, audience)
+
+    def _flush_after_window(self, audience):
+        from app import socketio
+
+        socketio.sleep(self.window)
+        self.flush(audience)
+
+    def flush(self, audience):
+        with self._lock:
+            state = self.audiences.get(audience)
+            if state is None:
+                return
+            state.scheduled = False
+
+            current = list(self.users_provider(audience)) if self.users_provider else []
+            current_set, previous_set = set(current), set(state.users)
+            joined = [u for u in current if u not in previous_set]
+            left = [u for u in state.users if u not in current_set]
+            if not joined and not left:
+                return
+
+            state.version += 1
+            state.users = current
+            payload = {"version": state.version, "joined": joined, "left": left}
+
+        if self.on_delta:
+            try:
+                self.on_delta(audience, payload)
+                self.deltas_sent += 1
+            except Exception as e:
+                print(f"[PRESENCE] Could not broadcast {audience}: {e}")
+
+    def snapshot(self, audience):
+        with self._lock:
+            state = self._state(audience)
+            return {"version": state.version, "users": list(state.users)}
+
+    def forget(self, audience):
+        """Drop an audience that no longer exists (room deleted)."""
+        with self._lock:
+            self.audiences.pop(audience, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "audiences": len(self.audiences),
+                "marks": self.marks,
+                "deltas_sent": self.deltas_sent,
+            }
+
+
+# ─── Singleton ────────────────────────────────────────────────────────
+presence_broadcaster = PresenceBroadcaster()
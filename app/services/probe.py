@@ -0,0 +1,152 @@
+import json
+import os
+import subprocess
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import ChannelProbe
+
+
+PROBE_TIMEOUT_SECONDS = 8
+PROBE_TTL = timedelta(hours=24)
+
+# What browsers (via hls.js / native HLS) can play from an MPEG-TS segment.
+COPY_VIDEO_CODECS = {"h264"}
+COPY_AUDIO_CODECS = {"aac", "mp3"}
+COPY_PIX_FMTS = {"yuv420p", "yuvj420p"}
+UNSUPPORTED_H264_PROFILES = {"high 10", "high 4:2:2", "high 4:4:4 predictive"}
+
+MODE_COPY = "copy"
+MODE_TRANSCODE = "transcode"
+
+
+def get_ffprobe_path(ffmpeg_path):
+    """ffprobe ships next to ffmpeg; fall back to PATH."""
+    folder, name = os.path.split(ffmpeg_path)
+    if folder:
+        candidate = os.path.join(folder, name.replace("ffmpeg", "ffprobe"))
+        if os.path.exists(candidate):
+            return candidate
+    return "ffprobe"
+
+
+def run_ffprobe(ffprobe, url):
+    """Return {video_codec, video_profile, pix_fmt, audio_codecs, format_name} or None."""
+    cmd = [
+        ffprobe,
+        "-v", "error",
+        "-user_agent", "VLC/3.0.20 LibVLC/3.0.20",
+        "-rw_timeout", str(PROBE_TIMEOUT_SECONDS * 1000000),
+        "-show_entries", "stream=codec_type,codec_name,profile,pix_fmt:format=format_name",
+        "-of", "json",
+        url,
+    ]
+
+    try:
+        result = subprocess.run(cmd, capture_output=True, timeout=PROBE_TIMEOUT_SECONDS)
+        data = json.loads(result.stdout or b"{}")
+    except Exception as e:
+        print(f"[PROBE] ffprobe failed: {e}")
+        return None
+
+    video = next((s for s in data.get("streams", []) if s.get("codec_type") == "video"), None)
+    if not video:
+        return None
+
+    audio_codecs = [s.get("codec_name") for s in data.get("streams", []) if s.get("codec_type") == "audio"]
+
+    return {
+        "video_codec": video.get("codec_name"),
+        "video_profile": video.get("profile"),
+        "pix_fmt": video.get("pix_fmt"),
+        "audio_codecs": audio_codecs,
+        "format_name": data.get("format", {}).get("format_name"),
+    }
+
+
+def choose_mode(info):
+    """Pick remux when the source is already browser-playable, else transcode."""
+    if not info:
+        return MODE_TRANSCODE
+
+    if info["video_codec"] not in COPY_VIDEO_CODECS:
+        return MODE_TRANSCODE
+    if info["pix_fmt"] and info["pix_fmt"] not in COPY_PIX_FMTS:
+        return MODE_TRANSCODE
+    if (info["video_profile"] or "").lower() in UNSUPPORTED_H264_PROFILES:
+        return MODE_TRANSCODE
+    if any(codec not in COPY_AUDIO_CODECS for codec in info["audio_codecs"]):
+        return MODE_TRANSCODE
+
+    return MODE_COPY
+
+
+def get_stream_mode(channel_id, url, ffmpeg_path):
+    """
+    Return "copy" or "transcode" for a channel, probing only when the cached
+    result is missing, stale, or was recorded for a different URL.
+    Must be called inside an app context.
+    """
+    try:
+        probe = ChannelProbe.query.get(channel_id)
+    except Exception as e:
+        print(f"[PROBE] Cache unavailable: {e}")
+        probe = None
+        db.session.rollback()
+
+    if probe and probe.url == url and probe.probed_at and datetime.utcnow() - probe.probed_at < PROBE_TTL:
+        return probe.stream_mode
+
+    info = run_ffprobe(get_ffprobe_path(ffmpeg_path), url)
+    mode = choose_mode(info)
+    print(f"[PROBE] Channel {channel_id}: {info} -> {mode}")
+
+    # Unreachable sources are not cached so the next start probes again.
+    if info is not None:
+        _save_probe(channel_id, url, mode, info)
+
+    return mode
+
+
+def has_audio(channel_id):
+    """
+    Whether the channel's last probe found an audio stream. Assumed True when
+    there is no probe yet. Must be called inside an app context.
+    """
+    try:
+        probe = ChannelProbe.query.get(channel_id)
+    except Exception as e:
+        print(f"[PROBE] Cache unavailable: {e}")
+        db.session.rollback()
+        return True
+    return probe is None or bool(probe.audio_codec)
+
+
+def mark_transcode_required(channel_id):
+    """Remux failed at runtime; remember to transcode this channel."""
+    try:
+        probe = ChannelProbe.query.get(channel_id)
+        if probe:
+            probe.stream_mode = MODE_TRANSCODE
+            probe.probed_at = datetime.utcnow()
+            db.session.commit()
+    except Exception as e:
+        print(f"[PROBE] Could not update cache: {e}")
+        db.session.rollback()
+
+
+def _save_probe(channel_id, url, mode, info):
+    try:
+        probe = ChannelProbe.query.get(channel_id) or ChannelProbe(channel_id=channel_id)
+        probe.url = url
+        probe.video_codec = info["video_codec"]
+        probe.audio_codec = ",".join(c for c in info["audio_codecs"] if c)
+        probe.pix_fmt = info["pix_fmt"]
+        probe.format_name = info["format_name"]
+        probe.stream_mode = mode
+        probe.probed_at = datetime.utcnow()
+        db.session.add(probe)
+        db.session.commit()
+    except Exception as e:
+        print(f"[PROBE] Could not save cache: {e}")
+        db.session.rollback()
@@ -0,0 +1,251 @@
+import hashlib
+import os
+import threading
+
+from app import db
+from app.models import RomFile
+from app.services.rom_delivery import rom_url
+
+
+DEFAULT_SCAN_SECONDS = 60
+HASH_CHUNK_SIZE = 1024 * 1024
+# sleep(0) would not let the event loop poll sockets or fire timers.
+HASH_YIELD_SECONDS = 0.001
+
+SYSTEMS = ("snes", "n64", "psx")
+SYSTEM_EXTENSIONS = {
+    "smc": "snes", "sfc": "snes",
+    "z64": "n64", "n64": "n64", "v64": "n64",
+    "bin": "psx", "cue": "psx", "chd": "psx",
+}
+
+
+def classify(rel_path, filename):
+    """Which emulator core a ROM belongs to, from its folder names or extension."""
+    lower_path = rel_path.lower()
+    if "snes" in lower_path:
+        return "snes"
+    if "n64" in lower_path:
+        return "n64"
+    if "psx" in lower_path or "ps1" in lower_path:
+        return "psx"
+
+    ext = filename.rsplit(".", 1)[-1].lower()
+    if ext in SYSTEM_EXTENSIONS:
+        return SYSTEM_EXTENSIONS[ext]
+
+    # Anything else is filed under its top-level folder (roms/<system>/...).
+    parts = lower_path.split("/")
+    return parts[1] if len(parts) > 2 else None
+
+
+def file_sha1(path):
+    from app import socketio
+
+    digest = hashlib.sha1()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+            socketio.sleep(HASH_YIELD_SECONDS)
+    return digest.hexdigest()
+
+
+class RomCatalog:
+    """
+    Persistent index of static/roms.
+
+    Rows in rom_file (path, system, size, mtime, sha1) are loaded once and
+    served from memory grouped by system and sorted by name, so the emulator
+    page and /api/roms no longer walk the tree per request. A background
+    scan every scan_seconds stats the tree and only touches rows whose
+    size/mtime changed, appeared or vanished; content hashes are computed
+    afterwards, one file at a time, for rows that do not have one yet, and
+    each newly hashed entry is passed to on_hashed.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.static_dir = None
+        self.roms_dir = None
+        self.scan_seconds = DEFAULT_SCAN_SECONDS
+        self.entries = {}    # path -> dict
+        self.by_system = {}  # system -> [entry] sorted by name
+        self.loaded = False
+        self.scans = 0
+        self.hashed = 0
+        self.on_hashed = None  # entry -> None
+        self._started = False
+        self._lock = threading.RLock()
+
+    def init_app(self, app):
+        self.app = app
+        self.static_dir = app.static_folder
+        self.roms_dir = os.path.join(app.static_folder, "roms")
+        self.scan_seconds = int(app.config.get("ROM_CATALOG_SCAN_SECONDS", self.scan_seconds))
+
+    # ─── Loading ────────────────────────────────────────────────────
+
+    def ensure_loaded(self):
+        """Load the catalog (scanning on first ever use) and start the rescans."""
+        if not self.loaded:
+            with self._lock:
+                if not self.loaded:
+                    for row in RomFile.query.all():
+                        self.entries[row.path] = self._entry(row.path, row.name, row.system,
+                                                             row.size, row.mtime_ns, row.sha1)
+                    if not self.entries:
+                        self.scan()
+                    self._reindex()
+                    self.loaded = True
+        self._ensure_scanner()
+
+    def _entry(self, path, name, system, size, mtime_ns, sha1=None):
+        return {"path": path, "name": name, "system": system, "size": size, "mtime_ns": mtime_ns, "sha1": sha1}
+
+    def _reindex(self):
+        by_system = {}
+        for entry in self.entries.values():
+            if entry["system"]:
+                by_system.setdefault(entry["system"], []).append(entry)
+        for entries in by_system.values():
+            entries.sort(key=lambda e: (e["name"].lower(), e["path"]))
+        self.by_system = by_system
+
+    # ─── Scanning ───────────────────────────────────────────────────
+
+    def _walk(self):
+        found = {}
+        if not os.path.isdir(self.roms_dir):
+            return found
+        for root, dirs, files in os.walk(self.roms_dir):
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            for filename in files:
+                if filename.startswith("."):
+                    continue
+                full_path = os.path.join(root, filename)
+                try:
+                    st = os.stat(full_path)
+                except OSError:
+                    continue
+                rel_path = os.path.relpath(full_path, self.static_dir).replace("\\", "/")
+                found[rel_path] = (filename, st.st_size, st.st_mtime_ns)
+        return found
+
+    def scan(self):
+        """Reconcile the catalog with the disk. Needs an app context. Returns rows changed."""
+        found = self._walk()
+        with self._lock:
+            removed = [path for path in self.entries if path not in found]
+            changed = []
+            for path, (filename, size, mtime_ns) in found.items():
+                entry = self.entries.get(path)
+                if entry and entry["size"] == size and entry["mtime_ns"] == mtime_ns:
+                    continue
+                changed.append(self._entry(path, filename, classify(path, filename), size, mtime_ns))
+
+            if not removed and not changed:
+                self.scans += 1
+                return 0
+
+            try:
+                if removed:
+                    RomFile.query.filter(RomFile.path.in_(removed)).delete(synchronize_session=False)
+                for entry in changed:
+                    db.session.merge(RomFile(**entry))
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f"[ROMS] Could not save catalog changes: {e}")
+                return 0
+
+            for path in removed:
+                self.entries.pop(path, None)
+            for entry in changed:
+                self.entries[entry["path"]] = entry
+            self._reindex()
+            self.scans += 1
+
+        print(f"[ROMS] Catalog updated: {len(changed)} new/changed, {len(removed)} removed")
+        return len(changed) + len(removed)
+
+    def hash_pending(self):
+        """Fill in missing content hashes. Needs an app context."""
+        for entry in [e for e in self.entries.values() if not e["sha1"]]:
+            full_path = os.path.join(self.static_dir, entry["path"])
+            try:
+                sha1 = file_sha1(full_path)
+            except OSError:
+                continue
+
+            # The file may have changed or gone while it was being hashed.
+            if self.entries.get(entry["path"]) is not entry:
+                continue
+            entry["sha1"] = sha1
+            RomFile.query.filter_by(path=entry["path"]).update({"sha1": sha1})
+            db.session.commit()
+            self.hashed += 1
+            if self.on_hashed:
+                self.on_hashed(entry)
+
+    def _ensure_scanner(self):
+        if self._started or not self.app:
+            return
+
+        from app import socketio
+
+        self._started = True
+        socketio.start_background_task(self._scan_loop)
+
+    def _scan_loop(self):
+        from app import socketio
+
+        while True:
+            try:
+                with self.app.app_context():
+                    self.scan()
+                    self.hash_pending()
+            except Exception as e:
+                print(f"[ROMS] Catalog scan failed: {e}")
+            socketio.sleep(self.scan_seconds)
+
+    # ─── Queries ────────────────────────────────────────────────────
+
+    def library(self):
+        """{system: [{'name', 'path', 'url'}]} for the emulator page."""
+        self.ensure_loaded()
+        return {
+            system: [{"name": e["name"], "path": e["path"], "url": rom_url(e)} for e in self.by_system.get(system, [])]
+            for system in SYSTEMS
+        }
+
+    def search(self, system, q="", offset=0, limit=None):
+        """Return (page, total) of a system's ROMs whose name contains q, by name."""
+        self.ensure_loaded()
+        entries = self.by_system.get((system or "").lower(), [])
+        q = (q or "").strip().lower()
+        if q:
+            entries = [e for e in entries if q in e["name"].lower()]
+
+        page = entries[offset:offset + limit] if limit is not None else entries[offset:]
+        return [
+            {"name": e["name"], "path": e["path"], "url": rom_url(e), "core": system,
+             "size": e["size"], "sha1": e["sha1"]}
+            for e in page
+        ], len(entries)
+
+    def get(self, path):
+        self.ensure_loaded()
+        return self.entries.get(path)
+
+    def stats(self):
+        return {
+            "roms": len(self.entries),
+            "systems": {system: len(entries) for system, entries in self.by_system.items()},
+            "unhashed": sum(1 for e in self.entries.values() if not e["sha1"]),
+            "scans": self.scans,
+            "hashed": self.hashed,
+        }
+
+
+# ─── Singleton ────────────────────────────────────────────────────────
+rom_catalog = RomCatalog()
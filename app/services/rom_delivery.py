@@ -0,0 +1,150 @@
+import gzip
+import os
+import threading
+
+from flask import request, send_file
+
+
+ROM_URL_PREFIX = "/arcade/rom"
+# Cartridge dumps shrink well; disc images (.bin/.chd) are large and mostly
+# already dense, so they are only served with Range support.
+COMPRESSIBLE_EXTENSIONS = {"smc", "sfc", "z64", "n64", "v64"}
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+# The gzip job runs as a greenlet: compress in small chunks and yield between
+# them so sockets and HLS requests keep being served. sleep(0) only switches
+# to greenlets that are already runnable; a real (short) sleep lets the event
+# loop poll sockets and fire timers.
+GZIP_LEVEL = 6
+GZIP_CHUNK_SIZE = 256 * 1024
+GZIP_YIELD_SECONDS = 0.001
+
+
+def is_compressible(path):
+    return path.rsplit(".", 1)[-1].lower() in COMPRESSIBLE_EXTENSIONS
+
+
+def rom_url(entry):
+    """URL for a catalog entry; versioned by content hash once it is known."""
+    url = f"{ROM_URL_PREFIX}/{entry['path']}"
+    return f"{url}?v={entry['sha1'][:12]}" if entry.get("sha1") else url
+
+
+class RomDelivery:
+    """
+    ROM downloads for the emulator.
+
+    Files are served from the ROM catalog only (never arbitrary static
+    paths) with Range support for partial loads and the content sha1 as a
+    strong ETag. URLs carry ?v=<sha1 prefix>; a request whose v matches the
+    current hash is cached as immutable, anything else revalidates.
+
+    Cartridge formats also get a gzip copy in cache_dir named by content
+    hash, written in the background once a ROM is hashed (or first asked
+    for) and served to clients that accept gzip and are not asking for a
+    byte range.
+    """
+
+    def __init__(self):
+        self.cache_dir = None
+        self.static_dir = None
+        self.compressing = set()
+        self.variants_written = 0
+        self.gzip_served = 0
+        self._lock = threading.RLock()
+
+    def init_app(self, app):
+        self.static_dir = app.static_folder
+        self.cache_dir = app.config.get("ROM_CACHE_DIR") or os.path.join(app.instance_path, "rom_cache")
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    # ─── Precompressed variants ─────────────────────────────────────
+
+    def gzip_path(self, entry):
+        return os.path.join(self.cache_dir, f"{entry['sha1']}.gz")
+
+    def precompress(self, entry):
+        """Start writing the gzip variant for a hashed cartridge ROM, if missing."""
+        if not entry.get("sha1") or not is_compressible(entry["path"]):
+            return
+        if os.path.exists(self.gzip_path(entry)):
+            return
+
+        from app import socketio
+
+        with self._lock:
+            if entry["sha1"] in self.compressing:
+                return
+            self.compressing.add(entry["sha1"])
+        socketio.start_background_task(self._write_gzip, dict(entry))
+
+    def _write_gzip(self, entry):
+        from app import socketio
+
+        target = self.gzip_path(entry)
+        tmp_path = f"{target}.{os.getpid()}.tmp"
+        try:
+            with open(os.path.join(self.static_dir, entry["path"]), "rb") as src, \
+                    gzip.open(tmp_path, "wb", compresslevel=GZIP_LEVEL) as dst:
+                for chunk in iter(lambda: src.read(GZIP_CHUNK_SIZE), b""):
+                    dst.write(chunk)
+                    socketio.sleep(GZIP_YIELD_SECONDS)
+            os.replace(tmp_path, target)
+            self.variants_written += 1
+        except OSError as e:
+            print(f"[ROMS] Could not precompress {entry['path']}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+        finally:
+            with self._lock:
+                self.compressing.discard(entry["sha1"])
+
+    # ─── Serving ────────────────────────────────────────────────────
+
+    def response(self, entry):
+        full_path = os.path.join(self.static_dir, entry["path"])
+        sha1 = entry.get("sha1")
+        compressible = is_compressible(entry["path"])
+
+        if (sha1 and compressible and "gzip" in request.accept_encodings
+                and not request.range):
+            gz_path = self.gzip_path(entry)
+            gz_size = os.path.getsize(gz_path) if os.path.exists(gz_path) else None
+            # Kept even when it did not shrink, so it is not rebuilt; just not served.
+            if gz_size is not None and gz_size < entry["size"]:
+                response = send_file(gz_path, mimetype="application/octet-stream",
+                                     conditional=True, etag=f"{sha1}-gzip")
+                response.content_encoding = "gzip"
+                self.gzip_served += 1
+                return self._cache_headers(response, entry, compressible)
+            if gz_size is None:
+                self.precompress(entry)
+
+        response = send_file(full_path, mimetype="application/octet-stream",
+                             conditional=True, etag=sha1 or True)
+        return self._cache_headers(response, entry, compressible)
+
+    def _cache_headers(self, response, entry, compressible):
+        sha1 = entry.get("sha1")
+        response.cache_control.private = True
+        if sha1 and request.args.get("v") == sha1[:12]:
+            response.cache_control.no_cache = None
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.no_cache = True
+        if compressible:
+            response.vary.add("Accept-Encoding")
+        return response
+
+    def stats(self):
+        return {
+            "variants_written": self.variants_written,
+            "compressing": len(self.compressing),
+            "gzip_served": self.gzip_served,
+        }
+
+
+# ─── Singleton ────────────────────────────────────────────────────────
+rom_delivery = RomDelivery()
@@ -0,0 +1,125 @@
+import threading
+
+from app.services.room_registry import room_registry
+
+
+DEFAULT_WINDOW_MS = 250
+
+
+class RoomDirectory:
+    """
+    The Watch Together landing page listing, kept serialized in memory.
+
+    Entries are built from the room registry (loaded once with hosts
+    eager-loaded, so no per-room host query) plus the live user count from
+    user_count_provider. Registry updates and room presence deltas mark a
+    room dirty; one flush per window re-serializes the dirty rooms and, if
+    anything a visitor can see changed, hands a versioned
+    {version, upserted, removed} delta to on_update for landing page
+    viewers. snapshot() is the listing as of the last flush.
+    """
+
+    def __init__(self):
+        self.window = DEFAULT_WINDOW_MS / 1000.0
+        self.user_count_provider = None  # room_id -> unique users in the room
+        self.on_update = None            # payload -> None
+        self.entries = {}                # room_id -> serialized room
+        self.listing = []                # entries, newest room first
+        self.version = 0
+        self.dirty = set()
+        self.loaded = False
+        self._scheduled = False
+        self._lock = threading.RLock()
+
+    def init_app(self, app):
+        self.window = int(app.config.get("PRESENCE_BROADCAST_MS", DEFAULT_WINDOW_MS)) / 1000.0
+
+    def serialize(self, info):
+        return {
+            "id": int(info.id),
+            "name": info.name,
+            "host": info.host_username,
+            "media_title": info.current_media_title,
+            "is_playing": bool(info.is_playing),
+            "users": self.user_count_provider(str(info.id)) if self.user_count_provider else 0,
+        }
+
+    def _rebuild_listing(self):
+        self.listing = sorted(self.entries.values(), key=lambda entry: entry["id"], reverse=True)
+
+    def ensure_loaded(self):
+        """Build the listing from the database once (needs an app context)."""
+        if self.loaded:
+            return
+        room_registry.load_all()
+        with self._lock:
+            for info in room_registry.all():
+                self.entries[str(info.id)] = self.serialize(info)
+            self._rebuild_listing()
+            self.loaded = True
+
+    # ─── Changes ────────────────────────────────────────────────────
+
+    def changed(self, room_id):
+        from app import socketio
+
+        with self._lock:
+            if not self.loaded:
+                return
+            self.dirty.add(str(room_id))
+            if self._scheduled:
+                return
+            self._scheduled = True
+        socketio.start_background_task(self._flush_after_window)
+
+    def _flush_after_window(self):
+        from app import socketio
+
+        socketio.sleep(self.window)
+        with self._lock:
+            self._scheduled = False
+        self.flush()
+
+    def flush(self):
+        with self._lock:
+            dirty, self.dirty = self.dirty, set()
+            upserted, removed = [], []
+            for room_id in dirty:
+                info = room_registry.rooms.get(room_id)
+                if info is None:
+                    if self.entries.pop(room_id, None) is not None:
+                        removed.append(int(room_id))
+                    continue
+                entry = self.serialize(info)
+                if entry != self.entries.get(room_id):
+                    self.entries[room_id] = entry
+                    upserted.append(entry)
+
+            if not upserted and not removed:
+                return
+            self.version += 1
+            self._rebuild_listing()
+            payload = {"version": self.version, "upserted": upserted, "removed": removed}
+
+        if self.on_update:
+            try:
+                self.on_update(payload)
+            except Exception as e:
+                print(f"[ROOM] Could not broadcast room listing: {e}")
+
+    # ─── Reads ──────────────────────────────────────────────────────
+
+    def snapshot(self):
+        """Listing plus version for the landing page; pending changes are flushed first."""
+        self.ensure_loaded()
+        self.flush()
+        with self._lock:
+            return {"version": self.version, "rooms": list(self.listing)}
+
+    def stats(self):
+        with self._lock:
+            return {"rooms": len(self.entries), "version": self.version, "dirty": len(self.dirty)}
+
+
+# ─── Singleton ────────────────────────────────────────────────────────
+room_directory = RoomDirectory()
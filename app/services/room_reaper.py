@@ -0,0 +1,162 @@
+import heapq
+import itertools
+import threading
+import time
+from datetime import datetime
+
+from app import db
+from app.models import Room
+
+
+DEFAULT_EMPTY_GRACE_SECONDS = 60
+# Deadlines are checked at this resolution; grace periods are tens of seconds.
+TICK_SECONDS = 1.0
+
+EMPTY = "empty"
+HOST = "host"
+
+
+class RoomReaper:
+    """
+    One background task for every room deadline.
+
+    Timers live in a heap ordered by deadline: EMPTY (delete a room nobody
+    has rejoined) and HOST (hand the room to someone else if the host has
+    not come back). Re-scheduling or cancelling a timer just replaces its
+    entry in `timers`; stale heap entries are skipped when they surface, so
+    a rejoin costs a dict write instead of leaving a sleeping greenlet.
+
+    Due EMPTY timers are re-checked against occupied_provider and handed to
+    delete_rooms in one batch (one DELETE for all of them). On first start
+    every existing room is scheduled from its last_updated time, which
+    covers rooms left behind by a restart.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.empty_grace = DEFAULT_EMPTY_GRACE_SECONDS
+        self.occupied_provider = None  # room_id -> bool
+        self.delete_rooms = None       # [room_id] -> None, runs in an app context
+        self.transfer_host = None      # (room_id, old_host_username) -> None
+        self.heap = []
+        self.timers = {}               # (kind, room_id) -> (seq, payload)
+        self.rooms_deleted = 0
+        self.host_checks = 0
+        self._seq = itertools.count()
+        self._started = False
+        self._lock = threading.RLock()
+
+    def init_app(self, app):
+        self.app = app
+
+    # ─── Timers ─────────────────────────────────────────────────────
+
+    def _schedule(self, kind, room_id, delay, payload=None):
+        room_id = str(room_id)
+        seq = next(self._seq)
+        with self._lock:
+            self.timers[(kind, room_id)] = (seq, payload)
+            heapq.heappush(self.heap, (time.time() + max(0.0, delay), seq, kind, room_id))
+        self.ensure_started()
+
+    def schedule_empty(self, room_id, delay=None):
+        """Delete the room after delay (default empty_grace) unless someone joins."""
+        self._schedule(EMPTY, room_id, self.empty_grace if delay is None else delay)
+
+    def schedule_host_transfer(self, room_id, old_host_username, delay):
+        self._schedule(HOST, room_id, delay, old_host_username)
+
+    def room_joined(self, room_id, username):
+        """Someone (re)joined: the room is not empty, and a returning host keeps the room."""
+        room_id = str(room_id)
+        with self._lock:
+            self.timers.pop((EMPTY, room_id), None)
+            host_timer = self.timers.get((HOST, room_id))
+            if host_timer and host_timer[1] == username:
+                del self.timers[(HOST, room_id)]
+
+    def forget(self, room_id):
+        room_id = str(room_id)
+        with self._lock:
+            self.timers.pop((EMPTY, room_id), None)
+            self.timers.pop((HOST, room_id), None)
+
+    def _pop_due(self, now):
+        due = []
+        with self._lock:
+            while self.heap and self.heap[0][0] <= now:
+                _, seq, kind, room_id = heapq.heappop(self.heap)
+                timer = self.timers.get((kind, room_id))
+                if timer is None or timer[0] != seq:
+                    continue  # cancelled or rescheduled
+                del self.timers[(kind, room_id)]
+                due.append((kind, room_id, timer[1]))
+        return due
+
+    # ─── Background loop ────────────────────────────────────────────
+
+    def ensure_started(self):
+        if self._started or not self.app:
+            return
+
+        from app import socketio
+
+        self._started = True
+        socketio.start_background_task(self._run)
+
+    def _run(self):
+        from app import socketio
+
+        self._schedule_existing_rooms()
+        while True:
+            socketio.sleep(TICK_SECONDS)
+            due = self._pop_due(time.time())
+            if due:
+                self._fire(due)
+
+    def _schedule_existing_rooms(self):
+        try:
+            with self.app.app_context():
+                rows = db.session.query(Room.id, Room.last_updated).all()
+        except Exception as e:
+            print(f"[ROOM] Could not load rooms for cleanup: {e}")
+            return
+
+        now = datetime.utcnow()
+        for room_id, last_updated in rows:
+            if (EMPTY, str(room_id)) in self.timers or self._occupied(room_id):
+                continue
+            age = (now - last_updated).total_seconds() if last_updated else self.empty_grace
+            self.schedule_empty(room_id, self.empty_grace - age)
+
+    def _occupied(self, room_id):
+        return bool(self.occupied_provider and self.occupied_provider(str(room_id)))
+
+    def _fire(self, due):
+        empty = [room_id for kind, room_id, _ in due if kind == EMPTY and not self._occupied(room_id)]
+        try:
+            with self.app.app_context():
+                if empty and self.delete_rooms:
+                    self.delete_rooms(empty)
+                    self.rooms_deleted += len(empty)
+                    print(f"[ROOM] Removed {len(empty)} empty room(s)")
+
+                for kind, room_id, old_host_username in due:
+                    if kind == HOST and room_id not in empty and self.transfer_host:
+                        self.transfer_host(room_id, old_host_username)
+                        self.host_checks += 1
+        except Exception as e:
+            print(f"[ROOM] Room cleanup failed: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "timers": len(self.timers),
+                "heap": len(self.heap),
+                "rooms_deleted": self.rooms_deleted,
+                "host_checks": self.host_checks,
+            }
+
+
+# ─── Singleton ────────────────────────────────────────────────────────
+room_reaper = RoomReaper()
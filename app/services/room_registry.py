@@ -0,0 +1,142 @@
+import threading
+import time
+
+from sqlalchemy.orm import joinedload
+
+from app.models import Room
+
+
+# How long an id that is not in the room table is answered as missing
+# without asking the database again (stale tabs keep sending events).
+MISSING_TTL_SECONDS = 60
+
+
+class RoomInfo:
+    """The parts of a Room row that socket handlers read, kept in memory."""
+
+    def __init__(self, room):
+        self.id = room.id
+        self.name = room.name
+        self.host_id = room.host_id
+        self.host_username = room.host.username if room.host else None
+        self.current_media_key = room.current_media_key
+        self.current_media_title = room.current_media_title
+        self.current_media_url = room.current_media_url
+        # Only used until room_states has live playback state for the room.
+        self.is_playing = room.is_playing
+        self.current_time = room.current_time
+
+
+class RoomRegistry:
+    """
+    In-memory room directory keyed by room id string.
+
+    Host checks and join/disconnect handling read from here instead of
+    querying the room table; a room is loaded from the database the first
+    time it is asked for (e.g. after a restart). Everything that changes
+    ownership, media or existence writes the database and then updates the
+    registry, so the database stays the durable copy. Ids that turn out
+    not to exist, or that were just deleted, are remembered as missing for
+    MISSING_TTL_SECONDS so events from stale tabs do not query the table.
+
+    on_change(room_id) is called after any of those updates, which is how the
+    room directory keeps the landing page listing current.
+    """
+
+    def __init__(self):
+        self.rooms = {}
+        self.missing = {}   # room_id -> time until which it is known not to exist
+        self.loaded_all = False
+        self.on_change = None
+        self._lock = threading.RLock()
+
+    def _changed(self, room_id):
+        if self.on_change:
+            self.on_change(str(room_id))
+
+    def get(self, room_id):
+        room_id = str(room_id)
+        info = self.rooms.get(room_id)
+        if info is not None:
+            return info
+        if self.missing.get(room_id, 0) > time.monotonic():
+            return None
+
+        try:
+            room = Room.query.get(int(room_id))
+        except (TypeError, ValueError):
+            return None
+        if not room:
+            self._mark_missing(room_id)
+            return None
+        return self.add(room)
+
+    def _mark_missing(self, room_id):
+        now = time.monotonic()
+        with self._lock:
+            if len(self.missing) > 1000:
+                self.missing = {rid: until for rid, until in self.missing.items() if until > now}
+            self.missing[room_id] = now + MISSING_TTL_SECONDS
+
+    def add(self, room):
+        info = RoomInfo(room)
+        with self._lock:
+            # SQLite can hand a deleted room's id to the next new room.
+            self.missing.pop(str(room.id), None)
+            self.rooms[str(room.id)] = info
+        self._changed(room.id)
+        return info
+
+    def load_all(self):
+        """Load every room once, hosts included, in a single query."""
+        if self.loaded_all:
+            return
+        rooms = Room.query.options(joinedload(Room.host)).all()
+        with self._lock:
+            for room in rooms:
+                # Rooms already here may carry newer live state than their row.
+                self.rooms.setdefault(str(room.id), RoomInfo(room))
+            self.loaded_all = True
+
+    def all(self):
+        with self._lock:
+            return list(self.rooms.values())
+
+    def forget(self, room_id):
+        with self._lock:
+            self.rooms.pop(str(room_id), None)
+        self._mark_missing(str(room_id))
+        self._changed(room_id)
+
+    def is_host(self, room_id, user_id):
+        info = self.get(room_id)
+        return info is not None and str(info.host_id) == str(user_id)
+
+    def set_host(self, room_id, user):
+        info = self.rooms.get(str(room_id))
+        if info:
+            info.host_id = user.id
+            info.host_username = user.username
+            self._changed(room_id)
+
+    def set_media(self, room):
+        info = self.rooms.get(str(room.id))
+        if info:
+            info.current_media_key = room.current_media_key
+            info.current_media_title = room.current_media_title
+            info.current_media_url = room.current_media_url
+            self._changed(room.id)
+
+    def set_playback(self, room_id, is_playing, current_time):
+        info = self.rooms.get(str(room_id))
+        if info:
+            info.is_playing = is_playing
+            info.current_time = current_time
+            self._changed(room_id)
+
+    def stats(self):
+        return {"rooms": len(self.rooms), "missing": len(self.missing)}
+
+
+# ─── Singleton ────────────────────────────────────────────────────────
+room_registry = RoomRegistry()
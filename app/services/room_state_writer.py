@@ -0,0 +1,110 @@
+import atexit
+import threading
+from datetime import datetime
+
+from app import db
+from app.models import Room
+
+
+DEFAULT_FLUSH_SECONDS = 5
+
+
+class RoomStateWriter:
+    """
+    Write-behind persistence of room playback state.
+
+    room_states in routes.py is the live store; play/pause/buffering
+    handlers only record the latest (is_playing, current_time) per room
+    here, joins record last_updated, and a background task writes whatever
+    is pending every flush_seconds in one transaction - so a burst of
+    buffering events from one room costs a single UPDATE. Pending state is
+    also flushed at exit.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.flush_seconds = DEFAULT_FLUSH_SECONDS
+        self.pending = {}  # room_id -> {column: value}
+        self.flushes = 0
+        self.rows_written = 0
+        self.coalesced = 0
+        self._flusher_started = False
+        self._lock = threading.RLock()
+
+    def init_app(self, app):
+        self.app = app
+        self.flush_seconds = float(app.config.get("ROOM_STATE_FLUSH_SECONDS", self.flush_seconds))
+        atexit.register(self.flush)
+
+    def mark(self, room_id, is_playing, current_time):
+        self._record(room_id, is_playing=is_playing, current_time=current_time)
+
+    def touch(self, room_id):
+        """Bump last_updated only (someone joined the room)."""
+        self._record(room_id)
+
+    def _record(self, room_id, **fields):
+        fields["last_updated"] = datetime.utcnow()
+        with self._lock:
+            if room_id in self.pending:
+                self.coalesced += 1
+                self.pending[room_id].update(fields)
+            else:
+                self.pending[room_id] = fields
+        self._ensure_flusher()
+
+    def discard(self, room_id):
+        """Drop pending state that a synchronous write (new media, game mode) supersedes."""
+        with self._lock:
+            self.pending.pop(room_id, None)
+
+    def _ensure_flusher(self):
+        if self._flusher_started:
+            return
+
+        from app import socketio
+
+        self._flusher_started = True
+        socketio.start_background_task(self._flush_loop)
+
+    def _flush_loop(self):
+        from app import socketio
+
+        while True:
+            socketio.sleep(self.flush_seconds)
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self.pending = self.pending, {}
+        if not pending or not self.app:
+            return
+
+        try:
+            with self.app.app_context():
+                rooms = Room.query.filter(Room.id.in_([int(room_id) for room_id in pending])).all()
+                for room in rooms:
+                    for column, value in pending[str(room.id)].items():
+                        setattr(room, column, value)
+                db.session.commit()
+                self.flushes += 1
+                self.rows_written += len(rooms)
+        except Exception as e:
+            print(f"[ROOM] Could not persist playback state: {e}")
+            # Keep the newest state for the next attempt unless newer state arrived meanwhile.
+            with self._lock:
+                for room_id, fields in pending.items():
+                    self.pending[room_id] = {**fields, **self.pending.get(room_id, {})}
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pending": len(self.pending),
+                "flushes": self.flushes,
+                "rows_written": self.rows_written,
+                "coalesced": self.coalesced,
+            }
+
+
+# ─── Singleton ────────────────────────────────────────────────────────
+room_state_writer = RoomStateWriter()
@@ -0,0 +1,107 @@
+import threading
+import time
+import uuid
+
+from app.services.plex_client import plex_client
+
+
+STOP_ENDPOINT = "/video/:/transcode/universal/stop"
+
+
+class TranscodeSession:
+    def __init__(self, room_id, rating_key):
+        token = uuid.uuid4().hex[:8]
+        self.room_id = room_id
+        self.rating_key = str(rating_key)
+        self.session_id = f"room-{room_id}-{token}"
+        self.client_id = f"peak-decline-room-{room_id}-{token}"
+        self.created_at = time.time()
+
+    def to_dict(self):
+        return {
+            "room_id": self.room_id,
+            "rating_key": self.rating_key,
+            "session": self.session_id,
+            "age_seconds": int(time.time() - self.created_at),
+        }
+
+
+class RoomTranscodeManager:
+    """
+    One Plex transcode session per room.
+
+    A session is created while the room's media job prepares (and pre-warms)
+    it, becomes the room's live session when media_updated goes out, and is
+    stopped on Plex as soon as it is replaced, abandoned, or the room is
+    deleted - Plex otherwise keeps transcoding for a while after the last
+    viewer stops asking for segments.
+    """
+
+    def __init__(self):
+        self.sessions = {}  # room_id -> TranscodeSession
+        self.stopped = 0
+        self.stop_failures = 0
+        self._lock = threading.RLock()
+
+    def new_session(self, room_id, rating_key):
+        return TranscodeSession(room_id, rating_key)
+
+    def get(self, room_id):
+        return self.sessions.get(room_id)
+
+    def activate(self, room_id, session):
+        """Make session the room's live transcode, stopping the one it replaces."""
+        with self._lock:
+            previous = self.sessions.get(room_id)
+            self.sessions[room_id] = session
+        if previous and previous.session_id != session.session_id:
+            self.discard(previous)
+
+    def stop(self, room_id):
+        """Stop the room's live transcode (room deleted or left Plex mode)."""
+        with self._lock:
+            session = self.sessions.pop(room_id, None)
+        if session:
+            self.discard(session)
+
+    def discard(self, session):
+        """Stop a session that is not (or no longer) the room's live one."""
+        from app import socketio
+
+        socketio.start_background_task(self._stop_on_plex, session)
+
+    def _stop_on_plex(self, session):
+        if not plex_client.url or not plex_client.session:
+            return
+        try:
+            resp = plex_client.session.get(
+                f"{plex_client.url}{STOP_ENDPOINT}",
+                params={
+                    "session": session.session_id,
+                    "X-Plex-Token": plex_client.token,
+                    "X-Plex-Client-Identifier": session.client_id,
+                },
+                timeout=plex_client.timeout,
+            )
+            # 404: Plex already reaped it.
+            if resp.status_code not in (200, 404):
+                resp.raise_for_status()
+            self.stopped += 1
+            print(f"[PLEX] Stopped transcode {session.session_id}")
+        except Exception as e:
+            self.stop_failures += 1
+            plex_client.report_error(e)
+            print(f"[PLEX] Could not stop transcode {session.session_id}: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "active": len(self.sessions),
+                "stopped": self.stopped,
+                "stop_failures": self.stop_failures,
+                "sessions": [s.to_dict() for s in self.sessions.values()],
+            }
+
+
+# ─── Singleton ────────────────────────────────────────────────────────
+room_transcodes = RoomTranscodeManager()
@@ -0,0 +1,115 @@
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+MIMETYPES = {
+    ".m3u8": "application/vnd.apple.mpegurl",
+    ".ts": "video/mp2t",
+    ".m4s": "video/iso.segment",
+    ".mp4": "video/mp4",
+}
+
+
+def guess_mimetype(name):
+    for ext, mimetype in MIMETYPES.items():
+        if name.endswith(ext):
+            return mimetype
+    return "application/octet-stream"
+
+
+class CachedFile:
+    def __init__(self, data, mimetype):
+        self.data = data
+        self.mimetype = mimetype
+        self.etag = f"{len(data):x}-{zlib.crc32(data):08x}"
+        self.stored_at = time.time()
+
+    @property
+    def size(self):
+        return len(self.data)
+
+
+class SegmentCache:
+    """
+    Byte-bounded LRU of HLS playlists and segments, keyed by the path under
+    the stream root ("12/seg_ab12cd34_004.ts"). Filled by the stream manager
+    as ffmpeg finishes each segment; /stream falls back to disk on a miss.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.RLock()
+
+    def init_app(self, app):
+        self.max_bytes = int(app.config.get("LIVE_TV_SEGMENT_CACHE_MB", self.max_bytes // (1024 * 1024))) * 1024 * 1024
+
+    def get(self, key):
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, data, mimetype=None):
+        entry = CachedFile(data, mimetype or guess_mimetype(key))
+
+        with self._lock:
+            old = self.entries.pop(key, None)
+            if old:
+                self.total_bytes -= old.size
+
+            # Never let a single oversized file flush the whole cache.
+            if entry.size > self.max_bytes:
+                return None
+
+            self.entries[key] = entry
+            self.total_bytes += entry.size
+
+            while self.total_bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.total_bytes -= evicted.size
+
+        return entry
+
+    def put_file(self, key, path):
+        try:
+            with open(path, "rb") as f:
+                return self.put(key, f.read())
+        except OSError:
+            return None
+
+    def discard(self, key):
+        with self._lock:
+            entry = self.entries.pop(key, None)
+            if entry:
+                self.total_bytes -= entry.size
+
+    def invalidate_prefix(self, prefix):
+        with self._lock:
+            for key in [k for k in self.entries if k.startswith(prefix)]:
+                self.total_bytes -= self.entries.pop(key).size
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self.entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+# ─── Singleton ────────────────────────────────────────────────────────
+segment_cache = SegmentCache()
@@ -0,0 +1,247 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import stat
+import threading
+
+from flask import request, send_file, send_from_directory
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # optional: gzip variants are always built
+    brotli = None
+
+
+# Generated at runtime (Live TV HLS output) or served by the ROM endpoint.
+EXCLUDED_DIRS = {"roms", "stream"}
+COMPRESSIBLE_EXTENSIONS = {"js", "css", "html", "svg", "json", "txt", "map", "ico"}
+MIN_COMPRESS_BYTES = 1024
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+MANIFEST_NAME = "manifest.json"
+
+
+def fingerprinted_name(rel_path, digest):
+    head, ext = os.path.splitext(rel_path)
+    return f"{head}.{digest}{ext}"
+
+
+class StaticAssets:
+    """
+    Fingerprinted, precompressed copies of static/.
+
+    Every asset is copied into build_dir under a content-hashed name
+    (js/room_player.js -> js/room_player.<hash>.js), text assets also as
+    .gz (and .br when the brotli module is installed) if that is smaller,
+    and the manifest is kept in build_dir so a restart only rebuilds files
+    whose size/mtime changed. url_for('static', ...) emits the hashed name,
+    which is served as immutable; plain names still work and revalidate.
+    The source is re-stat'ed whenever a URL is built, so edits show up
+    without a restart.
+    """
+
+    def __init__(self):
+        self.static_dir = None
+        self.build_dir = None
+        self.manifest = {}   # source path -> entry
+        self.hashed = {}     # fingerprinted path -> source path (incl. older builds)
+        self.previous = {}   # fingerprinted path -> entry replaced while running
+        self.builds = 0
+        self._lock = threading.RLock()
+
+    def init_app(self, app):
+        self.static_dir = app.static_folder
+        self.build_dir = app.config.get("STATIC_BUILD_DIR") or os.path.join(app.instance_path, "static_build")
+        os.makedirs(self.build_dir, exist_ok=True)
+
+        self._load_manifest()
+        self.build_all()
+
+        app.url_defaults(self._url_defaults)
+        # Flask's own /static rule matches before any blueprint route.
+        app.view_functions["static"] = self.response
+
+    # ─── Building ───────────────────────────────────────────────────
+
+    def _load_manifest(self):
+        try:
+            with open(os.path.join(self.build_dir, MANIFEST_NAME)) as fh:
+                self.manifest = json.load(fh)
+        except (OSError, ValueError):
+            self.manifest = {}
+        self.hashed = {entry["hashed"]: path for path, entry in self.manifest.items()}
+
+    def _save_manifest(self):
+        tmp_path = os.path.join(self.build_dir, MANIFEST_NAME + ".tmp")
+        with open(tmp_path, "w") as fh:
+            json.dump(self.manifest, fh, indent=1, sort_keys=True)
+        os.replace(tmp_path, os.path.join(self.build_dir, MANIFEST_NAME))
+
+    def _sources(self):
+        for root, dirs, files in os.walk(self.static_dir):
+            if root == self.static_dir:
+                dirs[:] = [d for d in dirs if d not in EXCLUDED_DIRS]
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            for filename in files:
+                if not filename.startswith("."):
+                    full_path = os.path.join(root, filename)
+                    yield os.path.relpath(full_path, self.static_dir).replace("\\", "/"), full_path
+
+    def _is_current(self, entry, st):
+        return (entry is not None and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns
+                and os.path.exists(os.path.join(self.build_dir, entry["hashed"])))
+
+    def build_all(self):
+        """Build every changed asset and drop build output nothing refers to."""
+        seen, changed = set(), 0
+        for rel_path, full_path in self._sources():
+            seen.add(rel_path)
+            try:
+                st = os.stat(full_path)
+            except OSError:
+                continue
+            if not self._is_current(self.manifest.get(rel_path), st):
+                self._build(rel_path, full_path, st)
+                changed += 1
+
+        for rel_path in [p for p in self.manifest if p not in seen]:
+            del self.manifest[rel_path]
+        self.hashed = {entry["hashed"]: path for path, entry in self.manifest.items()}
+        self._prune()
+        self._save_manifest()
+        if changed:
+            print(f"[ASSETS] Built {changed} static asset(s)")
+
+    def _prune(self):
+        keep = {MANIFEST_NAME}
+        for entry in self.manifest.values():
+            keep.add(entry["hashed"])
+            keep.update(f"{entry['hashed']}.{encoding}" for encoding in entry["variants"])
+
+        for root, dirs, files in os.walk(self.build_dir):
+            for filename in files:
+                full_path = os.path.join(root, filename)
+                if os.path.relpath(full_path, self.build_dir).replace("\\", "/") not in keep:
+                    os.remove(full_path)
+
+    def _build(self, rel_path, full_path, st):
+        with open(full_path, "rb") as fh:
+            data = fh.read()
+        digest = hashlib.sha1(data).hexdigest()[:12]
+        hashed = fingerprinted_name(rel_path, digest)
+
+        variants = []
+        self._write(hashed, data)
+        if rel_path.rsplit(".", 1)[-1].lower() in COMPRESSIBLE_EXTENSIONS and len(data) >= MIN_COMPRESS_BYTES:
+            compressed = {"gz": gzip.compress(data, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                compressed["br"] = brotli.compress(data, quality=11)
+            for encoding, body in compressed.items():
+                if len(body) < len(data):
+                    self._write(f"{hashed}.{encoding}", body)
+                    variants.append(encoding)
+
+        entry = {"hashed": hashed, "digest": digest, "size": st.st_size, "mtime_ns": st.st_mtime_ns,
+                 "variants": variants}
+        with self._lock:
+            old = self.manifest.get(rel_path)
+            if old and old["hashed"] != hashed:
+                # Pages loaded before the edit keep working until the next restart.
+                self.previous[old["hashed"]] = old
+            self.manifest[rel_path] = entry
+            self.hashed[hashed] = rel_path
+            self.builds += 1
+        return entry
+
+    def _write(self, rel_path, data):
+        target = os.path.join(self.build_dir, rel_path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp_path = f"{target}.tmp"
+        with open(tmp_path, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp_path, target)
+
+    def current(self, rel_path):
+        """Manifest entry for a source asset, rebuilt first if the file changed."""
+        full_path = safe_join(self.static_dir, rel_path)
+        if full_path is None or rel_path.split("/", 1)[0] in EXCLUDED_DIRS:
+            return None
+        try:
+            st = os.stat(full_path)
+        except OSError:
+            return None
+        if not stat.S_ISREG(st.st_mode):
+            return None
+        entry = self.manifest.get(rel_path)
+        if self._is_current(entry, st):
+            return entry
+
+        with self._lock:
+            entry = self._build(rel_path, full_path, st)
+            self._save_manifest()
+        return entry
+
+    # ─── URLs ───────────────────────────────────────────────────────
+
+    def _url_defaults(self, endpoint, values):
+        if endpoint != "static" or "filename" not in values:
+            return
+        entry = self.current(values["filename"])
+        if entry:
+            values["filename"] = entry["hashed"]
+
+    # ─── Serving ────────────────────────────────────────────────────
+
+    def response(self, filename):
+        source = self.hashed.get(filename)
+        fingerprinted = source is not None
+        if fingerprinted:
+            entry = self.manifest.get(source)
+            if entry is None or entry["hashed"] != filename:
+                entry = self.previous.get(filename)
+        else:
+            entry = self.current(filename)
+        if entry is None:
+            return send_from_directory(self.static_dir, filename)
+
+        source_name = source or filename
+        mimetype = mimetypes.guess_type(source_name)[0] or "application/octet-stream"
+        path = os.path.join(self.build_dir, entry["hashed"])
+        if not os.path.exists(path):
+            return send_from_directory(self.static_dir, source_name)
+
+        encoding = None
+        for candidate, token in (("br", "br"), ("gz", "gzip")):
+            if candidate in entry["variants"] and token in request.accept_encodings:
+                encoding, path = token, f"{path}.{candidate}"
+                break
+
+        etag = entry["digest"] + (f"-{encoding}" if encoding else "")
+        response = send_file(path, mimetype=mimetype, conditional=True, etag=etag)
+        if encoding:
+            response.content_encoding = encoding
+        if entry["variants"]:
+            response.vary.add("Accept-Encoding")
+
+        if fingerprinted:
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.no_cache = True
+        return response
+
+    def stats(self):
+        return {
+            "assets": len(self.manifest),
+            "compressed": sum(1 for entry in self.manifest.values() if entry["variants"]),
+            "brotli": brotli is not None,
+            "builds": self.builds,
+        }
+
+
+# ─── Singleton ────────────────────────────────────────────────────────
+static_assets = StaticAssets()
@@ -1,15 +1,195 @@
+import atexit
 import os
+import re
 import subprocess
+import threading
 import uuid
 import time
 import glob
+from datetime import datetime
+
+from app import db
+from app.models import Channel, NowPlayingState
+from app.services import llhls
+from app.services.encoder_profiles import EncoderProfile, profiles
+from app.services.probe import MODE_COPY, MODE_TRANSCODE, get_stream_mode, has_audio, mark_transcode_required
+from app.services.segment_cache import segment_cache
+
+
+# Defaults used until init_app() applies the Flask config.
+DEFAULT_MAX_STREAMS = 3
+DEFAULT_IDLE_SECONDS = 30
+REAPER_INTERVAL_SECONDS = 5
+STARTUP_TIMEOUT_SECONDS = 15
+JOB_RETENTION_SECONDS = 300
+NOW_PLAYING_FLUSH_SECONDS = 2
+
+# Channel URLs starting with this are ffmpeg lavfi graphs (local test sources).
+LAVFI_PREFIX = "lavfi:"
+
+# "[hls @ 0x...] Opening '/path/seg_ab12cd34_720p_005.ts' for writing"
+SEGMENT_OPEN_RE = re.compile(r"Opening '(?P<path>(?P<variant>.+)_\d+\.(?:ts|m4s))' for writing")
+
+
+class StreamJob:
+    """Tracks one asynchronous channel start requested through /api/play."""
+
+    def __init__(self, channel_id, channel_name):
+        self.job_id = uuid.uuid4().hex[:12]
+        self.channel_id = channel_id
+        self.channel_name = channel_name
+        self.status = "starting"
+        self.message = f"Starting {channel_name}"
+        self.created_at = time.time()
+        self.finished_at = None
+
+    @property
+    def done(self):
+        return self.status != "starting"
+
+    def finish(self, status, message):
+        """Move to a final state. Returns False if the job had already finished."""
+        if self.done:
+            return False
+        self.status = status
+        self.message = message
+        self.finished_at = time.time()
+        return True
+
+    def to_dict(self):
+        return {
+            "job_id": self.job_id,
+            "channel_id": self.channel_id,
+            "name": self.channel_name,
+            "status": self.status,
+            "message": self.message,
+        }
+
+
+class ChannelStream:
+    """One running ffmpeg transcode, shared by every viewer of a channel."""
+
+    def __init__(self, channel_id, channel_name, channel_dir):
+        self.channel_id = channel_id
+        self.channel_name = channel_name
+        self.channel_dir = channel_dir
+        self.session_id = str(uuid.uuid4())[:8]
+        self.process = None
+        self.log_file = None
+        self.started_at = time.time()
+        self.process_started_at = None
+        self.attempt = 0
+        self.last_watched = self.started_at
+        self.idle_since = None
+        self.ready = False
+        self.stopped = False
+        self.job = None
+        self.mode = None
+        self.profile = None
+        self.has_audio = True
+
+        # Low-latency (LL-HLS) state: the newest finished part, and a
+        # condition that blocking playlist requests wait on.
+        self.low_latency = False
+        self.last_part_index = -1
+        self.part_cond = threading.Condition()
+
+    @property
+    def playlist_path(self):
+        return os.path.join(self.channel_dir, "index.m3u8")
+
+    @property
+    def is_abr(self):
+        return (self.mode == MODE_TRANSCODE and not self.low_latency
+                and self.profile is not None and self.profile.is_abr)
+
+    @property
+    def variant_count(self):
+        return len(self.profile.renditions) if self.is_abr else 1
+
+    @property
+    def ready_threshold(self):
+        # Segments each variant must have opened before the stream counts as
+        # ready; low-latency mode waits for one full segment's worth of parts.
+        return llhls.PARTS_PER_SEGMENT + 1 if self.low_latency else 2
+
+    @property
+    def ready_marker_path(self):
+        if self.low_latency:
+            return os.path.join(self.channel_dir, llhls.PARTS_PLAYLIST)
+        return self.playlist_path
+
+    @property
+    def segment_pattern(self):
+        if self.low_latency:
+            return os.path.join(self.channel_dir, f"part_{self.session_id}_%05d.m4s")
+        if self.is_abr:
+            return os.path.join(self.channel_dir, f"seg_{self.session_id}_%v_%03d.ts")
+        return os.path.join(self.channel_dir, f"seg_{self.session_id}_%03d.ts")
+
+    @property
+    def output_path(self):
+        # ABR writes one media playlist per variant; index.m3u8 becomes the master.
+        # Low-latency writes parts.m3u8; index.m3u8 is built from it on request.
+        if self.low_latency:
+            return os.path.join(self.channel_dir, llhls.PARTS_PLAYLIST)
+        if self.is_abr:
+            return os.path.join(self.channel_dir, "stream_%v.m3u8")
+        return self.playlist_path
+
+    def is_alive(self):
+        # A stream that is still probing has no process yet but is alive.
+        if self.stopped:
+            return False
+        return self.process is None or self.process.poll() is None
+
+    def touch(self):
+        self.last_watched = time.time()
+        self.idle_since = None
+
+    def to_dict(self):
+        return {
+            "channel_id": self.channel_id,
+            "channel_name": self.channel_name,
+            "started_at": self.started_at,
+            "last_watched": self.last_watched,
+            "alive": self.is_alive(),
+            "ready": self.ready,
+            "mode": self.mode,
+            "profile": self.profile.name if self.profile and self.mode == MODE_TRANSCODE else None,
+            "low_latency": self.low_latency,
+        }
 
 
 class StreamService:
-    def __init__(self):
-        self.process = None
-        self.current_channel_id = None
-        self.current_channel_dir = None
+    def __init__(self, max_streams=DEFAULT_MAX_STREAMS, idle_seconds=DEFAULT_IDLE_SECONDS):
+        self.max_streams = max_streams
+        self.idle_seconds = idle_seconds
+        self.low_latency = False
+
+        # channel_id -> ChannelStream
+        self.streams = {}
+        # job_id -> StreamJob
+        self.jobs = {}
+        self._lock = threading.RLock()
+
+        # Set by the routes module: called with the StreamJob once a channel
+        # has a playable playlist, or once it has failed to start.
+        self.on_ready = None
+        self.on_failed = None
+
+        # Set by the routes module: returns {channel_id: viewer_count}
+        # built from live_tv_occupancy.
+        self.viewer_counts_provider = None
+        self._reaper_started = False
+        self.app = None
+
+        # Now-playing registry: the channel Live TV is currently showing.
+        # Persisted to a single row by a coalescing write-behind flush.
+        self.now_playing = None
+        self._now_playing_loaded = False
+        self._now_playing_dirty = False
+        self._now_playing_flush_pending = False
 
         # ─── Resolve project root safely ───────────────────────────────
         current_file = os.path.abspath(__file__)
@@ -23,6 +203,14 @@ class StreamService:
 
         print(f"[STREAM] Root: {self.stream_root}")
 
+    def init_app(self, app):
+        self.app = app
+        self.max_streams = max(1, int(app.config.get("LIVE_TV_MAX_STREAMS", self.max_streams)))
+        self.idle_seconds = max(0, int(app.config.get("LIVE_TV_IDLE_SECONDS", self.idle_seconds)))
+        self.low_latency = bool(app.config.get("LIVE_TV_LOW_LATENCY", self.low_latency))
+        atexit.register(self.flush_now_playing)
+        print(f"[STREAM] Max concurrent channels: {self.max_streams}")
+
     # ────────────────────────────────────────────────────────────────
 
     def get_ffmpeg_path(self):
@@ -36,119 +224,568 @@ class StreamService:
 
     # ────────────────────────────────────────────────────────────────
 
-    def stop_stream(self):
-        if self.process:
+    def set_now_playing(self, channel_id, channel_name, logo=None):
+        with self._lock:
+            self._now_playing_loaded = True
+            self.now_playing = {
+                "channel_id": channel_id,
+                "name": channel_name,
+                "logo": logo,
+                "since": time.time(),
+            }
+            self._now_playing_dirty = True
+            schedule = not self._now_playing_flush_pending
+            self._now_playing_flush_pending = True
+
+        if schedule:
+            from app import socketio
+
+            def flush_later():
+                socketio.sleep(NOW_PLAYING_FLUSH_SECONDS)
+                self.flush_now_playing()
+
+            socketio.start_background_task(flush_later)
+
+    def get_now_playing(self):
+        """Return the now-playing dict, loading the persisted row once after a restart."""
+        if not self._now_playing_loaded:
+            self._load_now_playing()
+        return self.now_playing
+
+    def _load_now_playing(self):
+        if not self.app:
+            return
+        try:
+            with self.app.app_context():
+                state = db.session.get(NowPlayingState, 1)
+                if state:
+                    channel = db.session.get(Channel, state.channel_id) if state.channel_id else None
+                else:
+                    # Databases from before the registry flagged the channel in place.
+                    channel = Channel.query.filter(Channel.is_playing.in_(['1', 'true'])).first()
+                with self._lock:
+                    if self._now_playing_loaded:
+                        return
+                    if channel:
+                        self.now_playing = {
+                            "channel_id": channel.id,
+                            "name": channel.name,
+                            "logo": channel.logo,
+                            "since": state.updated_at.timestamp() if state and state.updated_at else time.time(),
+                        }
+                    self._now_playing_loaded = True
+        except Exception as e:
+            print(f"[STREAM] Could not load now playing: {e}")
+
+    def flush_now_playing(self):
+        with self._lock:
+            self._now_playing_flush_pending = False
+            if not self._now_playing_dirty or not self.app:
+                return
+            self._now_playing_dirty = False
+            channel_id = self.now_playing["channel_id"] if self.now_playing else None
+
+        try:
+            with self.app.app_context():
+                state = db.session.get(NowPlayingState, 1) or NowPlayingState(id=1)
+                state.channel_id = channel_id
+                state.updated_at = datetime.utcnow()
+                db.session.add(state)
+                db.session.commit()
+        except Exception as e:
+            print(f"[STREAM] Could not persist now playing: {e}")
+
+    # ────────────────────────────────────────────────────────────────
+
+    def get_stream(self, channel_id):
+        with self._lock:
+            return self.streams.get(channel_id)
+
+    def active_channel_ids(self):
+        with self._lock:
+            return [cid for cid, s in self.streams.items() if s.is_alive()]
+
+    def touch(self, channel_id):
+        """Mark a channel as watched so LRU eviction keeps it around."""
+        with self._lock:
+            stream = self.streams.get(channel_id)
+            if stream:
+                stream.touch()
+
+    # ────────────────────────────────────────────────────────────────
+
+    def stop_stream(self, channel_id):
+        with self._lock:
+            stream = self.streams.pop(channel_id, None)
+
+        if not stream:
+            return
+
+        stream.stopped = True
+        with stream.part_cond:
+            stream.part_cond.notify_all()
+
+        if stream.job and not stream.job.done:
+            self._finish_job(stream.job, "failed", "Stream stopped during startup")
+
+        if stream.process:
             try:
-                self.process.terminate()
-                self.process.wait(timeout=3)
+                stream.process.terminate()
+                stream.process.wait(timeout=3)
             except Exception:
                 try:
-                    self.process.kill()
+                    stream.process.kill()
                 except Exception:
                     pass
 
-        self.process = None
-        self._cleanup_channel()
-        self.current_channel_id = None
-        self.current_channel_dir = None
+        if stream.log_file:
+            try:
+                stream.log_file.close()
+            except Exception:
+                pass
+
+        self._cleanup_channel(stream.channel_dir)
+        print(f"[STREAM] Stopped channel {channel_id}")
+
+    def stop_all(self):
+        with self._lock:
+            channel_ids = list(self.streams.keys())
+
+        for channel_id in channel_ids:
+            self.stop_stream(channel_id)
 
     # ────────────────────────────────────────────────────────────────
 
-    def _cleanup_channel(self):
-        if not self.current_channel_dir:
+    def _cache_key(self, path):
+        return os.path.relpath(path, self.stream_root).replace("\\", "/")
+
+    def _cleanup_channel(self, channel_dir):
+        if not channel_dir:
             return
 
+        segment_cache.invalidate_prefix(self._cache_key(channel_dir) + "/")
+
         try:
-            for f in glob.glob(os.path.join(self.current_channel_dir, "*")):
-                if f.endswith(".ts") or f.endswith(".m3u8"):
+            for f in glob.glob(os.path.join(channel_dir, "*")):
+                if f.endswith((".ts", ".m3u8", ".m4s", ".mp4")):
                     os.remove(f)
         except Exception as e:
             print(f"[STREAM] Cleanup warning: {e}")
 
     # ────────────────────────────────────────────────────────────────
 
-    def start_stream(self, channel_id, channel_url, channel_name):
-        self.stop_stream()
+    def _reserve_slot(self, stream):
+        """
+        Stop least-recently-watched channels until there is room for one more,
+        then claim the slot for stream under the same lock, so two starts of
+        one channel can never both launch ffmpeg. Returns False if a live
+        stream of the channel got there first.
+        """
+        while True:
+            dead = None
+            with self._lock:
+                current = self.streams.get(stream.channel_id)
+                if current and current.is_alive():
+                    return False
+                if current:
+                    dead = current.channel_id
+                else:
+                    running = list(self.streams.values())
+                    if len(running) < self.max_streams:
+                        stream.job = self._new_job(stream.channel_id, stream.channel_name)
+                        self.streams[stream.channel_id] = stream
+                        return True
+                    victim = min(running, key=lambda s: s.last_watched)
+
+            if dead is not None:
+                self.stop_stream(dead)
+                continue
+
+            print(f"[STREAM] Cap of {self.max_streams} reached, evicting channel {victim.channel_id}")
+            self.stop_stream(victim.channel_id)
+
+    def _viewer_counts(self):
+        if not self.viewer_counts_provider:
+            return {}
+        try:
+            return self.viewer_counts_provider()
+        except Exception as e:
+            print(f"[STREAM] Viewer count warning: {e}")
+            return {}
+
+    def reap_idle(self):
+        """Stop channels that have had no viewers for longer than the idle grace."""
+        counts = self._viewer_counts()
+        now = time.time()
+        to_stop = []
+
+        with self._lock:
+            for channel_id, stream in self.streams.items():
+                if not stream.is_alive():
+                    to_stop.append(channel_id)
+                    continue
+
+                if counts.get(channel_id, 0) > 0:
+                    stream.touch()
+                    continue
+
+                if stream.idle_since is None:
+                    stream.idle_since = now
+                elif now - stream.idle_since >= self.idle_seconds:
+                    to_stop.append(channel_id)
+
+        for channel_id in to_stop:
+            self.stop_stream(channel_id)
+
+    def _ensure_reaper(self):
+        if self._reaper_started:
+            return
+        self._reaper_started = True
 
-        session_id = str(uuid.uuid4())[:8]
+        from app import socketio
 
-        # ─── Per-channel directory ────────────────────────────────────
-        channel_dir = os.path.join(self.stream_root, str(channel_id))
-        os.makedirs(channel_dir, exist_ok=True)
-        self.current_channel_dir = channel_dir
+        def reaper_loop():
+            while True:
+                socketio.sleep(REAPER_INTERVAL_SECONDS)
+                try:
+                    self.reap_idle()
+                except Exception as e:
+                    print(f"[STREAM] Reaper warning: {e}")
 
-        playlist_path = os.path.join(channel_dir, "index.m3u8")
-        segment_pattern = os.path.join(channel_dir, f"seg_{session_id}_%03d.ts")
+        socketio.start_background_task(reaper_loop)
 
-        print(f"[STREAM] Channel {channel_id}: {channel_name}")
-        print(f"[STREAM] URL: {channel_url}")
+    # ────────────────────────────────────────────────────────────────
 
-        ffmpeg = self.get_ffmpeg_path()
+    def get_job(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def _new_job(self, channel_id, channel_name):
+        job = StreamJob(channel_id, channel_name)
+        cutoff = time.time() - JOB_RETENTION_SECONDS
+        with self._lock:
+            for old_id in [jid for jid, j in self.jobs.items() if j.done and j.finished_at < cutoff]:
+                self.jobs.pop(old_id, None)
+            self.jobs[job.job_id] = job
+        return job
+
+    def _finish_job(self, job, status, message):
+        if not job.finish(status, message):
+            return
+
+        callback = self.on_ready if status == "ready" else self.on_failed
+        if callback:
+            try:
+                callback(job)
+            except Exception as e:
+                print(f"[STREAM] Job callback warning: {e}")
+
+    # ────────────────────────────────────────────────────────────────
+
+    def _watch_output(self, stream):
+        """
+        Drain ffmpeg's stderr into the channel log and detect readiness.
+
+        The HLS muxer logs "Opening '<file>' for writing" for each segment.
+        The playlist is rewritten when a segment is closed, so by the time
+        every variant has opened its second segment, the first segments and
+        index.m3u8 all exist. Returns once ffmpeg exits.
 
+        The same event means the variant's previous segment is complete, so
+        it and the freshly rewritten playlists are pushed into segment_cache.
+        """
+        segments_opened = {}
+        open_segments = {}
+
+        try:
+            for raw in iter(stream.process.stderr.readline, b""):
+                line = raw.decode("utf-8", errors="replace")
+
+                if stream.log_file and not stream.log_file.closed:
+                    stream.log_file.write(line)
+                    stream.log_file.flush()
+
+                match = SEGMENT_OPEN_RE.search(line)
+                if not match:
+                    continue
+
+                variant = match.group("variant")
+                finished = open_segments.get(variant)
+                open_segments[variant] = match.group("path")
+                if finished:
+                    self._cache_outputs(stream, finished)
+
+                if stream.ready:
+                    continue
+
+                segments_opened[variant] = segments_opened.get(variant, 0) + 1
+
+                started = sum(1 for count in segments_opened.values() if count >= stream.ready_threshold)
+                if started >= stream.variant_count and os.path.exists(stream.ready_marker_path):
+                    self._mark_ready(stream)
+        except Exception as e:
+            print(f"[STREAM] Output reader warning: {e}")
+
+        try:
+            stream.process.wait(timeout=3)
+        except Exception:
+            pass
+
+    def _cache_outputs(self, stream, segment_path):
+        segment_cache.put_file(self._cache_key(segment_path), segment_path)
+        for playlist in glob.glob(os.path.join(stream.channel_dir, "*.m3u8")):
+            segment_cache.put_file(self._cache_key(playlist), playlist)
+
+        if not stream.low_latency:
+            return
+
+        init_path = os.path.join(stream.channel_dir, llhls.INIT_FILENAME)
+        if not segment_cache.get(self._cache_key(init_path)):
+            segment_cache.put_file(self._cache_key(init_path), init_path)
+
+        index = llhls.part_index(segment_path)
+        if index is not None:
+            with stream.part_cond:
+                stream.last_part_index = index
+                stream.part_cond.notify_all()
+
+    def wait_for_part(self, stream, index, timeout=llhls.BLOCK_TIMEOUT_SECONDS):
+        """Block (cooperatively) until a low-latency part has been written."""
+        with stream.part_cond:
+            return stream.part_cond.wait_for(
+                lambda: stream.stopped or stream.last_part_index >= index, timeout
+            ) and not stream.stopped
+
+    def _mark_ready(self, stream):
+        stream.ready = True
+        stream.touch()
+        print(f"[STREAM] Channel {stream.channel_id} ready in {time.time() - stream.started_at:.1f}s ({stream.mode})")
+        self._finish_job(stream.job, "ready", f"Playing {stream.channel_name}")
+
+    def _startup_watchdog(self, stream, attempt):
+        """
+        Give one ffmpeg launch STARTUP_TIMEOUT_SECONDS to become ready. The
+        clock starts at spawn, so probing does not eat into it. A stalled
+        remux is killed so _run_stream falls back to a transcode, which gets
+        a deadline of its own.
+        """
+        from app import socketio
+
+        socketio.sleep(STARTUP_TIMEOUT_SECONDS)
+
+        if stream.ready or stream.attempt != attempt or self.get_stream(stream.channel_id) is not stream:
+            return
+
+        if stream.mode == MODE_COPY:
+            print(f"[STREAM] Remux of channel {stream.channel_id} stalled, stopping it")
+            try:
+                stream.process.kill()
+            except Exception:
+                pass
+            return
+
+        self._finish_job(stream.job, "failed", "Timed out waiting for stream")
+        self.stop_stream(stream.channel_id)
+
+    # ────────────────────────────────────────────────────────────────
+
+    def _build_command(self, ffmpeg, stream, channel_url):
         cmd = [
             ffmpeg,
             "-hide_banner",
             "-loglevel", "info",
-            "-user_agent", "VLC/3.0.20 LibVLC/3.0.20",
-            "-i", channel_url,
-
-            # ─── VIDEO ────────────────────────────────────────────────
-            "-c:v", "libx264",
-            "-preset", "veryfast",
-            "-tune", "zerolatency",
-            "-pix_fmt", "yuv420p",
-            "-profile:v", "baseline",
-            "-level", "3.0",
-            "-g", "60",
-            "-keyint_min", "60",
-            "-sc_threshold", "0",
-
-            # ─── AUDIO ────────────────────────────────────────────────
-            "-c:a", "aac",
-            "-ar", "48000",
-            "-b:a", "192k",
+        ]
 
+        if channel_url.startswith(LAVFI_PREFIX):
+            # Local synthetic source (benchmarks). The graph should pace itself
+            # with realtime/arealtime filters; -re would allow a read-ahead burst.
+            cmd += ["-f", "lavfi", "-i", channel_url[len(LAVFI_PREFIX):]]
+        else:
+            cmd += ["-user_agent", "VLC/3.0.20 LibVLC/3.0.20", "-i", channel_url]
+
+        var_stream_map = None
+        if stream.low_latency:
+            # Every part must start on a keyframe so it can be played on its own.
+            encode_args, _ = stream.profile.ffmpeg_args(profiles.encoder, stream.has_audio)
+            cmd += encode_args
+            cmd += ["-force_key_frames", f"expr:gte(t,n_forced*{llhls.PART_SECONDS})"]
+            cmd += [
+                # ─── LL-HLS PARTS (fMP4) ──────────────────────────────
+                "-f", "hls",
+                "-hls_time", str(llhls.PART_SECONDS),
+                "-hls_list_size", str(llhls.PARTS_PER_SEGMENT * 12),
+                "-hls_segment_type", "fmp4",
+                "-hls_fmp4_init_filename", llhls.INIT_FILENAME,
+                "-hls_flags", "delete_segments+independent_segments+program_date_time",
+                "-hls_segment_filename", stream.segment_pattern,
+                "-y", stream.output_path
+            ]
+            return cmd
+
+        if stream.mode == MODE_COPY:
+            # ─── REMUX: source is already H.264/AAC ───────────────────
+            cmd += [
+                "-map", "0:v:0",
+                "-map", "0:a:0?",
+                "-c", "copy",
+            ]
+        else:
+            # ─── VIDEO / AUDIO: from the channel's encoder profile ───────
+            encode_args, var_stream_map = stream.profile.ffmpeg_args(profiles.encoder, stream.has_audio)
+            cmd += encode_args
+
+        cmd += [
             # ─── HLS ──────────────────────────────────────────────────
             "-f", "hls",
             "-hls_time", "2",
             "-hls_list_size", "12",
-            "-hls_flags", "delete_segments+append_list",
+            "-hls_flags", "delete_segments+append_list+program_date_time",
             "-hls_allow_cache", "0",
-            "-hls_segment_filename", segment_pattern,
-
-            "-y", playlist_path
+            "-hls_segment_filename", stream.segment_pattern,
         ]
 
-        try:
-            # 🔥 CRITICAL FIX: DO NOT PIPE STDERR
-            log_path = os.path.join(channel_dir, "ffmpeg_error.log")
+        if var_stream_map:
+            cmd += [
+                "-master_pl_name", os.path.basename(stream.playlist_path),
+                "-var_stream_map", var_stream_map,
+            ]
+
+        cmd += ["-y", stream.output_path]
+        return cmd
+
+    def _probe_mode(self, stream, channel_url, ffmpeg):
+        """Pick copy/transcode and load the channel's encoder profile."""
+        if not self.app:
+            stream.profile = profiles.get(profiles.default_name)
+            return MODE_TRANSCODE
+        with self.app.app_context():
+            stream.profile = profiles.profile_for_channel(stream.channel_id)
+            mode = get_stream_mode(stream.channel_id, channel_url, ffmpeg)
+            stream.has_audio = has_audio(stream.channel_id)
+            return mode
+
+    def _run_stream(self, stream, channel_url):
+        """
+        Background task: probe the source, launch ffmpeg and supervise startup.
+
+        Remux is tried first when the probe allows it; if ffmpeg gives up
+        before producing a playlist the channel is retried as a transcode and
+        the probe cache is updated so later starts skip the remux attempt.
+        """
+        from app import socketio
+
+        ffmpeg = self.get_ffmpeg_path()
+        first_mode = self._probe_mode(stream, channel_url, ffmpeg)
+        if stream.low_latency:
+            # Parts need forced keyframes (so no remux) and a single rendition.
+            base = stream.profile
+            stream.profile = EncoderProfile(f"{base.name}-ll", base.renditions[:1],
+                                            gop=base.gop, encoder=base.encoder)
+
+        # An ABR profile is an explicit request for a ladder, so it always transcodes.
+        if first_mode == MODE_COPY and not stream.profile.is_abr and not stream.low_latency:
+            modes = [MODE_COPY, MODE_TRANSCODE]
+        else:
+            modes = [MODE_TRANSCODE]
+
+        for mode in modes:
+            if stream.stopped:
+                return
+
+            stream.mode = mode
+            self._cleanup_channel(stream.channel_dir)
+
+            try:
+                # stderr is piped, but _watch_output drains it continuously
+                # into the log file so ffmpeg can never block on a full pipe.
+                stream.process = subprocess.Popen(
+                    self._build_command(ffmpeg, stream, channel_url),
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.PIPE
+                )
+                stream.process_started_at = time.time()
+            except Exception as e:
+                self._finish_job(stream.job, "failed", str(e))
+                break
+
+            stream.attempt += 1
+            socketio.start_background_task(self._startup_watchdog, stream, stream.attempt)
+
+            self._watch_output(stream)
+
+            if stream.ready or stream.stopped:
+                return
+
+            if mode == MODE_COPY:
+                print(f"[STREAM] Remux failed for channel {stream.channel_id}, falling back to transcode")
+                if self.app:
+                    with self.app.app_context():
+                        mark_transcode_required(stream.channel_id)
+
+        self._finish_job(stream.job, "failed", "FFmpeg exited during startup")
+        if self.get_stream(stream.channel_id) is stream:
+            self.stop_stream(stream.channel_id)
+
+    # ────────────────────────────────────────────────────────────────
+
+    def _join_stream(self, channel_id, channel_name):
+        """Job for a live stream of the channel that is already running, or None."""
+        with self._lock:
+            existing = self.streams.get(channel_id)
+            if not existing or not existing.is_alive():
+                return None
+            existing.touch()
+            if not existing.ready:
+                return existing.job
+
+        job = self._new_job(channel_id, channel_name)
+        self._finish_job(job, "ready", f"Playing {channel_name}")
+        return job
+
+    def start_stream(self, channel_id, channel_url, channel_name):
+        """
+        Start (or join) a channel without waiting for ffmpeg.
+
+        Returns a StreamJob straight away. on_ready/on_failed fire once the
+        channel has a playable playlist or has given up.
+        """
+        from app import socketio
+
+        self._ensure_reaper()
 
-            log_file = open(log_path, "w", encoding="utf-8", errors="replace")
+        # ─── Share an already-running transcode ───────────────────────
+        job = self._join_stream(channel_id, channel_name)
+        if job:
+            return job
 
-            self.process = subprocess.Popen(
-                cmd,
-                stdout=log_file,
-                stderr=log_file
-            )
-            # ─── Wait for playlist ─────────────────────────────────────
-            for i in range(20):
-                time.sleep(0.5)
+        # ─── Per-channel directory ────────────────────────────────────
+        channel_dir = os.path.join(self.stream_root, str(channel_id))
+        os.makedirs(channel_dir, exist_ok=True)
 
-                if self.process.poll() is not None:
-                    self.stop_stream()
-                    return False, "FFmpeg exited during startup"
+        stream = ChannelStream(channel_id, channel_name, channel_dir)
+        stream.low_latency = self.low_latency
 
-                if os.path.exists(playlist_path) and os.path.getsize(playlist_path) > 0:
-                    self.current_channel_id = channel_id
-                    print(f"[STREAM] Ready in {i * 0.5:.1f}s")
-                    return True, f"Playing {channel_name}"
+        # Eviction yields while ffmpeg exits, so another start of this
+        # channel may have claimed it in the meantime; join that one.
+        while not self._reserve_slot(stream):
+            job = self._join_stream(channel_id, channel_name)
+            if job:
+                return job
 
-            self.stop_stream()
-            return False, "Timed out waiting for stream"
+        print(f"[STREAM] Channel {channel_id}: {channel_name}")
+        print(f"[STREAM] URL: {channel_url}")
 
+        try:
+            log_path = os.path.join(channel_dir, "ffmpeg_error.log")
+            stream.log_file = open(log_path, "w", encoding="utf-8", errors="replace")
         except Exception as e:
-            self.stop_stream()
-            return False, str(e)
+            self._finish_job(stream.job, "failed", str(e))
+            self.stop_stream(channel_id)
+            return stream.job
+
+        socketio.start_background_task(self._run_stream, stream, channel_url)
+
+        return stream.job
 
 
 # ─── Singleton ────────────────────────────────────────────────────────
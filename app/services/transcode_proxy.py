@@ -0,0 +1,222 @@
+import posixpath
+import re
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from app.services.plex_client import plex_client
+from app.services.segment_cache import SegmentCache
+
+
+PROXY_PREFIX = "/plex-transcode"
+# The only part of Plex the proxy forwards to (it adds the server token).
+UPSTREAM_PREFIX = "video/:/transcode/universal/"
+CHUNK_SIZE = 64 * 1024
+DEFAULT_CACHE_MB = 128
+DEFAULT_SEGMENT_TTL_SECONDS = 60
+# Long enough to collapse a room's viewers polling together, short enough to stay live.
+PLAYLIST_TTL_SECONDS = 1
+FOLLOW_TIMEOUT_SECONDS = 30
+
+URI_ATTR_RE = re.compile(r'URI="([^"]*)"')
+
+
+def is_playlist(path):
+    return path.endswith(".m3u8")
+
+
+def upstream_path(subpath):
+    """Normalized transcoder path for a proxied subpath, or None if it is outside the transcoder."""
+    if "\\" in subpath:
+        return None
+    path = posixpath.normpath("/" + subpath).lstrip("/")
+    return path if path.startswith(UPSTREAM_PREFIX) else None
+
+
+def _strip_token(query):
+    return [(k, v) for k, v in query if k.lower() != "x-plex-token"]
+
+
+class Fetch:
+    """One upstream request, followed by every client that asked for the same URL meanwhile."""
+
+    def __init__(self):
+        self.status = None
+        self.mimetype = None
+        self.chunks = []
+        self.done = False
+        self.failed = False
+        self.body = None
+        self.cond = threading.Condition()
+
+    def wait_for_headers(self):
+        with self.cond:
+            self.cond.wait_for(lambda: self.status is not None or self.failed, FOLLOW_TIMEOUT_SECONDS)
+            return self.status is not None
+
+    def wait_for_body(self):
+        with self.cond:
+            self.cond.wait_for(lambda: self.done or self.failed, FOLLOW_TIMEOUT_SECONDS)
+            return self.body if self.done else None
+
+    def follow(self):
+        """Yield chunks as the upstream read produces them."""
+        position = 0
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: position < len(self.chunks) or self.done or self.failed,
+                                   FOLLOW_TIMEOUT_SECONDS)
+                chunks = self.chunks[position:]
+                finished = self.done or self.failed
+            for chunk in chunks:
+                yield chunk
+            position += len(chunks)
+            if finished and position >= len(self.chunks):
+                return
+            if not chunks and not finished:
+                # Upstream stalled past the timeout.
+                return
+
+
+class TranscodeProxy:
+    """
+    /plex-transcode/<path> in front of Plex's universal transcoder.
+
+    Only paths under the universal transcoder are forwarded. Upstream
+    requests go through the pooled Plex session with the token added
+    server-side; tokens are stripped from client URLs and from every
+    URI in the playlists handed back. Each distinct URL is fetched once by a
+    background task no matter how many viewers ask for it: clients arriving
+    mid-download stream the chunks already read and then follow the live
+    read, and finished 200 responses are kept briefly in a byte-bounded
+    cache (segments for a minute, playlists for a second).
+    """
+
+    def __init__(self):
+        self.cache = SegmentCache(DEFAULT_CACHE_MB * 1024 * 1024)
+        self.segment_ttl = DEFAULT_SEGMENT_TTL_SECONDS
+        self.pending = {}
+        self.upstream_fetches = 0
+        self.merged = 0
+        self._lock = threading.RLock()
+
+    def init_app(self, app):
+        self.cache.max_bytes = int(app.config.get("PLEX_PROXY_CACHE_MB", DEFAULT_CACHE_MB)) * 1024 * 1024
+        self.segment_ttl = int(app.config.get("PLEX_PROXY_SEGMENT_TTL_SECONDS", self.segment_ttl))
+
+    # ─── Playlist rewriting ─────────────────────────────────────────
+
+    def rewrite_uri(self, uri):
+        parts = urlsplit(uri)
+        path = parts.path
+        if parts.scheme:
+            if not plex_client.url or not uri.startswith(plex_client.url):
+                return uri
+            path = PROXY_PREFIX + path
+        elif path.startswith("/") and not path.startswith(PROXY_PREFIX + "/"):
+            # Absolute paths are relative to the Plex server, not to this site.
+            path = PROXY_PREFIX + path
+
+        query = _strip_token(parse_qsl(parts.query, keep_blank_values=True))
+        return path + (f"?{urlencode(query)}" if query else "")
+
+    def rewrite_playlist(self, data):
+        lines = []
+        for line in data.decode("utf-8", "replace").splitlines():
+            stripped = line.strip()
+            if stripped and not stripped.startswith("#"):
+                line = self.rewrite_uri(stripped)
+            elif "URI=" in line:
+                line = URI_ATTR_RE.sub(lambda m: f'URI="{self.rewrite_uri(m.group(1))}"', line)
+            lines.append(line)
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+    # ─── Fetching ───────────────────────────────────────────────────
+
+    def cache_key(self, path, query):
+        return f"{path}?{urlencode(sorted(_strip_token(query)))}"
+
+    def cached(self, key, path):
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        ttl = PLAYLIST_TTL_SECONDS if is_playlist(path) else self.segment_ttl
+        if time.time() - entry.stored_at > ttl:
+            self.cache.discard(key)
+            return None
+        return entry
+
+    def open(self, path, query):
+        """Return (key, Fetch) for path, starting an upstream read unless one is running."""
+        from app import socketio
+
+        if upstream_path(path) != path:
+            raise ValueError(f"Not a transcoder path: {path}")
+
+        key = self.cache_key(path, query)
+        with self._lock:
+            fetch = self.pending.get(key)
+            if fetch:
+                self.merged += 1
+                return key, fetch
+            fetch = Fetch()
+            self.pending[key] = fetch
+            self.upstream_fetches += 1
+
+        socketio.start_background_task(self._read_upstream, key, path, _strip_token(query), fetch)
+        return key, fetch
+
+    def _read_upstream(self, key, path, query, fetch):
+        resp = None
+        try:
+            resp = plex_client.session.get(
+                f"{plex_client.url}/{path.lstrip('/')}",
+                params=query,
+                headers={"X-Plex-Token": plex_client.token},
+                stream=True,
+                timeout=plex_client.timeout,
+            )
+            with fetch.cond:
+                fetch.status = resp.status_code
+                fetch.mimetype = resp.headers.get("content-type", "application/octet-stream")
+                fetch.cond.notify_all()
+
+            for chunk in resp.iter_content(CHUNK_SIZE):
+                with fetch.cond:
+                    fetch.chunks.append(chunk)
+                    fetch.cond.notify_all()
+
+            body = b"".join(fetch.chunks)
+            if is_playlist(path):
+                body = self.rewrite_playlist(body)
+            if fetch.status == 200:
+                self.cache.put(key, body, fetch.mimetype)
+
+            with fetch.cond:
+                fetch.body = body
+                fetch.done = True
+                fetch.cond.notify_all()
+        except Exception as e:
+            plex_client.report_error(e)
+            print(f"[PLEX] Proxy fetch of {path} failed: {e}")
+            with fetch.cond:
+                fetch.failed = True
+                fetch.cond.notify_all()
+        finally:
+            if resp is not None:
+                resp.close()
+            with self._lock:
+                if self.pending.get(key) is fetch:
+                    del self.pending[key]
+
+    def stats(self):
+        return {
+            "upstream_fetches": self.upstream_fetches,
+            "merged": self.merged,
+            "in_flight": len(self.pending),
+            "cache": self.cache.stats(),
+        }
+
+
+# ─── Singleton ────────────────────────────────────────────────────────
+transcode_proxy = TranscodeProxy()
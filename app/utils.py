@@ -1,18 +1,6 @@
-from flask import current_app
-from plexapi.server import PlexServer
+from app.services.plex_client import plex_client
 
 
 def get_plex_server():
-    """Connect to local Plex Server."""
-    try:
-        # We access the config we set in __init__.py
-        url = current_app.config.get('PLEX_URL')
-        token = current_app.config.get('PLEX_TOKEN')
-
-        if not url or not token:
-            return None
-
-        return PlexServer(url, token)
-    except Exception as e:
-        print(f"Error connecting to Plex: {e}")
-        return None
\ No newline at end of file
+    """Return the shared Plex connection, or None if Plex is unreachable."""
+    return plex_client.get_server()
@@ -1,3 +1,8 @@
+# gevent must patch the stdlib before anything else is imported so that
+# background tasks (e.g. ffmpeg output readers) cooperate with the server.
+from gevent import monkey
+monkey.patch_all()
+
 import os
 from app import create_app, db, socketio
 
@@ -71,7 +71,7 @@ window.showFolders = function() {
 
 // ... keep your window.loadGame function below here exactly as it was! ...
 // The function that dynamically boots the console
-window.loadGame = function(core, romPath) {
+window.loadGame = function(core, romUrl) {
     // Hide the standby text
     document.getElementById('placeholder-text').style.display = 'none';
 
@@ -90,8 +90,8 @@ window.loadGame = function(core, romPath) {
     window.EJS_color = '#007BFF'; // Updated to PeakDecline Blue to match your new logo
     window.EJS_pathtodata = 'https://cdn.emulatorjs.org/stable/data/';
 
-    // Construct the full URL to your static folder
-    window.EJS_gameUrl = '/static/' + romPath;
+    // Catalog URL for the ROM (Range-capable, cached by content hash)
+    window.EJS_gameUrl = romUrl;
 
     // Inject the EmulatorJS engine script into the page
     const script = document.createElement('script');
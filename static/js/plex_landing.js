@@ -98,4 +98,84 @@ document.addEventListener('DOMContentLoaded', () => {
             }
         });
     }
+
+    // 5. LIVE ROOM LIST (new rooms, deleted rooms, media and user counts)
+    const roomsGrid = document.getElementById('roomsGrid');
+    if (roomsGrid && typeof io !== 'undefined') {
+        const socket = io();
+        let roomsVersion = Number(roomsGrid.dataset.version || 0);
+        const rooms = new Map();
+
+        const escapeHtml = (text) => String(text ?? '').replace(/[&<>"']/g, (c) => ({
+            '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'
+        }[c]));
+
+        const renderRoomCard = (room) => {
+            const host = room.host || '?';
+            const link = document.createElement('a');
+            link.href = `/plex-watch-together/room/${room.id}`;
+            link.className = 'card-link';
+            link.dataset.roomId = room.id;
+            link.innerHTML = `
+                <div class="room-card">
+                    <div class="room-poster">
+                        <img src="${roomsGrid.dataset.thumb}" alt="Room thumbnail">
+                        ${room.is_playing ? '<div class="live-badge">Playing</div>' : ''}
+                    </div>
+                    <div class="room-info">
+                        <div class="room-name">${escapeHtml(room.name)}</div>
+                        <div class="now-playing">
+                            <span>${room.media_title ? `📺 ${escapeHtml(room.media_title)}` : '💤 Nothing playing'}</span>
+                        </div>
+                        <div class="room-users">
+                            <div class="user-avatars">
+                                <div class="user-avatar host-avatar-icon" title="Host: ${escapeHtml(host)}">
+                                    ${escapeHtml(host.charAt(0).toUpperCase())}
+                                </div>
+                            </div>
+                            <span>Hosted by ${escapeHtml(host)}${room.users ? ` · ${room.users} watching` : ''}</span>
+                        </div>
+                    </div>
+                </div>
+            `;
+            return link;
+        };
+
+        const renderRooms = () => {
+            roomsGrid.innerHTML = '';
+            const sorted = [...rooms.values()].sort((a, b) => b.id - a.id);
+
+            if (!sorted.length) {
+                roomsGrid.innerHTML = `
+                    <div class="no-rooms empty-rooms-msg">
+                        <h2>No active rooms</h2>
+                        <p>Click "+ Create Room" to start a watch party.</p>
+                    </div>
+                `;
+                return;
+            }
+            sorted.forEach(room => roomsGrid.appendChild(renderRoomCard(room)));
+        };
+
+        socket.on('connect', () => socket.emit('join_rooms_landing'));
+
+        socket.on('rooms_list', (snapshot) => {
+            rooms.clear();
+            snapshot.rooms.forEach(room => rooms.set(room.id, room));
+            roomsVersion = snapshot.version;
+            renderRooms();
+        });
+
+        socket.on('rooms_updated', (delta) => {
+            if (delta.version !== roomsVersion + 1) {
+                // Missed an update: ask for the whole list again.
+                if (delta.version > roomsVersion) socket.emit('join_rooms_landing');
+                return;
+            }
+            roomsVersion = delta.version;
+            delta.removed.forEach(id => rooms.delete(id));
+            delta.upserted.forEach(room => rooms.set(room.id, room));
+            renderRooms();
+        });
+    }
 });
\ No newline at end of file
@@ -85,6 +85,8 @@ document.addEventListener('DOMContentLoaded', () => {
     const gameResults = document.getElementById('game-results');
 
     let navigationStack = [];
+    // /api/plex/children URL -> items, filled a whole show at a time from /api/plex/tree.
+    let childrenCache = {};
 
     // --- UI STATE MANAGER ---
 // --- UI STATE MANAGER ---
@@ -416,6 +418,7 @@ document.addEventListener('DOMContentLoaded', () => {
             const query = searchInput.value.trim();
             if (!query) return;
             navigationStack = [];
+            childrenCache = {};
             loadResults(`/api/plex/search?q=${encodeURIComponent(query)}`);
         });
     }
@@ -488,6 +491,17 @@ document.addEventListener('DOMContentLoaded', () => {
                 startSyncLoop();
             });
 
+            socket.on('media_preparing', (data) => {
+                if (String(data.room_id) !== String(ROOM_ID)) return;
+                if (mediaTitleElem) mediaTitleElem.innerText = 'Preparing media...';
+            });
+
+            socket.on('media_failed', (data) => {
+                if (String(data.room_id) !== String(ROOM_ID)) return;
+                if (mediaTitleElem) mediaTitleElem.innerText = 'Could not load media';
+                if (isHost) alert("Server Error: " + data.error);
+            });
+
             socket.on('media_updated', (data) => {
                 if (String(data.room_id) !== String(ROOM_ID)) return;
                 if (!data.url) return;
@@ -514,11 +528,23 @@ document.addEventListener('DOMContentLoaded', () => {
             });
 
             const usersListElem = document.getElementById('users-list');
-            socket.on('room_users_update', (users) => {
+            let roomUsers = [];
+            let roomUsersVersion = 0;
+
+            function applyUsersDelta(list, delta) {
+                const left = new Set(delta.left || []);
+                const next = list.filter(user => !left.has(user));
+                (delta.joined || []).forEach(user => {
+                    if (!next.includes(user)) next.push(user);
+                });
+                return next;
+            }
+
+            function renderRoomUsers() {
                 if (!usersListElem) return;
                 usersListElem.innerHTML = '';
 
-                users.forEach(user => {
+                roomUsers.forEach(user => {
                     const uDiv = document.createElement('div');
                     uDiv.style.padding = '12px 15px';
                     uDiv.style.borderBottom = '1px solid #222630';
@@ -553,6 +579,23 @@ document.addEventListener('DOMContentLoaded', () => {
 
                     usersListElem.appendChild(uDiv);
                 });
+            }
+
+            socket.on('room_users_update', (snapshot) => {
+                roomUsers = snapshot.users;
+                roomUsersVersion = snapshot.version;
+                renderRoomUsers();
+            });
+
+            socket.on('room_users_delta', (delta) => {
+                if (delta.version !== roomUsersVersion + 1) {
+                    // Missed a delta (or an old one arrived late): resync from a snapshot.
+                    if (delta.version > roomUsersVersion) socket.emit('request_room_users', { room_id: ROOM_ID });
+                    return;
+                }
+                roomUsers = applyUsersDelta(roomUsers, delta);
+                roomUsersVersion = delta.version;
+                renderRoomUsers();
             });
 
             socket.on('host_changed', (data) => {
@@ -562,6 +605,7 @@ document.addEventListener('DOMContentLoaded', () => {
 
                 addMessage("System", `<span style="color:#e5a00d;">${HOST_USERNAME} is now the host</span>`);
                 applyHostPermissions();
+                renderRoomUsers();
 
                 if (!isHost) stopLocalBroadcast();
             });
@@ -783,8 +827,11 @@ document.addEventListener('DOMContentLoaded', () => {
         resultsContainer.innerHTML = '<p style="color:#ccc; text-align:center; margin-top:50px;">Loading...</p>';
 
         try {
-            const response = await fetch(url);
-            const items = await response.json();
+            let items = childrenCache[url];
+            if (!items) {
+                const response = await fetch(url);
+                items = await response.json();
+            }
 
             resultsContainer.innerHTML = '';
 
@@ -846,7 +893,25 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
-    function handleItemClick(item) {
+    async function loadTree(showKey) {
+        try {
+            const response = await fetch(`/api/plex/tree?keys=${showKey}`);
+            if (!response.ok) return;
+            const data = await response.json();
+            Object.entries(data.children || {}).forEach(([key, items]) => {
+                childrenCache[`/api/plex/children?key=${key}`] = items;
+            });
+        } catch (err) {
+            // Falls back to loading one level at a time.
+            console.warn("Plex tree load failed:", err);
+        }
+    }
+
+    async function handleItemClick(item) {
+        if (item.type === 'Show') {
+            await loadTree(item.key);
+        }
+
         if (item.type === 'Show' || item.type === 'Season') {
             navigationStack.push({ url: `/api/plex/children?key=${item.key}` });
             loadResults(`/api/plex/children?key=${item.key}`, true);
@@ -1012,7 +1077,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 btn.className = 'btn-choose-media';
                 btn.style.cssText = "display: block; width: 100%; text-align: left; padding: 15px; margin-bottom: 5px; background: #222;";
                 btn.innerText = game.name;
-                btn.onclick = () => bootGame(game.core, game.path, game.name);
+                btn.onclick = () => bootGame(game.core, game.url, game.name);
                 gameResults.appendChild(btn);
             });
         } catch (err) {
@@ -1020,7 +1085,7 @@ document.addEventListener('DOMContentLoaded', () => {
             gameResults.innerHTML = '<p style="color:red; text-align:center;">Error loading games.</p>';
         }
     };
-    function bootGame(core, romPath, gameName) {
+    function bootGame(core, romUrl, gameName) {
         if (!isHost) return;
 
         cleanupEmulator();
@@ -1045,7 +1110,7 @@ document.addEventListener('DOMContentLoaded', () => {
         window.EJS_core = core;
         window.EJS_color = '#007BFF';
         window.EJS_pathtodata = 'https://cdn.emulatorjs.org/stable/data/';
-        window.EJS_gameUrl = '/static/' + romPath;
+        window.EJS_gameUrl = romUrl;
 
         emulatorLoaderScript = document.createElement('script');
         emulatorLoaderScript.src = 'https://cdn.emulatorjs.org/stable/data/loader.js';
@@ -5,8 +5,19 @@ const channelTitle = document.getElementById("current-channel-name");
 
 let hls = null;
 let currentChannelId = null;
+let loadedChannelId = null;
+let pendingJobId = null;
+let lowLatency = false;
 let chatInitialized = false;
 
+// Server-side channel search/paging
+const CHANNEL_PAGE_SIZE = 100;
+let channelOffset = 0;
+let channelTotal = 0;
+let channelRequest = 0;
+let channelLoading = false;
+let searchTimer = null;
+
 /* ───────────────── INIT ───────────────── */
 
 document.addEventListener("DOMContentLoaded", () => {
@@ -14,36 +25,56 @@ document.addEventListener("DOMContentLoaded", () => {
     setupChat();
 
     // ✅ Load channels/favorites immediately (fixes your “type then delete” bug)
+    loadFavorites();
     loadChannels();
 
     // Join Live TV-specific presence list
     socket.emit("join_live_tv");
     socket.emit("request_live_tv_users");
 
-    // ✅ If someone changes the channel, update everyone
-    socket.on("channel_changed", (data) => {
-        currentChannelId = data.channel_id;
-        if (data.name) channelTitle.textContent = data.name;
+    // Startup of a channel we requested finished on the server. Other
+    // viewers' channel changes do not move this player.
+    socket.on("stream_ready", (data) => {
+        if (data.job_id !== pendingJobId) return;
+        pendingJobId = null;
+        if (data.channel_id === currentChannelId) initPlayer();
+    });
+
+    socket.on("stream_failed", (data) => {
+        if (data.job_id !== pendingJobId) return;
+        pendingJobId = null;
+        if (data.channel_id === currentChannelId) {
+            channelTitle.textContent = `${data.name || "Channel"} unavailable`;
+        }
+    });
 
-        loadChannels();
-        setTimeout(initPlayer, 300);
+    // Search runs on the server; wait for a pause in typing
+    document.getElementById("search-box").addEventListener("input", () => {
+        clearTimeout(searchTimer);
+        searchTimer = setTimeout(loadChannels, 200);
     });
 
-    // Search should re-render list
-    document.getElementById("search-box").addEventListener("input", loadChannels);
+    // Fetch the next page when the list is scrolled near the bottom
+    const channelList = document.getElementById("channel-list");
+    channelList.addEventListener("scroll", () => {
+        if (channelList.scrollTop + channelList.clientHeight >= channelList.scrollHeight - 200) {
+            loadMoreChannels();
+        }
+    });
 
     // Get current stream status on load
     fetch("/api/status")
         .then(r => r.json())
         .then(data => {
+            lowLatency = !!data.low_latency;
             if (data.is_streaming && data.current_channel_id) {
                 currentChannelId = data.current_channel_id;
                 if (data.current_channel_name) channelTitle.textContent = data.current_channel_name;
             if (channelLogo && data.current_channel_logo) {
                     channelLogo.src = data.current_channel_logo;
                 }
-                // highlight active channel + populate lists on load
-                loadChannels();
+                // highlight active channel on load
+                highlightActiveChannel();
                 initPlayer();
             }
         })
@@ -60,7 +91,12 @@ document.addEventListener("DOMContentLoaded", () => {
 function initPlayer() {
     if (!currentChannelId) return;
 
-    const url = `/static/stream/${currentChannelId}/index.m3u8?t=${Date.now()}`;
+    // Let the server know which channel this socket is watching so idle
+    // transcodes can be stopped.
+    socket.emit("watch_live_tv_channel", { channel_id: currentChannelId });
+    loadedChannelId = currentChannelId;
+
+    const url = `/stream/${currentChannelId}/index.m3u8?t=${Date.now()}`;
 
     video.pause();
     video.currentTime = 0;
@@ -70,7 +106,12 @@ function initPlayer() {
     if (Hls.isSupported()) {
         if (hls) hls.destroy();
 
-        hls = new Hls({
+        // LL-HLS playlists carry their own hold-back; hls.js uses blocking
+        // reloads and partial segments when lowLatencyMode is on.
+        hls = new Hls(lowLatency ? {
+            lowLatencyMode: true,
+            backBufferLength: 30
+        } : {
             liveSyncDurationCount: 3,
             liveMaxLatencyDurationCount: 6
         });
@@ -83,10 +124,17 @@ function initPlayer() {
         });
 
         hls.on(Hls.Events.ERROR, (_, data) => {
-            if (data.fatal) {
-                console.warn("HLS error, retrying...");
-                setTimeout(initPlayer, 3000);
+            if (!data.fatal) return;
+            if (data.response && data.response.code === 404) {
+                // The server stopped this channel (idle or restarted); start it again.
+                console.warn("Stream not running, restarting channel...");
+                hls.destroy();
+                hls = null;
+                requestChannel(currentChannelId);
+                return;
             }
+            console.warn("HLS error, retrying...");
+            setTimeout(initPlayer, 3000);
         });
     } else {
         video.src = url;
@@ -102,67 +150,118 @@ function safePlay() {
 }
 
 function playChannel(id, name, logo) {
-    if (id === currentChannelId) return;
+    // A channel that is not playing (never loaded, or stopped) can be restarted.
+    if (id === loadedChannelId && hls) return;
 
     currentChannelId = id;
 
     // Show the channel immediately (no "Loading...")
+    highlightActiveChannel();
     if (name) channelTitle.textContent = name;
     if (channelLogo) channelLogo.src = logo || "/static/img/default_channel.png";
 
+    requestChannel(id);
+}
+
+function requestChannel(id) {
+    if (!id) return;
+
+    // Returns immediately with a job id; stream_ready/stream_failed follow
     fetch(`/api/play/${id}`, { method: "POST" })
-        .then(() => {
-            loadChannels();
-            setTimeout(initPlayer, 500);
+        .then(r => r.json())
+        .then(job => {
+            if (id !== currentChannelId) return;
+            if (job.status === "ready") {
+                initPlayer();
+            } else if (job.status === "starting") {
+                pendingJobId = job.job_id;
+            }
         })
         .catch(() => {});
 }
 
 /* ───────────────── CHANNEL LIST ───────────────── */
 
-function loadChannels() {
-    fetch("/api/channels")
+function channelLogoSrc(ch) {
+    return ch.logo || "/static/img/default_channel.png";
+}
+
+function highlightActiveChannel() {
+    document.querySelectorAll("#channel-list .channel-item").forEach(item => {
+        item.classList.toggle("active", Number(item.dataset.id) === currentChannelId);
+    });
+}
+
+function loadFavorites() {
+    fetch("/api/channels?favorites=1&limit=500")
         .then(r => r.json())
-        .then(channels => {
-            const list = document.getElementById("channel-list");
+        .then(page => {
             const favs = document.getElementById("favorites-list");
+            favs.innerHTML = "";
 
-            // ✅ Fix: trim hidden whitespace so first-load doesn’t filter everything out
-            const term = (document.getElementById("search-box").value || "").trim().toLowerCase();
+            page.items.forEach(ch => {
+                const fav = document.createElement("div");
+                fav.className = "fav-card";
+                fav.onclick = () => playChannel(ch.id, ch.name, ch.logo);
 
-            list.innerHTML = "";
-            favs.innerHTML = "";
+                fav.innerHTML = `
+                    <img class="fav-icon" src="${channelLogoSrc(ch)}" alt="${ch.name}">
+                    <div class="fav-name">${ch.name}</div>
+                `;
+
+                favs.appendChild(fav);
+            });
+        })
+        .catch(() => {});
+}
+
+// Start a new search from the first page
+function loadChannels() {
+    channelOffset = 0;
+    channelTotal = 0;
+    fetchChannelPage(true);
+}
 
-            channels.forEach(ch => {
-                const nameLower = (ch.name || "").toLowerCase();
+function loadMoreChannels() {
+    if (channelLoading || channelOffset >= channelTotal) return;
+    fetchChannelPage(false);
+}
+
+function fetchChannelPage(reset) {
+    // ✅ Fix: trim hidden whitespace so first-load doesn’t filter everything out
+    const term = (document.getElementById("search-box").value || "").trim();
+    const requestId = ++channelRequest;
+    const params = new URLSearchParams({ q: term, offset: channelOffset, limit: CHANNEL_PAGE_SIZE });
+
+    channelLoading = true;
+    fetch(`/api/channels?${params}`)
+        .then(r => r.json())
+        .then(page => {
+            // A newer search started while this one was in flight
+            if (requestId !== channelRequest) return;
 
-                // ✅ Only filter if term is not empty
-                if (term && !nameLower.includes(term)) return;
+            const list = document.getElementById("channel-list");
+            if (reset) list.innerHTML = "";
 
+            page.items.forEach(ch => {
                 const item = document.createElement("div");
                 item.className = `channel-item ${ch.id === currentChannelId ? "active" : ""}`;
-                item.onclick = () => playChannel(ch.id, ch.name,ch.logo);
+                item.dataset.id = ch.id;
+                item.onclick = () => playChannel(ch.id, ch.name, ch.logo);
                 item.innerHTML = `
-                    <img class="ch-logo" src="${ch.logo || "/static/img/default_channel.png"}">
+                    <img class="ch-logo" src="${channelLogoSrc(ch)}">
                     <span>${ch.name}</span>
                 `;
                 list.appendChild(item);
-
-                if (ch.Favorites === true) {
-                    const fav = document.createElement("div");
-                    fav.className = "fav-card";
-                    fav.onclick = () => playChannel(ch.id, ch.name,ch.logo);
-
-                    fav.innerHTML = `
-                        <img class="fav-icon" src="${ch.logo || "/static/img/default_channel.png"}" alt="${ch.name}">
-                        <div class="fav-name">${ch.name}</div>
-                    `;
-
-                    favs.appendChild(fav);
-                }
             });
+
+            channelOffset = page.offset + page.items.length;
+            channelTotal = page.total;
         })
-        .catch(() => {});
+        .catch(() => {})
+        .finally(() => {
+            if (requestId === channelRequest) channelLoading = false;
+        });
 }
 
 /* ───────────────── CHAT ───────────────── */
@@ -198,12 +297,37 @@ function setupChat() {
         box.scrollTop = box.scrollHeight;
     });
 
-    socket.on("live_tv_users_update", list => {
+    let liveTvUsers = [];
+    let liveTvUsersVersion = 0;
+
+    function renderLiveTvUsers() {
         users.innerHTML = "";
-        count.textContent = list.length;
+        count.textContent = liveTvUsers.length;
 
-        list.forEach(u => {
+        liveTvUsers.forEach(u => {
             users.innerHTML += `<div class="user-row">${u}</div>`;
         });
+    }
+
+    socket.on("live_tv_users_update", snapshot => {
+        liveTvUsers = snapshot.users;
+        liveTvUsersVersion = snapshot.version;
+        renderLiveTvUsers();
+    });
+
+    socket.on("live_tv_users_delta", delta => {
+        if (delta.version !== liveTvUsersVersion + 1) {
+            // Missed a delta (or an old one arrived late): resync from a snapshot.
+            if (delta.version > liveTvUsersVersion) socket.emit("request_live_tv_users");
+            return;
+        }
+        liveTvUsersVersion = delta.version;
+
+        const left = new Set(delta.left || []);
+        liveTvUsers = liveTvUsers.filter(u => !left.has(u));
+        (delta.joined || []).forEach(u => {
+            if (!liveTvUsers.includes(u)) liveTvUsers.push(u);
+        });
+        renderLiveTvUsers();
     });
 }
\ No newline at end of file